@@ -3,6 +3,8 @@ import json
 from pathlib import Path
 from typing import Dict, Literal, Tuple
 
+from vault.access_catalog import touch_read
+
 
 Market = Literal["TW", "US", "JP", "CRYPTO"]
 
@@ -70,6 +72,7 @@ class EvaluationEngine:
     def _load_report(path: Path) -> dict:
         try:
             raw = json.loads(path.read_text(encoding="utf-8"))
+            touch_read(path)
             return raw["data"] if "data" in raw else raw
         except Exception as e:
             raise EvaluationError(f"無法讀取報告檔案: {path} ({e})")
@@ -3,7 +3,9 @@ import json
 import time
 from pathlib import Path
 from typing import Dict, Optional
-from urllib import request
+
+from notify.delivery import send, SEND_TIMEOUT
+from vault.access_catalog import touch_read, touch_write
 
 
 class NotifierV2:
@@ -30,22 +32,14 @@ class NotifierV2:
         if last_hash == payload_hash and audit.get("date") == context.get("date"):
             return {"sent": False, "reason": "duplicate", "payload_hash": payload_hash}
 
-        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        req = request.Request(
-            webhook_url,
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-
-        try:
-            with request.urlopen(req, timeout=15) as resp:
-                code = int(resp.getcode())
-                body = resp.read(500).decode("utf-8", errors="replace")
-        except Exception as e:
-            result = {"sent": False, "reason": f"error:{e}", "payload_hash": payload_hash}
+        # 共用發送客戶端（keep-alive / 限流 / 429 Retry-After / 有上限重試）
+        r = send(webhook_url, payload, timeout=SEND_TIMEOUT)
+        code = r.get("status_code")
+        if code is None:
+            result = {"sent": False, "reason": r.get("reason") or "error", "payload_hash": payload_hash}
             self._write_audit({"timestamp": now, "date": context.get("date"), "last_payload_hash": payload_hash, "last_result": result})
             return result
+        body = r.get("body", "")
 
         result = {"sent": (200 <= code < 300), "status_code": code, "body": body, "payload_hash": payload_hash}
         self._write_audit({"timestamp": now, "date": context.get("date"), "last_payload_hash": payload_hash, "last_result": result})
@@ -55,15 +49,18 @@ class NotifierV2:
         if not self.audit_path.exists():
             return {}
         try:
-            return json.loads(self.audit_path.read_text(encoding="utf-8"))
+            audit = json.loads(self.audit_path.read_text(encoding="utf-8"))
         except Exception:
             return {}
+        touch_read(self.audit_path)
+        return audit
 
     def _write_audit(self, obj: Dict) -> None:
         tmp = self.audit_path.with_suffix(".json.tmp")
         with open(tmp, "w", encoding="utf-8") as f:
             json.dump(obj, f, ensure_ascii=False, indent=2)
         tmp.replace(self.audit_path)
+        touch_write(self.audit_path)
 
     @staticmethod
     def _hash(payload: Dict) -> str:
@@ -5,6 +5,8 @@ import time
 from pathlib import Path
 from typing import Dict, Literal, Optional
 
+from vault.access_catalog import touch_write
+
 
 Market = Literal["TW", "US", "JP", "CRYPTO"]
 
@@ -49,4 +51,5 @@ class ReportWriter:
         with open(tmp, "w", encoding="utf-8") as f:
             json.dump(record, f, ensure_ascii=False, indent=2)
         os.replace(tmp, p)
+        touch_write(p)
         return p
@@ -0,0 +1,412 @@
+# notify/delivery.py
+# Discord 非同步發送客戶端（連線池 × 限流 × 重試）
+# 職責：
+# - 所有 webhook POST 共用一條背景 asyncio 迴圈與 keep-alive 連線池
+# - 每個 webhook 一個 token bucket + 發送佇列（同一 webhook 保持發送順序）
+# - 429 依 retry_after / Retry-After 等待；5xx / 連線錯誤指數退避；重試有上限
+# - submit() 立即回傳 Future，不阻塞呼叫端；send() 為同步等待版本（有總時限）
+#   逾時：尚未開始發送 → 從佇列撤下（reason=timeout，可安全重送）；
+#         已在發送中 → reason=in_flight（仍會送達，呼叫端不可重送，避免同一則送兩次）
+# ❌ 不決策 ❌ 不防重（由上層處理）❌ 不寫 Vault
+
+import ssl
+import json
+import time
+import atexit
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Discord webhook 限制約為每 2 秒 5 則
+BUCKET_RATE = 2.5          # 每秒補充 token 數
+BUCKET_BURST = 5           # 最大突發
+MAX_RETRIES = 4            # 首次之外最多再試幾次
+BACKOFF_BASE = 0.5         # 5xx / 連線錯誤退避（秒，×2 遞增）
+MAX_RETRY_AFTER = 60.0     # 429 要求等待超過此秒數 → 直接判定失敗
+REQUEST_TIMEOUT = 15       # 單次 HTTP 往返上限
+POOL_SIZE = 4              # 每個 host 保留的閒置連線數
+DRAIN_TIMEOUT = 30         # 結束時等待佇列清空的上限
+SEND_TIMEOUT = 90          # send() 同步等待總上限（排隊 + 限流 + 重試）
+
+USER_AGENT = "Quant-Orchestrator (delivery, 1.0)"
+
+# -------------------------------------------------
+# 限流
+# -------------------------------------------------
+
+class TokenBucket:
+    def __init__(self, rate: float = BUCKET_RATE, burst: int = BUCKET_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        """伺服器要求暫停（429 / remaining=0）"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+# -------------------------------------------------
+# HTTP/1.1 keep-alive 連線池（只用標準庫）
+# -------------------------------------------------
+
+class ConnectionPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self.opened = 0
+        self._idle: Dict[Tuple[str, str, int], deque] = {}
+        self._ssl = ssl.create_default_context()
+
+    async def acquire(self, key: Tuple[str, str, int], fresh: bool = False):
+        """回傳 ((reader, writer), reused)"""
+        idle = self._idle.get(key)
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+
+        scheme, host, port = key
+        conn = await asyncio.open_connection(
+            host, port, ssl=self._ssl if scheme == "https" else None
+        )
+        self.opened += 1
+        return conn, False
+
+    def release(self, key, conn, reusable: bool):
+        reader, writer = conn
+        idle = self._idle.setdefault(key, deque())
+        if reusable and len(idle) < self.size and not writer.is_closing():
+            idle.append(conn)
+        else:
+            writer.close()
+
+    def close(self):
+        for idle in self._idle.values():
+            while idle:
+                idle.pop()[1].close()
+
+
+async def _read_response(reader) -> Tuple[int, Dict[str, str], bytes]:
+    status_line = await reader.readuntil(b"\r\n")
+    status = int(status_line.decode("latin-1").split(" ", 2)[1])
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif status in (204, 304) or 100 <= status < 200:
+        body = b""
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, body
+
+
+def _retry_after(headers: Dict[str, str], body: bytes) -> Tuple[float, bool]:
+    """429 等待秒數（body.retry_after 優先）與是否為全域限流"""
+    wait, is_global = None, headers.get("x-ratelimit-global", "").lower() == "true"
+    try:
+        data = json.loads(body or b"{}")
+        wait = data.get("retry_after")
+        is_global = is_global or bool(data.get("global"))
+    except Exception:
+        pass
+    if wait is None:
+        try:
+            wait = float(headers.get("retry-after", 1))
+        except ValueError:
+            wait = 1.0
+    return max(float(wait), 0.0), is_global
+
+
+# -------------------------------------------------
+# 發送客戶端
+# -------------------------------------------------
+
+class DeliveryClient:
+    """
+    背景執行緒跑 asyncio 迴圈；任何執行緒都可 submit()
+    結果 dict：sent / status_code / body（節錄）/ attempts / latency / reason
+    """
+
+    def __init__(
+        self,
+        rate: float = BUCKET_RATE,
+        burst: int = BUCKET_BURST,
+        max_retries: int = MAX_RETRIES,
+        timeout: float = REQUEST_TIMEOUT,
+        pool_size: int = POOL_SIZE,
+        backoff: float = BACKOFF_BASE,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.pool = ConnectionPool(pool_size)
+        self.stats = {"submitted": 0, "sent": 0, "failed": 0, "cancelled": 0, "retries": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()  # submit() 在呼叫端執行緒、其餘在迴圈執行緒
+
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers = []
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._global_until = 0.0
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="discord-delivery", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def stats_snapshot(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    # ---------- 對外 API ----------
+
+    def submit(self, url: str, payload: Dict[str, Any]) -> Future:
+        """非阻塞：排入該 webhook 的佇列，立即回傳 Future"""
+        fut: Future = Future()
+        if self._closed or not url:
+            fut.set_result({"sent": False, "reason": "closed" if url else "no_webhook"})
+            return fut
+        self._count("submitted")
+        self._loop.call_soon_threadsafe(self._enqueue, url, payload, fut, time.monotonic())
+        return fut
+
+    def send(self, url: str, payload: Dict[str, Any], timeout: Optional[float] = SEND_TIMEOUT) -> Dict[str, Any]:
+        """
+        同步版本：最多等 timeout 秒
+        逾時且尚未開始發送 → 撤下，reason=timeout；已在發送中 → reason=in_flight（不可重送）
+        """
+        fut = self.submit(url, payload)
+        try:
+            return fut.result(timeout)
+        except FutureTimeout:
+            if fut.cancel():
+                return {"sent": False, "reason": "timeout"}
+            return {"sent": False, "reason": "in_flight"}
+
+    def flush(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """等待目前所有佇列送完"""
+        if self._closed:
+            return True
+        try:
+            asyncio.run_coroutine_threadsafe(self._join(), self._loop).result(timeout)
+            return True
+        except Exception:
+            return False
+
+    def close(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        if self._closed:
+            return True
+        drained = self.flush(timeout)
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        return drained
+
+    # ---------- 迴圈內 ----------
+
+    def _enqueue(self, url, payload, fut, t0):
+        q = self._queues.get(url)
+        if q is None:
+            q = self._queues[url] = asyncio.Queue()
+            self._buckets[url] = TokenBucket(self.rate, self.burst)
+            self._workers.append(self._loop.create_task(self._worker(url, q)))
+        q.put_nowait((payload, fut, t0))
+
+    async def _join(self):
+        await asyncio.gather(*(q.join() for q in list(self._queues.values())))
+
+    async def _shutdown(self):
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self.pool.close()
+
+    async def _worker(self, url: str, queue: asyncio.Queue):
+        bucket = self._buckets[url]
+        while True:
+            payload, fut, t0 = await queue.get()
+            # 標記發送中；send() 逾時已撤下的訊息直接略過
+            if not fut.set_running_or_notify_cancel():
+                self._count("cancelled")
+                queue.task_done()
+                continue
+            try:
+                result = await self._deliver(url, payload, bucket)
+            except Exception as e:
+                result = {"sent": False, "reason": f"error:{e}", "attempts": 0}
+            result["latency"] = round(time.monotonic() - t0, 4)
+            self._count("sent" if result["sent"] else "failed")
+            if not fut.done():
+                fut.set_result(result)
+            queue.task_done()
+
+    async def _post(self, url: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        u = urlsplit(url)
+        scheme = u.scheme or "https"
+        key = (scheme, u.hostname, u.port or (443 if scheme == "https" else 80))
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {u.netloc}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        # 閒置連線可能已被對方關閉 → 換新連線再試一次（不計入重試次數）
+        for fresh in (False, True):
+            conn, reused = await self.pool.acquire(key, fresh)
+            reader, writer = conn
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                status, headers, data = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and not fresh:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            self.pool.release(key, conn, headers.get("connection", "").lower() != "close")
+            return status, headers, data
+
+    async def _deliver(self, url: str, payload: Dict[str, Any], bucket: TokenBucket) -> Dict[str, Any]:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        status, data, reason = None, b"", None
+        attempts = 0
+
+        while attempts <= self.max_retries:
+            if attempts:
+                self._count("retries")
+            now = time.monotonic()
+            if now < self._global_until:
+                await asyncio.sleep(self._global_until - now)
+            await bucket.acquire()
+            attempts += 1
+
+            try:
+                status, headers, data = await asyncio.wait_for(self._post(url, body), self.timeout)
+            except Exception as e:
+                status, reason = None, f"error:{type(e).__name__}"
+                if attempts <= self.max_retries:
+                    await asyncio.sleep(self.backoff * 2 ** (attempts - 1))
+                continue
+
+            # 主動遵守剩餘額度
+            if headers.get("x-ratelimit-remaining") == "0":
+                try:
+                    bucket.block(float(headers.get("x-ratelimit-reset-after", 0)))
+                except ValueError:
+                    pass
+
+            if 200 <= status < 300:
+                return self._result(True, status, data, attempts, None)
+
+            if status == 429:
+                self._count("rate_limited")
+                wait, is_global = _retry_after(headers, data)
+                reason = "rate_limited"
+                if wait > MAX_RETRY_AFTER:
+                    break
+                if is_global:
+                    self._global_until = max(self._global_until, time.monotonic() + wait)
+                else:
+                    bucket.block(wait)
+                continue
+
+            reason = f"http_{status}"
+            if status < 500:
+                break  # 4xx：重送也不會成功
+            if attempts <= self.max_retries:
+                await asyncio.sleep(self.backoff * 2 ** (attempts - 1))
+
+        return self._result(False, status, data, attempts, reason)
+
+    @staticmethod
+    def _result(sent: bool, status, data: bytes, attempts: int, reason) -> Dict[str, Any]:
+        return {
+            "sent": sent,
+            "status_code": status,
+            "body": (data or b"")[:500].decode("utf-8", errors="replace"),
+            "attempts": attempts,
+            "reason": reason,
+        }
+
+
+# =================================================
+# 共用實例（行程內唯一；結束時自動送完佇列）
+# =================================================
+
+_CLIENT: Optional[DeliveryClient] = None
+_LOCK = threading.Lock()
+
+
+def get_client() -> DeliveryClient:
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = DeliveryClient()
+            atexit.register(_CLIENT.close)
+        return _CLIENT
+
+
+def submit(url: str, payload: Dict[str, Any]) -> Future:
+    return get_client().submit(url, payload)
+
+
+def send(url: str, payload: Dict[str, Any], timeout: Optional[float] = SEND_TIMEOUT) -> Dict[str, Any]:
+    return get_client().send(url, payload, timeout)
@@ -1,4 +1,6 @@
-import requests
+from notify.delivery import submit
+
 
 def send_discord(webhook: str, content: str):
-    requests.post(webhook, json={"content": content}, timeout=10)
+    """非阻塞：交給共用發送客戶端（連線池 / 限流 / 429 重試），回傳 Future"""
+    return submit(webhook, {"content": content})
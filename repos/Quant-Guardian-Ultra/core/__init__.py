@@ -1,4 +1,5 @@
 from .engine import GuardianEngine
 from .notifier import Notifier
+from .signal_collector import collect_signals
 
-__all__ = ["GuardianEngine", "Notifier"]
+__all__ = ["GuardianEngine", "Notifier", "collect_signals"]
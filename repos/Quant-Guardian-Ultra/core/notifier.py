@@ -1,7 +1,14 @@
-import requests
 import os
 from datetime import datetime
 
+import requests
+
+# notify.delivery 需由呼叫端讓 Orchestrator Root 可匯入（PYTHONPATH）；匯入不到 → 直接同步送出（舊行為）
+try:
+    from notify.delivery import submit
+except Exception:
+    submit = None
+
 # ==================================================
 # Discord Notifier（Guardian v2 / dict-compatible）
 # ==================================================
@@ -66,7 +73,18 @@ class Notifier:
             ]
         }
 
+        # 非阻塞送出；失敗只記錄，不影響 Guardian 判定
+        if submit is not None:
+            submit(webhook, payload).add_done_callback(_report_failure)
+            return
+
         try:
             requests.post(webhook, json=payload, timeout=10)
         except Exception as e:
             print(f"[Notifier] Failed to send message: {e}")
+
+
+def _report_failure(fut):
+    r = fut.result()
+    if not r.get("sent"):
+        print(f"[Notifier] Failed to send message: {r.get('reason')}")
@@ -0,0 +1,180 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# ==================================================
+# Guardian Signal Collector
+# - vix / sentiment / event_score 三個來源同時抓取
+# - 每個來源各自 deadline；逾時或失敗 → 上次成功值（標記 stale）
+#   事件型來源（EVENT_SOURCES）不沿用舊值：舊新聞不能代表現在 → 直接中性預設
+# - 一輪耗時 ≈ 最慢的來源，而不是三者相加
+# - vix / sentiment 以 yf.Ticker.history 逐檔抓取（不經 yf.download 的共用狀態），彼此不必排隊
+# ==================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, "data", "system", "signal_cache.json")
+
+# 每個來源的 deadline（秒，從本輪開始起算）
+DEADLINES = {
+    "vix": 20,
+    "sentiment": 20,
+    "event_score": 15,
+}
+
+# 快取超過此時間不再使用（改用中性預設值）
+MAX_STALE_SEC = 6 * 3600
+
+# 事件型來源：只反映「本輪新出現」的事件，失敗不用快取
+EVENT_SOURCES = {"event_score"}
+
+# 無任何可用值時的中性預設（= 舊版失敗時的 L1）
+DEFAULTS = {
+    "vix": 20.0,
+    "sentiment": 0.0,
+    "event_score": 0.0,
+}
+
+# ==================================================
+# Providers（modules/ 目錄名稱含空白，以路徑載入）
+# ==================================================
+
+def _load_class(rel_path: str, name: str):
+    path = os.path.join(BASE_DIR, "modules", rel_path)
+    spec = importlib.util.spec_from_file_location(f"guardian_{name.lower()}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, name)
+
+
+def _vix() -> float:
+    return _load_class("scanners /vix_scanner.py", "VixScanner")().fetch_vix()
+
+
+def _sentiment() -> float:
+    return _load_class("guardians /defense.py", "DefenseManager")().sentiment()
+
+
+def _event_score():
+    # news_seen 等 collector 在 deadline 內採用結果後才回寫（逾時的結果不吃掉新聞）
+    scanner = _load_class("scanners /news.py", "NewsScanner")()
+    return scanner.event_score(persist=False), scanner.commit
+
+
+# provider 回傳 float，或 (float, on_accept)：結果被採用時才呼叫 on_accept()
+PROVIDERS: Dict[str, Callable[[], Any]] = {
+    "vix": _vix,
+    "sentiment": _sentiment,
+    "event_score": _event_score,
+}
+
+# ==================================================
+# Cache
+# ==================================================
+
+def _load_cache(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _save_cache(path: str, cache: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+# ==================================================
+# Collect
+# ==================================================
+
+def collect_signals(
+    providers: Optional[Dict[str, Callable[[], Any]]] = None,
+    deadlines: Optional[Dict[str, float]] = None,
+    cache_path: str = CACHE_PATH,
+) -> dict:
+    """
+    回傳：
+    {
+      "vix": float, "sentiment": float, "event_score": float,
+      "sources": {name: {"status": fresh|stale|default, "elapsed", "age_sec", "error"}},
+      "elapsed": 本輪總秒數,
+    }
+    """
+    providers = providers or PROVIDERS
+    deadlines = {**DEADLINES, **(deadlines or {})}
+
+    # daemon thread：逾時的來源不會卡住行程結束
+    boxes = {}
+    start = time.monotonic()
+    for name, fn in providers.items():
+        box = {"done": threading.Event()}
+
+        def run(fn=fn, box=box):
+            try:
+                res = fn()
+                if isinstance(res, tuple):
+                    res, box["on_accept"] = res
+                box["value"] = float(res)
+            except Exception as e:
+                box["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                box["elapsed"] = round(time.monotonic() - start, 3)
+                box["done"].set()
+
+        threading.Thread(target=run, name=f"signal-{name}", daemon=True).start()
+        boxes[name] = box
+
+    cache = _load_cache(cache_path)
+    now = datetime.utcnow()
+    out, sources = {}, {}
+
+    for name, box in boxes.items():
+        remaining = deadlines.get(name, max(DEADLINES.values())) - (time.monotonic() - start)
+        box["done"].wait(max(remaining, 0))
+
+        if box["done"].is_set() and "value" in box:
+            if "on_accept" in box:
+                try:
+                    box["on_accept"]()
+                except Exception as e:
+                    print(f"[WARN] signal {name} accept hook failed: {e}")
+            out[name] = box["value"]
+            cache[name] = {"value": box["value"], "fetched_at": now.isoformat()}
+            sources[name] = {"status": "fresh", "elapsed": box["elapsed"], "age_sec": 0, "error": None}
+            continue
+
+        error = box.get("error") if box["done"].is_set() else "deadline exceeded"
+        cached = cache.get(name)
+        age = None
+        if cached:
+            try:
+                age = (now - datetime.fromisoformat(cached["fetched_at"])).total_seconds()
+            except (KeyError, ValueError):
+                age = None
+
+        if name not in EVENT_SOURCES and age is not None and age <= MAX_STALE_SEC:
+            out[name] = float(cached["value"])
+            status = "stale"
+        else:
+            out[name] = DEFAULTS.get(name, 0.0)
+            status = "default"
+        sources[name] = {
+            "status": status,
+            "elapsed": box.get("elapsed"),
+            "age_sec": round(age) if age is not None else None,
+            "error": error,
+        }
+
+    _save_cache(cache_path, cache)
+    out["sources"] = sources
+    out["elapsed"] = round(time.monotonic() - start, 3)
+    return out
@@ -8,7 +8,7 @@
 
 from core.engine import GuardianEngine
 from core.notifier import Notifier
-import random
+from core.signal_collector import collect_signals
 import os
 
 # ==================================================
@@ -21,21 +21,19 @@ BASE_DIR = os.path.abspath(
 STATE_PATH = os.path.join(BASE_DIR, "shared", "guardian_state.json")
 
 # ==================================================
-# Risk Signal Provider（目前為模擬）
+# Risk Signal Provider
 # ==================================================
 
 def get_risk_signals():
     """
-    未來可替換為：
-    - 真實 VIX API
-    - 新聞情緒模型
-    - 黑天鵝事件模型
+    VIX / 避險資產情緒 / 黑天鵝新聞 同時抓取（各自 deadline）
+    逾時或失敗的來源 → 上次成功值（stale）或中性預設值
     """
-    return {
-        "vix": round(random.uniform(15, 40), 2),
-        "sentiment": round(random.uniform(-1.0, 1.0), 3),
-        "event_score": round(random.uniform(0.0, 1.0), 3),
-    }
+    signals = collect_signals()
+    for name, src in signals["sources"].items():
+        if src["status"] != "fresh":
+            print(f"[Guardian] signal {name} {src['status']} (age={src['age_sec']}s, {src['error']})")
+    return signals
 
 # ==================================================
 # Main
@@ -60,6 +58,7 @@ def main():
         f" | Freeze={payload['freeze']}"
         f" | StableCount={payload['stable_count']}"
         f" | {payload['description']}"
+        f" | Signals={signals['elapsed']}s"
     )
 
     # Notify only if level changed (handled inside Notifier)
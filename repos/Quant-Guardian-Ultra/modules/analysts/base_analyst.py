@@ -1,13 +1,27 @@
 import yfinance as yf
 import pandas as pd
 import os
-from xgboost import XGBRegressor
+import time
+from xgboost import XGBRegressor, Booster
+
+# vault.model_registry 需由呼叫端讓 Orchestrator Root 可匯入（PYTHONPATH）；匯入不到 → 維持舊行為
+try:
+    from vault.model_registry import ModelRegistry
+except Exception:
+    ModelRegistry = None
+
+MODEL_PARAMS = {
+    "n_estimators": 150,
+    "max_depth": 3,
+    "learning_rate": 0.05
+}
 
 class BaseAnalyst:
     def __init__(self, market_name):
         self.market_name = market_name
         self.model_path = f"data/models/{market_name}_model.xgb"
         os.makedirs("data/models", exist_ok=True)
+        self.registry = ModelRegistry() if ModelRegistry else None
 
     def calculate_indicators(self, df):
         df = df.copy()
@@ -17,20 +31,47 @@ class BaseAnalyst:
         df["target"] = df["Close"].shift(-5) / df["Close"] - 1
         return df.dropna()
 
-    def load_or_train(self, df, feats):
-        model = XGBRegressor(
-            n_estimators=150,
-            max_depth=3,
-            learning_rate=0.05
-        )
+    def load_or_train(self, df, feats, symbol=None):
+        """
+        有註冊表時：依 (symbol, 特徵, 超參數, 訓練資料雜湊) 決定
+        reuse / warm（補幾輪）/ train；否則維持舊行為（有檔即載入）
+        """
+        train = df.iloc[:-5]
 
-        if os.path.exists(self.model_path):
-            model.load_model(self.model_path)
+        if self.registry is None or symbol is None:
+            model = XGBRegressor(**MODEL_PARAMS)
+            if os.path.exists(self.model_path):
+                model.load_model(self.model_path)
+                return model
+            model.fit(train[feats], train["target"])
+            model.save_model(self.model_path)
             return model
 
-        train = df.iloc[:-5]
-        model.fit(train[feats], train["target"])
-        model.save_model(self.model_path)
+        X, y = train[feats].to_numpy(), train["target"].to_numpy()
+        action, _, raw = self.registry.plan(symbol, feats, MODEL_PARAMS, X, y)
+
+        model = XGBRegressor(**MODEL_PARAMS)
+        if action == "reuse":
+            model.load_model(bytearray(raw))
+            self.registry.touch(symbol, feats, MODEL_PARAMS)
+            return model
+
+        init = None
+        if action == "warm":
+            init = Booster()
+            init.load_model(bytearray(raw))
+            model.set_params(n_estimators=self.registry.warm_rounds)
+
+        started = time.monotonic()
+        model.fit(X, y, xgb_model=init)
+        booster = model.get_booster()
+        self.registry.save(
+            symbol, feats, MODEL_PARAMS, X, y,
+            model_bytes=bytes(booster.save_raw("ubj")),
+            action=action,
+            train_sec=time.monotonic() - started,
+            n_trees=booster.num_boosted_rounds(),
+        )
         return model
 
     def predict(self, symbol):
@@ -42,7 +83,7 @@ class BaseAnalyst:
             df = self.calculate_indicators(data)
             feats = ["ret", "ma20_gap", "vol_ratio"]
 
-            model = self.load_or_train(df, feats)
+            model = self.load_or_train(df, feats, symbol)
             pred = float(model.predict(df[feats].iloc[-1:])[0])
 
             return {
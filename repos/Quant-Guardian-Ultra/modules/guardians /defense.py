@@ -1,18 +1,36 @@
+import pandas as pd
 import yfinance as yf
 
+HEDGE_ASSETS = ["GLD", "BIL", "VIXY"]
+
 class DefenseManager:
+    def hedge_returns(self):
+        """
+        避險資產 5 日報酬（取不到資料直接拋出）
+        逐檔 Ticker.history：不經 yf.download 的共用狀態，可與 VIX 並行抓取
+        """
+        data = pd.DataFrame({t: yf.Ticker(t).history(period="5d")["Close"] for t in HEDGE_ASSETS}).dropna()
+        if data.empty:
+            raise ValueError("hedge data empty")
+        return (data.iloc[-1] / data.iloc[0]) - 1
+
+    def sentiment(self) -> float:
+        """
+        避險資產表現 → 市場情緒（-1 ~ 1，給 Guardian signal collector 使用）
+        - 避險資產平均漲 5% ≈ -0.5（與 evaluate() 的 L3 門檻一致）
+        - VIXY 大漲 15% 以上 → -1（對應 L4）
+        """
+        rets = self.hedge_returns()
+        if rets.get("VIXY", 0) > 0.15:
+            return -1.0
+        return float(max(-1.0, min(1.0, -rets.mean() * 10)))
+
     def evaluate(self):
         """
         根據避險資產表現，回傳建議風險等級
         """
         try:
-            assets = ["GLD", "BIL", "VIXY"]
-            data = yf.download(assets, period="5d", progress=False)["Close"]
-
-            if data.empty:
-                return 1
-
-            rets = (data.iloc[-1] / data.iloc[0]) - 1
+            rets = self.hedge_returns()
 
             # 避險資產大漲 → 市場異常
             if rets.get("VIXY", 0) > 0.15:
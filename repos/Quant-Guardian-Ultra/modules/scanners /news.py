@@ -7,7 +7,11 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 STATE_FILE = os.path.join(BASE_DIR, "data", "system", "state.json")
 
 class NewsScanner:
-    def scan(self):
+    def __init__(self):
+        # persist=False 時先暫存本輪新命中的 hash，由 commit() 回寫
+        self._pending_seen = []
+
+    def scan(self, persist: bool = True):
         feed = feedparser.parse(
             "https://news.google.com/rss/search?q=股市+崩盤+戰爭+黑天鵝&hl=zh-TW&gl=TW"
         )
@@ -25,6 +29,7 @@ class NewsScanner:
 
         level = 1
         news_titles = []
+        new_seen = []
 
         keywords = ["崩盤", "戰爭", "暴跌", "黑天鵝", "斷頭", "大跌"]
 
@@ -40,6 +45,32 @@ class NewsScanner:
             level = 4
             news_titles.append(entry.title)
             news_seen.append(news_hash)
+            new_seen.append(news_hash)
+
+        if persist:
+            self._save_seen(new_seen)
+        else:
+            self._pending_seen = new_seen
+
+        return level, news_titles
+
+    def commit(self):
+        """回寫 scan(persist=False) 暫存的新聞 hash（呼叫端確認採用結果後才呼叫）"""
+        pending, self._pending_seen = self._pending_seen, []
+        self._save_seen(pending)
+
+    def _save_seen(self, new_seen):
+        # 重新讀檔再合併，避免蓋掉其他流程在這段期間寫入的 state
+        if os.path.exists(STATE_FILE):
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        else:
+            state = {}
+
+        news_seen = state.get("news_seen", [])
+        if not isinstance(news_seen, list):
+            news_seen = []
+        news_seen += [h for h in new_seen if h not in news_seen]
 
         # cache 上限
         news_seen = news_seen[-50:]
@@ -49,7 +80,17 @@ class NewsScanner:
         if news_seen:
             state["last_news_hash"] = news_seen[-1]
 
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
         with open(STATE_FILE, "w", encoding="utf-8") as f:
             json.dump(state, f, indent=2, ensure_ascii=False)
 
-        return level, news_titles
+    def event_score(self, persist: bool = True) -> float:
+        """
+        新黑天鵝關鍵字新聞 → 事件分數（0 ~ 1，給 Guardian signal collector 使用）
+        一則新命中即 > 0.85（與 scan() 的 L4 判定一致）
+        persist=False：news_seen 暫不回寫，由呼叫端採用後 commit()
+        """
+        _, news_titles = self.scan(persist)
+        if not news_titles:
+            return 0.0
+        return min(1.0, 0.8 + 0.1 * len(news_titles))
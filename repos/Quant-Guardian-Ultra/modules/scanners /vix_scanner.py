@@ -1,21 +1,28 @@
 import yfinance as yf
 
 class VixScanner:
+    def fetch_vix(self) -> float:
+        """
+        最新 VIX 值（原始數值，給 Guardian signal collector 使用）
+        取不到資料直接拋出，由上層決定 fallback
+        """
+        # 獲取 VIX 指數數據（Ticker.history 不經 yf.download 的共用狀態，可與其他來源並行）
+        vix_data = yf.Ticker("^VIX").history(period="1d", interval="1m")
+        if vix_data.empty:
+            raise ValueError("VIX data empty")
+
+        # 確保取到的是單一數值 (最後一筆成交價)
+        # 使用 .iloc[-1] 取得最後一行，['Close'] 取得收盤價，並用 .item() 轉為純數字
+        current_vix = vix_data['Close'].iloc[-1]
+
+        # 如果還是 Series 或 Array，強制轉換
+        if hasattr(current_vix, 'item'):
+            current_vix = current_vix.item()
+        return float(current_vix)
+
     def check_vix(self):
         try:
-            # 獲取 VIX 指數數據
-            vix_data = yf.download("^VIX", period="1d", interval="1m", progress=False)
-            if vix_data.empty:
-                return 1
-            
-            # 確保取到的是單一數值 (最後一筆成交價)
-            # 使用 .iloc[-1] 取得最後一行，['Close'] 取得收盤價，並用 .item() 轉為純數字
-            current_vix = vix_data['Close'].iloc[-1]
-            
-            # 如果還是 Series 或 Array，強制轉換
-            if hasattr(current_vix, 'item'):
-                current_vix = current_vix.item()
-
+            current_vix = self.fetch_vix()
             print(f"📊 當前 VIX 指數: {current_vix:.2f}")
 
             if current_vix > 35: return 4  # 極端恐慌
@@ -1,11 +1,12 @@
 # Vault 冷資料還原執行器（人工 or AI 觸發）
+# archive 可為 pack 成員 id（vault_safe_deleter 回傳的 archived_to）或舊版 .zip 檔名
 
 import sys
 from vault_restore_manager import restore
 
 def main():
     if len(sys.argv) != 3:
-        print("Usage: restore <archive.zip> <target_dir>")
+        print("Usage: restore <archive_id | archive.zip> <target_dir>")
         return
 
     zip_name = sys.argv[1]
@@ -10,15 +10,26 @@
 # ❌ 不碰 LOCKED_*
 # ❌ 不直接聽 Guardian 指令
 # ❌ 無資料 → 不行動
+#
+# 批次模式（main）：
+# - 事件年齡 / 未使用天數 / 類型載入 NumPy 陣列，一次算出權重與分數
+# - 刪除走 delete_vault_events（tombstone 一次追加），稽核只寫一筆
+# - 「連續兩週確認」：首次確認時間存於 LOG/retention_confirm.json，
+#   持續符合條件且 now - 首次確認 >= REQUIRED_WEEKS_CONFIRM 週才放行；中途不符合即重新起算
 # =========================================================
 
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List
+import json
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
 
 from vault_root_guard import assert_vault_ready
 from guardian_state import get_guardian_level
-from vault_event_store import list_vault_events, delete_vault_event
+from vault_event_store import list_vault_events, delete_vault_events
 from vault_backtest_reader import get_recent_hit_rate
 from stock_weight_engine import adaptive_lambda
 
@@ -35,12 +46,32 @@ MIN_UNUSED_DAYS = 90
 MIN_EFFECTIVE_WEIGHT = 0.01
 MIN_DECISION_SCORE = 0.7
 REQUIRED_WEEKS_CONFIRM = 2
+CONFIRM_WINDOW = timedelta(weeks=REQUIRED_WEEKS_CONFIRM)
 
 PROTECTED_TYPES = {
     "black_swan",
     "structural_event"
 }
 
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+CONFIRM_PATH = os.path.join(VAULT_ROOT, "LOG", "retention_confirm.json")
+AUDIT_LOG = os.path.join(VAULT_ROOT, "LOG", "vault_deletion_audit.log")
+
+DAY_SECONDS = 86400
+_EPOCH = datetime(1970, 1, 1)
+
+# 批次評估的拒絕原因（依判斷順序；與 evaluate_event 相同）
+REASONS = (
+    "invalid_event",
+    "protected_type",
+    "no_last_used",
+    "recently_used",
+    "no_created_time",
+    "still_effective",
+    "confirming",
+    "score_too_low",
+)
+
 # ---------------------------------------------------------
 # 核心入口
 # ---------------------------------------------------------
@@ -61,18 +92,152 @@ def main():
         return
 
     now = datetime.utcnow()
-    deletion_candidates: List[Dict] = []
+    confirm = load_confirm_state()
+    result = evaluate_batch(events, hit_rate, now, confirm)
 
-    for event in events:
-        decision = evaluate_event(event, hit_rate, now)
-        if decision["eligible"]:
-            deletion_candidates.append(decision)
+    # 確認狀態先落地：即使刪除中斷，首次確認時間也不會遺失
+    save_confirm_state(result["confirm"])
 
     # -----------------------------------------------------
-    # 執行刪除（已二次確認）
+    # 執行刪除（已二次確認）：一次批次 + 一筆稽核
     # -----------------------------------------------------
-    for d in deletion_candidates:
-        delete_vault_event(d["event_id"])
+    if not result["eligible"]:
+        return
+
+    deleted = delete_vault_events(result["eligible"], reason="retention")
+    write_audit(deleted, result, hit_rate, guardian_level, now)
+
+
+# ---------------------------------------------------------
+# 📦 批次評估（NumPy）
+# ---------------------------------------------------------
+
+def _to_days(dt) -> float:
+    """datetime → epoch 天數（naive 視為 UTC）；無 → NaN"""
+    if not isinstance(dt, datetime):
+        return np.nan
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH).total_seconds() / DAY_SECONDS
+
+
+def _confirm_since(prev: Dict, now: datetime) -> datetime:
+    """首次確認時間；無紀錄 / 舊格式（只有週計數）→ 從 now 重新起算"""
+    try:
+        first = datetime.fromisoformat(prev["first"])
+    except (KeyError, TypeError, ValueError):
+        return now
+    return min(first, now)
+
+
+def evaluate_batch(events: List[Dict], hit_rate: float, now: datetime, confirm: Dict[str, Dict]) -> Dict:
+    """
+    與 evaluate_event 相同的規則，一次評估全部事件
+    confirm：{event_id: {"first": 首次確認 ISO 時間, "last": 最近確認 ISO 時間}}（上次的確認狀態）
+    回傳：
+    {
+        eligible: [event_id],
+        eligible_types: {event_id: type},
+        reasons: {reason: 筆數},
+        confirm: 新的確認狀態（只保留仍在確認階段的事件）
+    }
+    """
+    n = len(events)
+    ids = np.array([e.get("id") or "" for e in events], dtype=object)
+    types = np.array([e.get("type") or "" for e in events], dtype=object)
+    created = np.fromiter((_to_days(e.get("created_at")) for e in events), dtype=np.float64, count=n)
+    last_used = np.fromiter((_to_days(e.get("last_used_at")) for e in events), dtype=np.float64, count=n)
+    today = _to_days(now)
+
+    unused_days = np.floor(today - last_used)
+    age_days = np.floor(today - created)
+    effective_weight = np.exp(-adaptive_lambda(hit_rate) * age_days)
+
+    # ---------- 逐關卡遮罩（NaN 比較為 False，缺值自然落在前一關） ----------
+    invalid = (ids == "") | (types == "")
+    protected = np.isin(types, list(PROTECTED_TYPES))
+    no_last_used = np.isnan(last_used)
+    recently_used = unused_days < MIN_UNUSED_DAYS
+    no_created = np.isnan(created)
+    still_effective = effective_weight >= MIN_EFFECTIVE_WEIGHT
+
+    gates = [invalid, protected, no_last_used, recently_used, no_created, still_effective]
+    stage = np.zeros(n, dtype=np.int8)  # 0 = 通過前面所有關卡，進入確認
+    for i, mask in enumerate(gates, start=1):
+        stage = np.where((stage == 0) & mask, i, stage)
+    confirming = stage == 0
+
+    # ---------- 歷史確認（首次確認滿 CONFIRM_WINDOW 才放行） ----------
+    held = np.zeros(n, dtype=bool)
+    new_confirm: Dict[str, Dict] = {}
+    for i in np.flatnonzero(confirming):
+        eid = ids[i]
+        first = _confirm_since(confirm.get(eid), now)
+        held[i] = now - first >= CONFIRM_WINDOW
+        new_confirm[eid] = {"first": first.isoformat(), "last": now.isoformat()}
+
+    confirmed = confirming & held
+    stage = np.where(confirming & ~confirmed, len(gates) + 1, stage)
+
+    # ---------- 最終分數 ----------
+    score = calculate_decision_score(unused_days, effective_weight, hit_rate)
+    eligible = confirmed & (score >= MIN_DECISION_SCORE)
+    stage = np.where(confirmed & ~eligible, len(gates) + 2, stage)
+
+    eligible_ids = [str(eid) for eid in ids[eligible]]
+    for eid in eligible_ids:
+        new_confirm.pop(eid, None)  # 即將刪除，不再追蹤
+
+    counts = np.bincount(stage, minlength=len(REASONS) + 1)
+    reasons = {REASONS[i - 1]: int(counts[i]) for i in range(1, len(REASONS) + 1) if counts[i]}
+    if eligible_ids:
+        reasons["cold_and_unused"] = len(eligible_ids)
+
+    return {
+        "eligible": eligible_ids,
+        "eligible_types": dict(zip(eligible_ids, types[eligible])),
+        "reasons": reasons,
+        "confirm": new_confirm,
+    }
+
+
+# ---------------------------------------------------------
+# 💾 確認計數 / 稽核
+# ---------------------------------------------------------
+
+def load_confirm_state() -> Dict[str, Dict]:
+    if not os.path.exists(CONFIRM_PATH):
+        return {}
+    try:
+        with open(CONFIRM_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("events", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_confirm_state(confirm: Dict[str, Dict]):
+    os.makedirs(os.path.dirname(CONFIRM_PATH), exist_ok=True)
+    tmp = CONFIRM_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": datetime.utcnow().isoformat(), "events": confirm}, f, ensure_ascii=False)
+    os.replace(tmp, CONFIRM_PATH)
+
+
+def write_audit(deleted: List[str], result: Dict, hit_rate: float,
+                guardian_level: int, now: Optional[datetime] = None):
+    """整批刪除只寫一筆稽核（result = evaluate_batch 回傳值）"""
+    now = now or datetime.utcnow()
+    record = {
+        "deleted": len(deleted),
+        "by_type": dict(Counter(result["eligible_types"].get(eid) for eid in deleted)),
+        "hit_rate": hit_rate,
+        "guardian_level": guardian_level,
+        "reasons": result["reasons"],
+        "event_ids": deleted,
+    }
+    os.makedirs(os.path.dirname(AUDIT_LOG), exist_ok=True)
+    with open(AUDIT_LOG, "a", encoding="utf-8") as f:
+        f.write(f"[{now.isoformat()}] RETENTION_DELETED: {json.dumps(record, ensure_ascii=False)}\n")
 
 
 # ---------------------------------------------------------
@@ -115,18 +280,16 @@ def evaluate_event(event: Dict, hit_rate: float, now: datetime) -> Dict:
 
     age_days = (now - created_at).days
     lambda_val = adaptive_lambda(hit_rate)
-    effective_weight = pow(2.71828, -lambda_val * age_days)
+    effective_weight = math.exp(-lambda_val * age_days)  # 與批次版 np.exp 同一公式
 
     if effective_weight >= MIN_EFFECTIVE_WEIGHT:
         return _reject(event_id, "still_effective")
 
     # ---------- 歷史確認 ----------
-    confirm_weeks = event.get("deletion_confirm_weeks", 0)
-    confirm_weeks += 1
-
-    event["deletion_confirm_weeks"] = confirm_weeks
+    first = _confirm_since({"first": event.get("deletion_confirm_since")}, now)
+    event["deletion_confirm_since"] = first.isoformat()
 
-    if confirm_weeks < REQUIRED_WEEKS_CONFIRM:
+    if now - first < CONFIRM_WINDOW:
         return _reject(event_id, "confirming")
 
     # ---------- 最終分數 ----------
@@ -152,10 +315,10 @@ def evaluate_event(event: Dict, hit_rate: float, now: datetime) -> Dict:
 
 def calculate_decision_score(unused_days, effective_weight, hit_rate):
     """
-    綜合分數 ∈ [0,1]
+    綜合分數 ∈ [0,1]（unused_days / effective_weight 可為純量或陣列）
     """
-    usage_factor = min(1.0, unused_days / 180)
-    decay_factor = min(1.0, 1 - effective_weight)
+    usage_factor = np.minimum(1.0, np.divide(unused_days, 180))
+    decay_factor = np.minimum(1.0, np.subtract(1, effective_weight))
     performance_factor = max(0.0, 1 - hit_rate)
 
     return (
@@ -0,0 +1,315 @@
+# scripts/bar_cache.py
+# 本地增量 OHLCV 快取（safe_download 後端）
+# 職責：
+# - 每檔標的一個 npz 欄式快取（Vault DERIVED/bars）
+# - 只向資料源抓「最後一根快取 K 棒之後」的尾段，合併後落地
+# - npz 記錄涵蓋起點（covered）：請求的歷史長度超過快取涵蓋 → 全量重抓
+# - 快取只保留「曾請求過的最長區間」，隨最新 K 棒往前滑動（不無限長大）
+# - 資料源可插拔：Yahoo（正式）/ Fixture（測試、基準）
+# ❌ 不做特徵 ❌ 不訓練 ❌ 不寫 LOCKED_*
+
+import os
+import warnings
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+# ===============================
+# Paths
+# ===============================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+BAR_CACHE_DIR = os.path.join(VAULT_ROOT, "DERIVED", "bars")
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# 尾段重疊 K 棒的價格容忍度：超過代表除權息 / 分割造成歷史調整價改變 → 全量重抓
+ADJUST_TOLERANCE = 1e-4
+
+_PERIOD_UNITS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+# covered 哨兵：period="max" 抓過 → 涵蓋全部歷史
+COVER_ALL = pd.Timestamp.min
+
+
+def period_to_timedelta(period: str) -> Optional[timedelta]:
+    """
+    yfinance period 字串 → timedelta（"max" 回傳 None）
+    例："5d" / "6mo" / "2y"
+    """
+    period = (period or "max").strip().lower()
+    if period in ("max", "ytd"):
+        return None
+    for unit in sorted(_PERIOD_UNITS, key=len, reverse=True):
+        if period.endswith(unit):
+            try:
+                n = int(period[: -len(unit)])
+            except ValueError:
+                break
+            return timedelta(days=n * _PERIOD_UNITS[unit])
+    raise ValueError(f"unsupported period: {period}")
+
+
+# ===============================
+# Providers
+# ===============================
+
+class YahooProvider:
+    """
+    正式資料源：yfinance（延遲匯入，Fixture 模式不需要安裝）
+    """
+
+    def fetch(
+        self,
+        symbols: List[str],
+        start: Optional[pd.Timestamp] = None,
+        period: str = "2y",
+        auto_adjust: bool = True,
+    ) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        kwargs = {"start": start.strftime("%Y-%m-%d")} if start is not None else {"period": period}
+        df = yf.download(
+            symbols,
+            auto_adjust=auto_adjust,
+            group_by="ticker",
+            progress=False,
+            threads=True,
+            **kwargs,
+        )
+        if df is None or df.empty:
+            return {}
+
+        out = {}
+        multi = isinstance(df.columns, pd.MultiIndex)
+        for s in symbols:
+            try:
+                part = df[s] if multi else df
+            except KeyError:
+                continue
+            part = part.reindex(columns=FIELDS).dropna(how="all")
+            if not part.empty:
+                out[s] = part
+        return out
+
+
+class FixtureProvider:
+    """
+    本地資料源：測試 / 基準用，取代 Yahoo
+    - root：目錄，內含 <SYMBOL>.csv（Date 索引 + OHLCV 欄位）
+    - frames：或直接給 {symbol: DataFrame}
+    calls 記錄每次 fetch 的 (symbols, start)，方便驗證只抓尾段
+    """
+
+    def __init__(self, root: Optional[str] = None, frames: Optional[Dict[str, pd.DataFrame]] = None):
+        self.root = root
+        self.frames = dict(frames or {})
+        self.calls = []
+
+    def _load(self, symbol: str) -> Optional[pd.DataFrame]:
+        if symbol in self.frames:
+            return self.frames[symbol]
+        if self.root:
+            path = os.path.join(self.root, f"{symbol}.csv")
+            if os.path.exists(path):
+                df = pd.read_csv(path, index_col=0, parse_dates=True)
+                self.frames[symbol] = df
+                return df
+        return None
+
+    def fetch(
+        self,
+        symbols: List[str],
+        start: Optional[pd.Timestamp] = None,
+        period: str = "2y",
+        auto_adjust: bool = True,
+    ) -> Dict[str, pd.DataFrame]:
+        self.calls.append((list(symbols), start))
+        out = {}
+        for s in symbols:
+            df = self._load(s)
+            if df is None or df.empty:
+                continue
+            df = df.reindex(columns=FIELDS).sort_index()
+            if start is not None:
+                df = df[df.index >= start]
+            else:
+                span = period_to_timedelta(period)
+                if span is not None:
+                    df = df[df.index >= df.index[-1] - span]
+            if not df.empty:
+                out[s] = df
+        return out
+
+
+# ===============================
+# Cache
+# ===============================
+
+class BarCache:
+    """
+    每檔標的 npz 欄式快取：index(datetime64[ns]) + OHLCV(float64)
+    """
+
+    def __init__(self, root: str = BAR_CACHE_DIR, provider=None):
+        self.root = root
+        self.provider = provider or YahooProvider()
+
+    # ---------- 檔案層 ----------
+
+    def _path(self, symbol: str, auto_adjust: bool) -> str:
+        sub = "adj" if auto_adjust else "raw"
+        return os.path.join(self.root, sub, f"{symbol}.npz")
+
+    def _load(self, symbol: str, auto_adjust: bool) -> Tuple[Optional[pd.DataFrame], Optional[pd.Timestamp]]:
+        """(快取, 涵蓋起點)；舊版 npz 沒有 covered → 以第一根 K 棒為準"""
+        path = self._path(symbol, auto_adjust)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with np.load(path) as z:
+                index = pd.DatetimeIndex(z["index"])
+                df = pd.DataFrame({f: z[f] for f in FIELDS}, index=index)
+                if "covered" in z.files:
+                    covered = pd.Timestamp(z["covered"][()])
+                else:
+                    covered = index[0] if len(index) else None
+                return df, covered
+        except Exception:
+            return None, None
+
+    def load(self, symbol: str, auto_adjust: bool = True) -> Optional[pd.DataFrame]:
+        return self._load(symbol, auto_adjust)[0]
+
+    def save(self, symbol: str, df: pd.DataFrame, auto_adjust: bool = True, covered: Optional[pd.Timestamp] = None):
+        """covered：快取涵蓋起點（請求的起始日，可能早於第一根 K 棒）；預設第一根"""
+        path = self._path(symbol, auto_adjust)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        arrays = {f: df[f].to_numpy(dtype="float64") for f in FIELDS}
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        if covered is None:
+            covered = index[0]
+        np.savez(
+            tmp,
+            index=index.values.astype("datetime64[ns]"),
+            covered=np.datetime64(pd.Timestamp(covered).to_datetime64(), "ns"),
+            **arrays,
+        )
+        os.replace(tmp, path)
+
+    # ---------- 增量更新 ----------
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.reindex(columns=FIELDS)
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            df.index = index.tz_localize(None)
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def _tail_start(cached: Optional[pd.DataFrame]) -> Optional[pd.Timestamp]:
+        """
+        尾段起點：倒數第二根快取 K 棒
+        - 最後一根可能是盤中未收，必須重抓
+        - 多重疊一根已收盤 K 棒，用來偵測除權息 / 分割的調整價改變
+        """
+        if cached is None or cached.empty:
+            return None
+        return cached.index[-2] if len(cached) > 1 else cached.index[-1]
+
+    @staticmethod
+    def _needs_full_refresh(cached: pd.DataFrame, tail: pd.DataFrame) -> bool:
+        overlap = cached.index.intersection(tail.index)
+        if overlap.empty:
+            # 尾段與快取沒有接縫，無法確認調整價一致
+            return True
+        settled = overlap[overlap < cached.index[-1]]
+        if settled.empty:
+            return False
+        old = cached.loc[settled, "Close"].to_numpy()
+        new = tail.loc[settled, "Close"].to_numpy()
+        return bool(np.any(np.abs(new / old - 1) > ADJUST_TOLERANCE))
+
+    def get_many(
+        self,
+        symbols: List[str],
+        period: str = "2y",
+        auto_adjust: bool = True,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        回傳 {symbol: OHLCV DataFrame}
+        - 快取命中且涵蓋 period → 只抓尾段（依起始日分組，一組一次 fetch）
+        - 無快取 / period 超過快取涵蓋 / 調整價改變 → 全量重抓
+        - 資料源失敗 → 退回既有快取（可能略舊）
+        """
+        span = period_to_timedelta(period)
+        cached: Dict[str, Optional[pd.DataFrame]] = {}
+        # 每檔要保留的區間長度（None = 全部歷史）：max(快取已涵蓋, 本次請求)
+        keep: Dict[str, Optional[timedelta]] = {}
+
+        # 依起始日分組：同一次 cron 更新過的標的會落在同一組；None = 全量抓 period
+        groups: Dict[Optional[pd.Timestamp], List[str]] = {}
+        for s in symbols:
+            df, covered = self._load(s, auto_adjust)
+            cached[s] = df
+            if df is None or df.empty:
+                keep[s] = span
+                groups.setdefault(None, []).append(s)
+                continue
+            held = None if covered is None or covered <= COVER_ALL else df.index[-1] - covered
+            keep[s] = None if held is None or span is None else max(held, span)
+            short = held is not None and (span is None or held < span)
+            groups.setdefault(None if short else self._tail_start(df), []).append(s)
+
+        fetched: Dict[str, pd.DataFrame] = {}
+        full_refresh = []
+        for start, group in groups.items():
+            try:
+                part = self.provider.fetch(group, start=start, period=period, auto_adjust=auto_adjust)
+            except Exception as e:
+                print(f"[WARN] bar provider failed ({len(group)} symbols): {e}")
+                continue
+            part = {s: self._normalize(df) for s, df in part.items()}
+            if start is None:
+                fetched.update(part)
+                continue
+            for s, tail in part.items():
+                if self._needs_full_refresh(cached[s], tail):
+                    full_refresh.append(s)
+                else:
+                    fetched[s] = pd.concat([cached[s][cached[s].index < tail.index[0]], tail])
+
+        # 調整價改變：依保留區間重抓（可能長於本次 period）
+        refresh: Dict[Optional[pd.Timestamp], List[str]] = {}
+        for s in full_refresh:
+            start = cached[s].index[-1] - keep[s] if keep[s] is not None else None
+            refresh.setdefault(start, []).append(s)
+        for start, group in refresh.items():
+            try:
+                part = self.provider.fetch(group, start=start, period="max" if start is None else period, auto_adjust=auto_adjust)
+                fetched.update({s: self._normalize(df) for s, df in part.items()})
+            except Exception as e:
+                print(f"[WARN] bar provider full refresh failed: {e}")
+
+        out = {}
+        for s in symbols:
+            df = fetched.get(s)
+            if df is None:
+                df = cached[s]
+                if df is None or df.empty:
+                    continue
+            else:
+                covered = COVER_ALL if keep[s] is None else df.index[-1] - keep[s]
+                df = df[df.index >= covered]
+                self.save(s, df, auto_adjust, covered)
+            if span is not None:
+                df = df[df.index >= df.index[-1] - span]
+            out[s] = df
+        return out
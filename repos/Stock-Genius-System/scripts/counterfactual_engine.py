@@ -0,0 +1,152 @@
+# scripts/counterfactual_engine.py
+# L4 反事實分析引擎（價格面板 join）
+# 職責：
+# - 一次載入所有相關標的、涵蓋全部事件區間的調整後收盤面板
+# - 交易日只索引一次，模擬報酬全部以陣列查表計算
+# - 一次算完所有 L4 事件的前 / 後統計
+# ❌ 不發通知 ❌ 不寫檔
+
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+LOOKBACK_DAYS = 5
+LOOKFORWARD_DAYS = 5
+
+# 與舊版 calc_return 相同：下載 [start, start + days + 3) 的日曆視窗
+WINDOW_PAD_DAYS = 3
+
+
+def load_close_panel(symbols: List[str], start, end) -> pd.DataFrame:
+    """調整後收盤寬表（日期 × 標的），[start, end)"""
+    import yfinance as yf
+
+    px = yf.download(
+        symbols,
+        start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+        end=pd.Timestamp(end).strftime("%Y-%m-%d"),
+        auto_adjust=True,
+        progress=False,
+        threads=True,
+    )["Close"]
+    if isinstance(px, pd.Series):
+        px = px.to_frame(symbols[0])
+    return px
+
+
+def simulate_returns(
+    symbols: pd.Series,
+    starts: pd.Series,
+    panel: pd.DataFrame,
+    days: int = LOOKFORWARD_DAYS,
+) -> np.ndarray:
+    """
+    每列 (symbol, start) 的 days 根交易日報酬：close[i0 + days] / close[i0] - 1
+    i0 = start 當日或之後第一根 K 棒；第 days 根必須落在 start + days + 3 日曆天內
+    （與逐列 yf.download 的舊版結果一致），否則 NaN
+    """
+    out = np.full(len(symbols), np.nan)
+    if panel is None or panel.empty:
+        return out
+
+    dates = pd.DatetimeIndex(panel.index).tz_localize(None).normalize().values
+    starts = pd.to_datetime(starts).dt.normalize().values
+    limit = starts + np.timedelta64(days + WINDOW_PAD_DAYS, "D")
+
+    col_of = {s: j for j, s in enumerate(panel.columns)}
+    values = panel.to_numpy(dtype="float64")
+    cols = np.array([col_of.get(s, -1) for s in symbols])
+
+    for j in np.unique(cols[cols >= 0]):
+        rows = np.flatnonzero(cols == j)
+        ok_bar = ~np.isnan(values[:, j])
+        d, c = dates[ok_bar], values[ok_bar, j]
+        if len(d) == 0:
+            continue
+        i0 = np.searchsorted(d, starts[rows], side="left")
+        i1 = i0 + days
+        valid = i1 < len(d)
+        valid[valid] &= d[i1[valid]] < limit[rows[valid]]
+        out[rows[valid]] = c[i1[valid]] / c[i0[valid]] - 1
+    return out
+
+
+def _window_mean(sorted_dates: np.ndarray, csum: np.ndarray, ccnt: np.ndarray, lo, hi, left: str, right: str):
+    a = np.searchsorted(sorted_dates, lo, side=left)
+    b = np.searchsorted(sorted_dates, hi, side=right)
+    n = ccnt[b] - ccnt[a]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n > 0, (csum[b] - csum[a]) / n, np.nan)
+
+
+def run_counterfactual(
+    events: pd.DataFrame,
+    ai: pd.DataFrame,
+    loader: Optional[Callable] = None,
+    lookback: int = LOOKBACK_DAYS,
+    lookforward: int = LOOKFORWARD_DAYS,
+) -> pd.DataFrame:
+    """
+    events：L4 事件（datetime / market）
+    ai：AI 歷史（date / symbol / pred_ret）
+    回傳每個事件的 normal_ai_avg_pred / simulated_ai_return_if_continue
+    """
+    loader = loader or load_close_panel
+    cols = ["l4_datetime", "market", "normal_ai_avg_pred", "simulated_ai_return_if_continue", "ai_paused"]
+    if events.empty:
+        return pd.DataFrame(columns=cols)
+
+    ai = ai.copy()
+    ai["date"] = pd.to_datetime(ai["date"]).dt.normalize()
+    ai = ai.sort_values("date", kind="stable").reset_index(drop=True)
+    ai_dates = ai["date"].values
+
+    # 逐筆解析：黑天鵝紀錄的時間格式不一定一致
+    l4 = pd.DatetimeIndex(events["datetime"].map(pd.Timestamp)).normalize().values
+    lb = np.timedelta64(lookback, "D")
+    lf = np.timedelta64(lookforward, "D")
+
+    # 1) 所有事件的 after 視窗聯集 → 只需模擬這些列，每列只算一次
+    a = np.searchsorted(ai_dates, l4, side="right")
+    b = np.searchsorted(ai_dates, l4 + lf, side="right")
+    involved = np.zeros(len(ai) + 1, dtype="int64")
+    np.add.at(involved, a, 1)
+    np.add.at(involved, b, -1)
+    involved = np.cumsum(involved)[:-1] > 0
+
+    sim = np.full(len(ai), np.nan)
+    if involved.any():
+        rows = ai[involved]
+        start = rows["date"].min()
+        end = rows["date"].max() + pd.Timedelta(days=lookforward + WINDOW_PAD_DAYS)
+        try:
+            panel = loader(sorted(rows["symbol"].unique()), start, end)
+        except Exception:
+            panel = None
+        sim[involved] = simulate_returns(rows["symbol"], rows["date"], panel, lookforward)
+
+    # 2) 前綴和 → 每個事件的視窗平均都是 O(log n)
+    def prefix(v):
+        ok = ~np.isnan(v)
+        return (
+            np.concatenate([[0.0], np.cumsum(np.where(ok, v, 0.0))]),
+            np.concatenate([[0], np.cumsum(ok)]),
+        )
+
+    pred_sum, pred_cnt = prefix(ai["pred_ret"].to_numpy(dtype="float64"))
+    sim_sum, sim_cnt = prefix(sim)
+
+    normal = _window_mean(ai_dates, pred_sum, pred_cnt, l4 - lb, l4, "left", "left")
+    simulated = _window_mean(ai_dates, sim_sum, sim_cnt, l4, l4 + lf, "right", "right")
+
+    def fmt(v):
+        return round(float(v), 4) if v and not np.isnan(v) else None
+
+    return pd.DataFrame({
+        "l4_datetime": events["datetime"].to_numpy(),
+        "market": events["market"].to_numpy(),
+        "normal_ai_avg_pred": [fmt(v) for v in normal],
+        "simulated_ai_return_if_continue": [fmt(v) for v in simulated],
+        "ai_paused": True,
+    }, columns=cols)
@@ -0,0 +1,64 @@
+# scripts/explorer_config.py
+# Explorer 市場設定（本地備援）
+# - 正式設定在 Orchestrator 的 vault/config.py MARKET_CONFIG；
+#   單獨 checkout 本 repo（PYTHONPATH 沒有 Orchestrator Root）時 explorer_engine 改用這份
+# - 結構與 MARKET_CONFIG 相同（只含 explorer 區塊）；調整時兩邊一起改
+
+MARKET_CONFIG = {
+    "TW": {
+        "explorer": {
+            "name": "台股",  # 報告標題用市場名稱
+            "core_title": "台股核心監控（固定顯示）",
+            "core_watch": ["2330.TW", "2317.TW", "2454.TW", "2308.TW", "2412.TW"],  # 固定顯示的核心股
+            "pool_file": "explorer_pool_tw.json",  # data/ 下的 Explorer 股池
+            "history_file": "tw_history.csv",  # data/ 下的回測歷史
+            "webhook_env": "DISCORD_WEBHOOK_TW",
+            "strip_suffix": ".TW",  # 顯示時去除的代碼後綴
+            "max_symbols": 500,  # 單輪最多處理標的數
+            "max_inflight": 2,  # 共用訓練池中同時訓練的上限
+            "fit_timeout": 60,  # 單檔訓練秒數上限
+        }
+    },
+    "US": {
+        "explorer": {
+            "name": "美股",
+            "core_title": "Magnificent 7 監控（固定顯示）",
+            "core_watch": ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA"],
+            "pool_file": "explorer_pool_us.json",
+            "history_file": "us_history.csv",
+            "webhook_env": "DISCORD_WEBHOOK_US",
+            "strip_suffix": "",
+            "max_symbols": 500,
+            "max_inflight": 2,
+            "fit_timeout": 60,
+        }
+    },
+    "JP": {
+        "explorer": {
+            "name": "日股",
+            "core_title": "日股核心監控（固定顯示）",
+            "core_watch": ["7203.T", "6758.T", "9984.T", "8306.T"],
+            "pool_file": "explorer_pool_jp.json",
+            "history_file": "jp_history.csv",
+            "webhook_env": "DISCORD_WEBHOOK_JP",
+            "strip_suffix": ".T",
+            "max_symbols": 300,
+            "max_inflight": 1,
+            "fit_timeout": 60,
+        }
+    },
+    "CRYPTO": {
+        "explorer": {
+            "name": "加密貨幣",
+            "core_title": "加密貨幣核心監控（固定顯示）",
+            "core_watch": ["BTC-USD", "ETH-USD", "SOL-USD"],
+            "pool_file": "explorer_pool_crypto.json",
+            "history_file": "crypto_history.csv",
+            "webhook_env": "DISCORD_WEBHOOK_CRYPTO",
+            "strip_suffix": "-USD",
+            "max_symbols": 100,
+            "max_inflight": 1,
+            "fit_timeout": 60,
+        }
+    },
+}
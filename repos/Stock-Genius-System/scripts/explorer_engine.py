@@ -0,0 +1,206 @@
+# scripts/explorer_engine.py
+# 多市場 Explorer 引擎（vault/config.py MARKET_CONFIG 驅動）
+# 職責：
+# - 單一行程跑完 TW / US / JP / CRYPTO：共用 K 棒快取、共用訓練池
+# - 每市場資源上限：max_symbols（標的數）/ max_inflight（同時訓練數）/ fit_timeout
+# - 排序完整 Explorer 股池（不再截斷 symbols[:100]）
+# ❌ 不交易 ❌ 不寫 LOCKED_*
+#
+# 用法：
+#   python scripts/explorer_engine.py            # 全部市場
+#   python scripts/explorer_engine.py US TW      # 指定市場
+
+import os
+import sys
+import heapq
+import warnings
+import requests
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# ===== Path Fix =====
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from scripts.safe_yfinance import safe_download
+from scripts.panel_features import build_panel, MIN_BARS
+from scripts.train_pool import FitTask, iter_fit
+from scripts.explorer_pool import load_pool
+
+# ===== Orchestrator 共用模組 =====
+# 需由呼叫端讓 Orchestrator Root 可匯入（PYTHONPATH）；匯入不到 → 本地設定 / 直接送出 / 不用 registry
+try:
+    from vault.config import MARKET_CONFIG
+except Exception:
+    from scripts.explorer_config import MARKET_CONFIG
+try:
+    from notify.delivery import submit
+except Exception:
+    submit = None
+try:
+    from vault.model_registry import ModelRegistry
+except Exception:
+    ModelRegistry = None
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+os.makedirs(DATA_DIR, exist_ok=True)
+
+L4_ACTIVE_FILE = os.path.join(DATA_DIR, "l4_active.flag")
+HORIZON = 5  # 🔒 Freeze
+TOP_N = 5
+
+# ===============================
+# Universe
+# ===============================
+def market_universe(cfg: dict, pool: List[str]) -> List[str]:
+    """核心股永遠保留，其餘依股池順序補到 max_symbols"""
+    core = list(cfg["core_watch"])
+    seen = set(core)
+    extra = [s for s in pool if not (s in seen or seen.add(s))]
+    room = max(cfg.get("max_symbols", len(core)) - len(core), 0)
+    return core + extra[:room]
+
+# ===============================
+# Report
+# ===============================
+def _line(sym: str, r: dict) -> str:
+    emoji = "📈" if r["pred"] > 0 else "📉"
+    return (
+        f"{emoji} {sym}：預估 {r['pred']:+.2%}\n"
+        f"└ 現價 {r['price']}（支撐 {r['sup']} / 壓力 {r['res']}）\n"
+    )
+
+
+def format_report(cfg: dict, results: Dict[str, dict], pool: List[str]) -> str:
+    suffix = cfg.get("strip_suffix") or ""
+
+    def show(s):
+        return s[: -len(suffix)] if suffix and s.endswith(suffix) else s
+
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    msg = (
+        f"📊 {cfg['name']} AI 進階預測報告 ({date_str})\n"
+        f"------------------------------------------\n\n"
+    )
+
+    # 🔍 Explorer：完整股池排序，只取前 TOP_N（heap，不全排序）
+    hits = [(s, results[s]) for s in pool if s in results]
+    top = heapq.nlargest(TOP_N, hits, key=lambda x: x[1]["pred"])
+    if top:
+        msg += f"🔍 AI 海選 Top {TOP_N}（潛力股）\n"
+        for s, r in top:
+            msg += _line(show(s), r)
+        msg += "\n"
+
+    # 👁 Core
+    msg += f"👁 {cfg['core_title']}\n"
+    core_hits = [(s, results[s]) for s in cfg["core_watch"] if s in results]
+    for s, r in sorted(core_hits, key=lambda x: x[1]["pred"], reverse=True):
+        msg += _line(show(s), r)
+
+    # 📊 Backtest
+    history = os.path.join(DATA_DIR, cfg["history_file"])
+    if os.path.exists(history):
+        try:
+            hist = pd.read_csv(history).tail(50)
+            win = hist[hist["pred_ret"] > 0]
+            msg += (
+                "\n------------------------------------------\n"
+                f"📊 {cfg['name']}｜近 5 日回測結算（歷史觀測）\n\n"
+                f"交易筆數：{len(hist)}\n"
+                f"命中率：{len(win)/len(hist)*100:.1f}%\n"
+                f"平均報酬：{hist['pred_ret'].mean():+.2%}\n"
+                f"最大回撤：{hist['pred_ret'].min():+.2%}\n\n"
+                "📌 本結算僅為歷史統計觀測，不影響任何即時預測或系統行為\n"
+            )
+        except Exception:
+            pass
+
+    msg += "\n💡 模型為機率推估，僅供研究參考，非投資建議。"
+    return msg
+
+# ===============================
+# Pipeline
+# ===============================
+def prepare_market(market: str, cfg: dict):
+    """下載 + 特徵 → (pool, panel, tasks)；資料失敗回傳 None"""
+    pool = load_pool(cfg)
+    universe = market_universe(cfg, pool)
+    data = safe_download(universe)
+    if data is None:
+        print(f"[INFO] {market} AI skipped (data failure)")
+        return None
+
+    panel = build_panel(data, universe, horizon=HORIZON)
+    tasks = []
+    for s in panel.usable(MIN_BARS):
+        X, y = panel.train_xy(s)
+        tasks.append(FitTask(
+            symbol=s, X=X, y=y, x_last=panel.latest_x(s),
+            group=market, timeout=cfg.get("fit_timeout"),
+        ))
+    return pool, panel, tasks
+
+
+def _post(webhook: str, payload: dict):
+    if submit is not None:
+        submit(webhook, payload)
+        return
+    try:
+        requests.post(webhook, json=payload, timeout=15)
+    except Exception as e:
+        print(f"[WARN] Discord post failed: {e}")
+
+
+def run(markets: Optional[List[str]] = None, post: bool = True) -> Dict[str, Dict[str, dict]]:
+    """
+    回傳 {market: {symbol: {"pred", "price", "sup", "res"}}}
+    """
+    if os.path.exists(L4_ACTIVE_FILE):
+        return {}
+
+    markets = [m for m in (markets or MARKET_CONFIG) if "explorer" in MARKET_CONFIG.get(m, {})]
+    prepared, tasks = {}, []
+    for m in markets:
+        cfg = MARKET_CONFIG[m]["explorer"]
+        p = prepare_market(m, cfg)
+        if p is None:
+            continue
+        prepared[m] = p
+        tasks.extend(p[2])
+
+    # 一個訓練池跑完所有市場，每市場同時在跑的數量受 max_inflight 限制
+    caps = {m: MARKET_CONFIG[m]["explorer"].get("max_inflight", 1) for m in prepared}
+    registry = ModelRegistry() if ModelRegistry else None
+    results: Dict[str, Dict[str, dict]] = {m: {} for m in prepared}
+
+    for r in iter_fit(tasks, registry=registry, group_caps=caps):
+        if r["status"] != "ok":
+            print(f"[WARN] {r['group']} {r['symbol']} fit {r['status']}")
+            continue
+        panel = prepared[r["group"]][1]
+        j = panel.col(r["symbol"])
+        results[r["group"]][r["symbol"]] = {
+            "pred": r["pred"],
+            "price": float(panel.price[j]),
+            "sup": float(panel.sup[j]),
+            "res": float(panel.res[j]),
+        }
+
+    for m, res in results.items():
+        if not res or not post:
+            continue
+        cfg = MARKET_CONFIG[m]["explorer"]
+        webhook = os.getenv(cfg["webhook_env"], "").strip()
+        if webhook:
+            msg = format_report(cfg, res, prepared[m][0])
+            _post(webhook, {"content": msg[:1900]})
+
+    return results
+
+
+if __name__ == "__main__":
+    run([m.upper() for m in sys.argv[1:]] or None)
@@ -0,0 +1,44 @@
+# scripts/explorer_pool.py
+# Explorer 股池檔（data/<pool_file>，格式 {"symbols": [...], "updated_at"}）
+# 職責：
+# - explorer_engine 讀取股池；update_*_explorer_pool 掃描後寫回
+# - 只依賴標準函式庫（更新器讀寫股池不必載入訓練 / 通知模組）
+# ❌ 不下載 ❌ 不評分
+
+import os
+import json
+from datetime import datetime
+from typing import List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR, "data")
+
+
+def pool_path(cfg: dict) -> str:
+    return os.path.join(DATA_DIR, cfg["pool_file"])
+
+
+def load_pool(cfg: dict) -> List[str]:
+    path = pool_path(cfg)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return list(json.load(f).get("symbols", []))
+    except Exception:
+        return []
+
+
+def save_pool(cfg: dict, symbols: List[str]):
+    """原子寫入（先寫 .tmp 再 rename），空清單不覆寫既有股池"""
+    if not symbols:
+        return
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = pool_path(cfg)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "symbols": list(dict.fromkeys(symbols)),
+            "updated_at": datetime.utcnow().isoformat(),
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
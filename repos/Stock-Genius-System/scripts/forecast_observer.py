@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import yfinance as yf
@@ -8,18 +9,79 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 
 OUT_FILE = os.path.join(DATA_DIR, "forecast_observation.csv")
 
-def settle(history_path: str, market: str):
-    if not os.path.exists(history_path):
-        return
+def fetch_close(symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+    """單檔收盤序列 [start, end)，可替換為本地資料源"""
+    px = yf.download(
+        symbol,
+        start=start.strftime("%Y-%m-%d"),
+        end=end.strftime("%Y-%m-%d"),
+        progress=False,
+        auto_adjust=True,
+    )["Close"]
+    if isinstance(px, pd.DataFrame):
+        px = px.iloc[:, 0]
+    return px.dropna()
 
-    df = pd.read_csv(history_path)
-    if "settled" not in df.columns:
-        return
 
-    pending = df[df["settled"] == False]
-    if pending.empty:
-        return
+def _settle_bulk(df: pd.DataFrame, pending: pd.DataFrame, market: str, fetch=fetch_close):
+    """
+    批次結算：
+    1) 依 symbol 分組
+    2) 每檔只抓一次價格，涵蓋該檔所有 entry ~ settle 視窗的聯集
+    3) 以 searchsorted 向量化找每列的進場 / 結算 K 棒
+    只結算「結算日已過」的列（避免用未收完的視窗提前結算）
+    """
+    entry = pd.to_datetime(pending["date"]).dt.normalize()
+    horizon = pending["horizon"].fillna(5).astype(int) if "horizon" in pending else pd.Series(5, index=pending.index)
+    settle_date = entry + pd.to_timedelta(horizon, unit="D")
+    today = pd.Timestamp(datetime.now().date())
+
+    real_ret = pd.Series(np.nan, index=pending.index)
+    for symbol, idx in pending.groupby("symbol").groups.items():
+        idx = idx[(settle_date[idx] < today).to_numpy()]
+        if len(idx) == 0:
+            continue
+        try:
+            px = fetch(symbol, entry[idx].min(), settle_date[idx].max() + timedelta(days=1))
+        except Exception:
+            continue
+        if len(px) < 2:
+            continue
+
+        d = pd.DatetimeIndex(px.index).tz_localize(None).normalize().values
+        c = px.to_numpy(dtype="float64")
+        i0 = np.searchsorted(d, entry[idx].values, side="left")
+        i1 = np.searchsorted(d, settle_date[idx].values, side="right") - 1
+        ok = i1 - i0 >= 1
+        r = np.full(len(idx), np.nan)
+        r[ok] = c[i1[ok]] / c[i0[ok]] - 1
+        real_ret[idx] = r
+
+    done = real_ret.notna()
+    if not done.any():
+        return []
+
+    idx = real_ret.index[done]
+    ret = real_ret[idx].round(4)
+    hit = (real_ret[idx] > 0).astype(int)
 
+    df.loc[idx, "settled"] = True
+    df.loc[idx, "real_ret"] = ret
+    df.loc[idx, "hit"] = hit
+
+    return pd.DataFrame({
+        "market": market,
+        "symbol": pending.loc[idx, "symbol"],
+        "horizon": horizon[idx],
+        "forecast_ret": pending.loc[idx, "pred_ret"],
+        "real_ret": ret,
+        "hit": hit,
+        "settle_date": settle_date[idx].dt.date,
+    }).to_dict("records")
+
+
+def _settle_rows(df: pd.DataFrame, pending: pd.DataFrame, market: str):
+    """逐列結算（舊模式，保留作為對照）"""
     rows = []
     for _, r in pending.iterrows():
         symbol = r["symbol"]
@@ -59,6 +121,26 @@ def settle(history_path: str, market: str):
         except Exception:
             continue
 
+    return rows
+
+
+def settle(history_path: str, market: str, bulk: bool = True):
+    if not os.path.exists(history_path):
+        return
+
+    df = pd.read_csv(history_path)
+    if "settled" not in df.columns:
+        return
+
+    pending = df[df["settled"] == False]
+    if pending.empty:
+        return
+
+    if bulk:
+        rows = _settle_bulk(df, pending, market)
+    else:
+        rows = _settle_rows(df, pending, market)
+
     if rows:
         pd.DataFrame(rows).to_csv(
             OUT_FILE,
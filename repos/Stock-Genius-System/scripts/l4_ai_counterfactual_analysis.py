@@ -4,10 +4,10 @@ check_guardian()
 # =================================
 import os
 import pandas as pd
-import yfinance as yf
-import datetime
 import requests
 
+from counterfactual_engine import run_counterfactual
+
 # ===============================
 # Base
 # ===============================
@@ -25,24 +25,6 @@ DISCORD_WEBHOOK_URL = os.getenv("BLACK_SWAN_WEBHOOK_URL", "").strip()
 LOOKBACK_DAYS = 5
 LOOKFORWARD_DAYS = 5
 
-# ===============================
-# Utils
-# ===============================
-def calc_return(symbol, start_date, days):
-    try:
-        df = yf.download(
-            symbol,
-            start=start_date,
-            end=start_date + datetime.timedelta(days=days + 3),
-            auto_adjust=True,
-            progress=False,
-        )
-        if len(df) < days + 1:
-            return None
-        return (df["Close"].iloc[days] - df["Close"].iloc[0]) / df["Close"].iloc[0]
-    except:
-        return None
-
 # ===============================
 # Main
 # ===============================
@@ -65,49 +47,14 @@ def run():
             ai_hist.append(df)
 
     ai = pd.concat(ai_hist, ignore_index=True)
-    ai["date"] = pd.to_datetime(ai["date"])
-
-    rows = []
-
-    for _, row in bs.iterrows():
-        l4_time = pd.to_datetime(row["datetime"])
-        l4_date = l4_time.date()
-
-        before = ai[
-            (ai["date"] >= l4_date - datetime.timedelta(days=LOOKBACK_DAYS))
-            & (ai["date"] < l4_date)
-        ]
-
-        after = ai[
-            (ai["date"] > l4_date)
-            & (ai["date"] <= l4_date + datetime.timedelta(days=LOOKFORWARD_DAYS))
-        ]
-
-        # 正常 AI 報酬
-        normal_ret = before["pred_ret"].mean() if not before.empty else None
-
-        # 假設 L4 後繼續 AI
-        sim_rets = []
-        for _, r in after.iterrows():
-            ret = calc_return(
-                r["symbol"],
-                pd.to_datetime(r["date"]),
-                LOOKFORWARD_DAYS,
-            )
-            if ret is not None:
-                sim_rets.append(ret)
-
-        simulated_ret = sum(sim_rets) / len(sim_rets) if sim_rets else None
-
-        rows.append({
-            "l4_datetime": row["datetime"],
-            "market": row["market"],
-            "normal_ai_avg_pred": round(normal_ret, 4) if normal_ret else None,
-            "simulated_ai_return_if_continue": round(simulated_ret, 4) if simulated_ret else None,
-            "ai_paused": True,
-        })
 
-    out = pd.DataFrame(rows)
+    # 一次載入價格面板，所有事件的前 / 後統計一次算完
+    out = run_counterfactual(
+        bs,
+        ai,
+        lookback=LOOKBACK_DAYS,
+        lookforward=LOOKFORWARD_DAYS,
+    )
     out.to_csv(OUTPUT, index=False)
 
     # ===============================
@@ -0,0 +1,172 @@
+# scripts/panel_features.py
+# Explorer 面板特徵引擎（time × symbol 一次向量化）
+# 職責：
+# - 吃 safe_download(group_by="ticker") 回傳的寬表
+# - 一次 NumPy 計算全部標的的 mom20 / bias / vol_ratio / HORIZON target / 支撐壓力
+# - 輸出對齊好的特徵張量，直接餵訓練與推論
+# ❌ 不訓練 ❌ 不下載 ❌ 不寫檔
+#
+# 對齊方式：每檔標的先做 dropna（與舊版逐檔 data[s].dropna() 相同），
+# 再把有效 K 棒「靠底對齊」進 (T × S) 陣列，上方以 NaN 補齊。
+# 這樣 shift / rolling 都只是整列位移，結果與逐檔 pandas 計算一致。
+#
+# 盤中未收的 K 棒（日期 >= session_cutoff，預設今天）不當 target：
+# 收盤價還在變 → 訓練資料指紋每輪都變，model_registry 無法重用 / 熱啟動。
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATS = ["mom20", "bias", "vol_ratio"]
+HORIZON = 5  # 🔒 Freeze
+WINDOW = 20
+MIN_BARS = 120
+
+_FIELDS = ["High", "Low", "Close", "Volume"]
+
+
+@dataclass
+class FeaturePanel:
+    symbols: List[str]
+    dates: np.ndarray      # (T, S) datetime64，NaT = 補齊列
+    X: np.ndarray          # (T, S, F) 特徵
+    y: np.ndarray          # (T, S) HORIZON 報酬 target
+    train_mask: np.ndarray  # (T, S) 可訓練列（特徵與 target 皆有效）
+    n_bars: np.ndarray     # (S,) 有效 K 棒數
+    price: np.ndarray      # (S,) 最新收盤
+    sup: np.ndarray        # (S,) 近 20 根 pivot 支撐
+    res: np.ndarray        # (S,) 近 20 根 pivot 壓力
+
+    def __post_init__(self):
+        self._pos = {s: j for j, s in enumerate(self.symbols)}
+
+    def col(self, symbol: str) -> int:
+        return self._pos[symbol]
+
+    def usable(self, min_bars: int = MIN_BARS) -> List[str]:
+        return [s for s, n in zip(self.symbols, self.n_bars) if n >= min_bars]
+
+    def train_xy(self, symbol: str) -> Tuple[np.ndarray, np.ndarray]:
+        j = self._pos[symbol]
+        m = self.train_mask[:, j]
+        return self.X[m, j, :], self.y[m, j]
+
+    def latest_x(self, symbol: str) -> np.ndarray:
+        """最後一根 K 棒的特徵（1 × F），對應舊版 df[feats].iloc[-1:]"""
+        j = self._pos[symbol]
+        return self.X[-1:, j, :]
+
+
+def _bottom_align(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    (T, S[, k]) → 每欄有效列依原順序移到底部，其餘補 NaN
+    """
+    T = valid.shape[0]
+    # stable argsort：無效列（False=0）排前面，有效列保持時間順序排後面
+    order = np.argsort(valid, axis=0, kind="stable")
+    if values.ndim == 3:
+        out = np.take_along_axis(values, order[:, :, None], axis=0).astype("float64")
+        out[~np.take_along_axis(valid, order, axis=0)] = np.nan
+        return out
+    out = np.take_along_axis(values, order, axis=0)
+    mask = np.take_along_axis(valid, order, axis=0)
+    if out.dtype.kind == "M":
+        out = out.copy()
+        out[~mask] = np.datetime64("NaT")
+    else:
+        out = out.astype("float64")
+        out[~mask] = np.nan
+    return out
+
+
+def _shift(a: np.ndarray, n: int) -> np.ndarray:
+    """沿時間軸位移（n>0 取過去，n<0 取未來），空位補 NaN"""
+    out = np.full_like(a, np.nan)
+    if n > 0:
+        out[n:] = a[:-n]
+    elif n < 0:
+        out[:n] = a[-n:]
+    else:
+        out[:] = a
+    return out
+
+
+def _rolling_mean(a: np.ndarray, w: int) -> np.ndarray:
+    """等同 pandas rolling(w).mean()（min_periods=w）"""
+    out = np.full_like(a, np.nan)
+    if a.shape[0] >= w:
+        out[w - 1:] = sliding_window_view(a, w, axis=0).mean(axis=-1)
+    return out
+
+
+def build_panel(
+    data: pd.DataFrame,
+    symbols: List[str] = None,
+    horizon: int = HORIZON,
+    session_cutoff: Optional[np.datetime64] = None,
+) -> FeaturePanel:
+    """
+    data：safe_download(..., group_by="ticker") 的 (ticker, field) 雙層欄位寬表
+    session_cutoff：此時間（含）之後的 K 棒視為未收盤，不作為任何一列的 target（預設今天 00:00）
+    """
+    if symbols is None:
+        symbols = list(dict.fromkeys(data.columns.get_level_values(0)))
+    symbols = [s for s in symbols if s in data.columns.get_level_values(0)]
+
+    # (T, S, 4)：High / Low / Close / Volume
+    cols = pd.MultiIndex.from_product([symbols, _FIELDS])
+    raw = data.reindex(columns=cols).to_numpy(dtype="float64").reshape(len(data), len(symbols), len(_FIELDS))
+
+    # 舊版 data[s].dropna() 以整列 OHLCV 判斷
+    full_cols = pd.MultiIndex.from_product([symbols, ["Open"] + _FIELDS])
+    full = data.reindex(columns=full_cols).to_numpy(dtype="float64").reshape(len(data), len(symbols), 5)
+    valid = ~np.isnan(full).any(axis=2)
+
+    panel = _bottom_align(raw, valid)
+    high, low, close, vol = (panel[:, :, k] for k in range(len(_FIELDS)))
+
+    index = data.index.values.astype("datetime64[ns]")
+    dates = _bottom_align(np.broadcast_to(index[:, None], valid.shape), valid)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ma = _rolling_mean(close, WINDOW)
+        vma = _rolling_mean(vol, WINDOW)
+        mom20 = close / _shift(close, WINDOW) - 1
+        bias = (close - ma) / ma
+        vol_ratio = vol / vma
+        y = _shift(close, -horizon) / close - 1
+
+    X = np.stack([mom20, bias, vol_ratio], axis=2)
+
+    # target 落在未收盤 K 棒上的列 → 不可訓練（只用已完成的交易日）
+    cutoff = np.datetime64(date.today(), "ns") if session_cutoff is None else np.datetime64(session_cutoff, "ns")
+    forming = dates >= cutoff
+    if horizon > 0:
+        y[:-horizon][forming[horizon:]] = np.nan
+
+    # 舊版：train = df.iloc[:-HORIZON].dropna()
+    T = close.shape[0]
+    train_mask = np.isfinite(X).all(axis=2) & np.isfinite(y)
+    train_mask[max(T - horizon, 0):] = False
+
+    # Pivot：近 20 根 High max / Low min / 最新 Close
+    h = np.nanmax(high[-WINDOW:], axis=0) if T else np.full(len(symbols), np.nan)
+    l = np.nanmin(low[-WINDOW:], axis=0) if T else np.full(len(symbols), np.nan)
+    c = close[-1] if T else np.full(len(symbols), np.nan)
+    p = (h + l + c) / 3
+
+    return FeaturePanel(
+        symbols=symbols,
+        dates=dates,
+        X=X,
+        y=y,
+        train_mask=train_mask,
+        n_bars=valid.sum(axis=0),
+        price=np.round(c, 2),
+        sup=np.round(2 * p - h, 2),
+        res=np.round(2 * p - l, 2),
+    )
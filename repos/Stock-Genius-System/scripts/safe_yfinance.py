@@ -1,29 +1,53 @@
 # scripts/safe_yfinance.py
-import yfinance as yf
 import pandas as pd
 import warnings
 
+from scripts.bar_cache import BarCache, FIELDS
+
 warnings.filterwarnings("ignore")
 
+_CACHE = None
+
+
+def get_bar_cache(provider=None) -> BarCache:
+    """
+    取得共用 BarCache（同一行程重複使用）
+    provider 指定時建立新的快取實例（測試 / 基準用 FixtureProvider）
+    """
+    global _CACHE
+    if provider is not None:
+        return BarCache(provider=provider)
+    if _CACHE is None:
+        _CACHE = BarCache()
+    return _CACHE
+
+
 def safe_download(
     tickers,
     period="2y",
     auto_adjust=True,
     group_by="ticker",
+    cache=None,
 ):
+    """
+    增量快取版下載：
+    - 快取命中只抓尾段，其餘由 DERIVED/bars 供應
+    - 回傳格式與 yf.download 相同（group_by="ticker" → (ticker, field) 雙層欄位）
+    """
     try:
-        df = yf.download(
-            tickers,
-            period=period,
-            auto_adjust=auto_adjust,
-            group_by=group_by,
-            progress=False,
-            threads=True,
-        )
-
-        if df is None or isinstance(df, pd.DataFrame) and df.empty:
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = (cache or get_bar_cache()).get_many(symbols, period=period, auto_adjust=auto_adjust)
+
+        if not frames:
             raise ValueError("Yahoo returned empty data")
 
+        if isinstance(tickers, str):
+            return frames[tickers]
+
+        keys = [s for s in symbols if s in frames]
+        df = pd.concat([frames[s][FIELDS] for s in keys], axis=1, keys=keys)
+        if group_by != "ticker":
+            df = df.swaplevel(axis=1).sort_index(axis=1, level=0)
         return df
 
     except Exception as e:
@@ -0,0 +1,235 @@
+# scripts/train_pool.py
+# Explorer 逐檔 XGBoost 平行訓練池
+# 職責：
+# - 把逐檔 fit 分散到行程池（ProcessPoolExecutor）
+# - 每個 worker 固定 nthread，總執行緒數 = CPU 核心數（不超額訂閱）
+# - 池大小依「實際同時在跑數」（各市場配額之和）決定，配額小時每檔分到更多執行緒
+# - 完成一檔回傳一檔（串流），每檔有訓練時限
+# - 可接 vault.model_registry：資料未變重用、新 K 棒熱啟動
+# - 多市場共用同一行程池：依 group（市場）限制同時在跑的任務數
+# ❌ 不下載 ❌ 不做特徵 ❌ 不寫檔
+
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+DEFAULT_PARAMS = {
+    "n_estimators": 120,
+    "max_depth": 3,
+    "learning_rate": 0.05,
+    "random_state": 42,
+}
+SYMBOL_TIMEOUT_SEC = 60
+FEATS = ["mom20", "bias", "vol_ratio"]
+
+
+@dataclass
+class FitTask:
+    symbol: str
+    X: np.ndarray
+    y: np.ndarray
+    x_last: np.ndarray
+    params: Dict[str, Any] = field(default_factory=lambda: dict(DEFAULT_PARAMS))
+    mode: str = "train"                 # train | warm | reuse
+    init_model: Optional[bytes] = None  # warm / reuse 的既有模型
+    warm_rounds: int = 0                # warm 補的 boosting 輪數
+    group: str = ""                     # 資源配額分組（市場）
+    timeout: Optional[float] = None     # 單檔時限（None → iter_fit 預設）
+
+
+def plan_workers(n_tasks: int, max_workers: Optional[int] = None):
+    """
+    回傳 (workers, nthread)：workers × nthread ≈ CPU 核心數
+    """
+    cores = os.cpu_count() or 1
+    env = os.getenv("TRAIN_POOL_WORKERS", "").strip()
+    if max_workers is None and env.isdigit():
+        max_workers = int(env)
+    workers = max(1, min(n_tasks, max_workers or cores, cores))
+    return workers, max(1, cores // workers)
+
+
+def _init_worker(nthread: int):
+    # OpenMP 在 xgboost 匯入前設定才有效
+    os.environ["OMP_NUM_THREADS"] = str(nthread)
+
+
+def _fit_one(task: FitTask, nthread: int, timeout: float) -> Dict[str, Any]:
+    """
+    單檔訓練（worker 端）
+    - reuse：直接以既有模型推論
+    - warm ：以既有模型為起點補 warm_rounds 輪
+    逾時以 xgboost callback 在下一輪 boosting 中止，不回傳半成品預測
+    """
+    import xgboost as xgb
+    from xgboost.callback import TrainingCallback
+
+    started = time.monotonic()
+    state = {"expired": False}
+
+    class _Deadline(TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            if time.monotonic() - started > timeout:
+                state["expired"] = True
+                return True
+            return False
+
+    out = {"symbol": task.symbol, "group": task.group, "mode": task.mode, "status": "ok", "pred": None}
+    try:
+        if task.mode == "reuse":
+            booster = xgb.Booster(params={"nthread": nthread})
+            booster.load_model(bytearray(task.init_model))
+            out["pred"] = float(booster.inplace_predict(task.x_last)[0])
+            out["elapsed"] = time.monotonic() - started
+            return out
+
+        params = dict(task.params)
+        init = None
+        if task.mode == "warm":
+            params["n_estimators"] = task.warm_rounds
+            init = xgb.Booster()
+            init.load_model(bytearray(task.init_model))
+
+        model = xgb.XGBRegressor(n_jobs=nthread, callbacks=[_Deadline()], **params)
+        model.fit(task.X, task.y, xgb_model=init)
+        out["elapsed"] = time.monotonic() - started
+        if state["expired"]:
+            out["status"] = "timeout"
+            return out
+
+        booster = model.get_booster()
+        out["pred"] = float(model.predict(task.x_last)[0])
+        out["model"] = bytes(booster.save_raw("ubj"))
+        out["n_trees"] = booster.num_boosted_rounds()
+        return out
+    except Exception as e:
+        out.update(status="error", elapsed=time.monotonic() - started, error=str(e))
+        return out
+
+
+def _plan(tasks: List[FitTask], registry, feats: List[str]):
+    for t in tasks:
+        action, _, raw = registry.plan(t.symbol, feats, t.params, t.X, t.y)
+        t.mode, t.init_model, t.warm_rounds = action, raw, registry.warm_rounds
+
+
+def _record(r: Dict[str, Any], task: FitTask, registry, feats: List[str]):
+    if r["status"] != "ok":
+        return
+    if r["mode"] == "reuse":
+        registry.touch(task.symbol, feats, task.params)
+        return
+    registry.save(
+        task.symbol, feats, task.params, task.X, task.y,
+        model_bytes=r.pop("model"), action=r["mode"],
+        train_sec=r["elapsed"], n_trees=r["n_trees"],
+    )
+
+
+def iter_fit(
+    tasks: Iterable[FitTask],
+    max_workers: Optional[int] = None,
+    timeout: float = SYMBOL_TIMEOUT_SEC,
+    registry=None,
+    feats: List[str] = FEATS,
+    group_caps: Optional[Dict[str, int]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    串流回傳每檔結果：{"symbol", "group", "mode", "status": ok|timeout|error, "pred", "elapsed"}
+    - worker 端：超過 timeout 的 boosting 直接中止
+    - 主程序端：整批超過 timeout × 批次輪數（+寬限）仍未完成者視為 timeout
+    - registry：先決定 reuse / warm / train，完成後由主程序統一寫回註冊表
+    - group_caps：{group: 同時在跑上限}，各組輪流送件，單一市場不會佔滿整個池
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+
+    if registry is not None:
+        _plan(tasks, registry, feats)
+    by_key = {(t.group, t.symbol): t for t in tasks}
+
+    def _done(r):
+        if registry is not None:
+            _record(r, by_key[(r["group"], r["symbol"])], registry, feats)
+        r.pop("model", None)
+        return r
+
+    def _missed(t: FitTask, status: str, error: Optional[str] = None):
+        r = {"symbol": t.symbol, "group": t.group, "mode": t.mode, "status": status, "pred": None, "elapsed": None}
+        if error:
+            r["error"] = error
+        return r
+
+    for t in tasks:
+        t.timeout = t.timeout or timeout
+
+    # 實際能同時在跑的數量 = 各組 min(任務數, 配額) 之和；池大小與 nthread 依此計算
+    caps = group_caps or {}
+    sizes = Counter(t.group for t in tasks)
+    concurrency = sum(min(n, caps.get(g, n)) for g, n in sizes.items())
+    workers, nthread = plan_workers(concurrency, max_workers)
+
+    # 單 worker 不開行程池（省下子行程啟動與資料序列化）
+    if workers == 1:
+        for t in tasks:
+            yield _done(_fit_one(t, nthread, t.timeout))
+        return
+
+    queues: Dict[str, deque] = OrderedDict()
+    for t in tasks:
+        queues.setdefault(t.group, deque()).append(t)
+    inflight: Counter = Counter()
+
+    # 批次輪數：整體受池大小限制，單組受自己的配額限制（取較慢者）
+    rounds = max(
+        -(-len(tasks) // workers),
+        max(-(-n // min(workers, caps.get(g, workers))) for g, n in sizes.items()),
+    )
+    deadline = time.monotonic() + max(t.timeout for t in tasks) * rounds + 30
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(nthread,))
+    pending = {}
+
+    def _fill():
+        # 各組輪流送一件，直到池滿或各組都到配額
+        progressed = True
+        while progressed and len(pending) < workers:
+            progressed = False
+            for g, q in queues.items():
+                if q and len(pending) < workers and inflight[g] < caps.get(g, workers):
+                    t = q.popleft()
+                    pending[pool.submit(_fit_one, t, nthread, t.timeout)] = t
+                    inflight[g] += 1
+                    progressed = True
+
+    try:
+        _fill()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                t = pending.pop(fut)
+                inflight[t.group] -= 1
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    r = _missed(t, "error", str(e))
+                yield _done(r)
+            _fill()
+
+        for fut, t in pending.items():
+            fut.cancel()
+            yield _missed(t, "timeout")
+        for q in queues.values():
+            for t in q:
+                yield _missed(t, "timeout")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
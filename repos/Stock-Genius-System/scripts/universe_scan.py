@@ -0,0 +1,167 @@
+# scripts/universe_scan.py
+# 串流式全市場掃描（分塊抓取 × 有界 Top-K）
+# 職責：
+# - 候選標的分塊下載，每塊到達就評分，不把整個 universe 留在記憶體
+# - shortlist / core_watch 以固定大小的 heap 維護（記憶體 O(k)）
+# - universe 快照邊掃邊寫（JSON 陣列串流）；單一分塊失敗只略過該塊，其餘照常掃描
+# ❌ 不交易 ❌ 不做風控 ❌ 不寫 LOCKED_*
+
+import os
+import json
+import heapq
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 100
+SHORTLIST_K = 5
+CORE_WATCH_K = 7
+
+
+class TopK:
+    """保留分數最高的 k 筆（min-heap，O(k) 記憶體）"""
+
+    def __init__(self, k: int, key: Callable[[Dict], float]):
+        self.k = k
+        self.key = key
+        self._heap = []
+        self._seq = itertools.count()  # 同分時保持先到先贏，且避免比較 dict
+
+    def push(self, item: Dict):
+        score = self.key(item)
+        if score is None or (isinstance(score, float) and np.isnan(score)):
+            return
+        entry = (score, -next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict]:
+        return [e[2] for e in sorted(self._heap, reverse=True)]
+
+
+class JsonArrayWriter:
+    """逐筆寫出 JSON 陣列，結束時補上 ]（失敗也保持合法 JSON）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f = open(path + ".tmp", "w", encoding="utf-8")
+        self._f.write("[")
+
+    def write(self, item: Dict):
+        self._f.write(("," if self.count else "") + "\n  " + json.dumps(item, ensure_ascii=False))
+        self.count += 1
+
+    def close(self, keep: bool = True):
+        self._f.write("\n]\n")
+        self._f.close()
+        if keep:
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            os.remove(self.path + ".tmp")
+
+
+# ===============================
+# 分塊抓取 / 評分
+# ===============================
+
+def score_chunk(data: pd.DataFrame, symbols: List[str]) -> List[Dict]:
+    """
+    單一分塊評分（向量化）：
+    - score：mom20（潛力，shortlist 用）
+    - liquidity：近 20 根平均成交金額（流動性，core_watch 用）
+    """
+    from scripts.panel_features import build_panel, MIN_BARS
+
+    panel = build_panel(data, symbols)
+    close = data.xs("Close", axis=1, level=1).reindex(columns=panel.symbols)
+    dollar = close * data.xs("Volume", axis=1, level=1).reindex(columns=panel.symbols)
+    liquidity = dollar.apply(lambda c: c.dropna().tail(20).mean())
+
+    out = []
+    for s in panel.usable(MIN_BARS):
+        j = panel.col(s)
+        out.append({
+            "symbol": s,
+            "price": float(panel.price[j]),
+            "score": round(float(panel.X[-1, j, 0]), 6),
+            "vol_ratio": round(float(panel.X[-1, j, 2]), 4),
+            "liquidity": round(float(liquidity[s]), 2),
+        })
+    return out
+
+
+def iter_universe_chunks(
+    symbols: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    download: Optional[Callable] = None,
+    failed: Optional[List[Dict]] = None,
+) -> Iterator[List[Dict]]:
+    """
+    依序產出每塊評分結果
+    下載 / 評分失敗的分塊：記錄後略過（failed 有給就附加 {"first", "last", "error"}），不中止整個掃描
+    """
+    if download is None:
+        from scripts.safe_yfinance import safe_download as download
+
+    it = iter(symbols)
+    while True:
+        chunk = list(itertools.islice(it, chunk_size))
+        if not chunk:
+            return
+        try:
+            data = download(chunk)
+            if data is None:
+                raise RuntimeError("download returned no data")
+            scored = score_chunk(data, chunk)
+        except Exception as e:
+            print(f"[WARN] universe chunk {chunk[0]}..{chunk[-1]} skipped: {e}")
+            if failed is not None:
+                failed.append({"first": chunk[0], "last": chunk[-1], "error": str(e)})
+            continue
+        yield scored
+
+
+def stream_scan(
+    chunks: Iterable[List[Dict]],
+    universe_path: Optional[str] = None,
+    shortlist_k: int = SHORTLIST_K,
+    core_watch_k: int = CORE_WATCH_K,
+) -> Dict:
+    """
+    消化分塊串流：
+    回傳 {"shortlist", "core_watch", "scanned", "chunks", "partial", "error"}
+    """
+    shortlist = TopK(shortlist_k, key=lambda x: x.get("score"))
+    core_watch = TopK(core_watch_k, key=lambda x: x.get("liquidity"))
+    writer = JsonArrayWriter(universe_path) if universe_path else None
+
+    scanned, n_chunks, error = 0, 0, None
+    try:
+        for chunk in chunks:
+            n_chunks += 1
+            for item in chunk:
+                shortlist.push(item)
+                core_watch.push(item)
+                if writer:
+                    writer.write(item)
+                scanned += 1
+    except Exception as e:
+        error = str(e)
+        print(f"[WARN] universe scan stopped after {n_chunks} chunks: {e}")
+    finally:
+        if writer:
+            writer.close(keep=scanned > 0)
+
+    return {
+        "shortlist": shortlist.items(),
+        "core_watch": core_watch.items(),
+        "scanned": scanned,
+        "chunks": n_chunks,
+        "partial": error is not None,
+        "error": error,
+    }
@@ -3,9 +3,30 @@
 # ❌ 不交易 ❌ 不做風控 ❌ 不寫 LOCKED_*
 
 import os
+import sys
 import json
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
+
+# ===== Path Fix =====
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from scripts.universe_scan import iter_universe_chunks, stream_scan, CHUNK_SIZE
+from scripts.explorer_pool import load_pool, save_pool
+
+# Orchestrator 共用模組：需由呼叫端讓 Orchestrator Root 可匯入（PYTHONPATH）；匯入不到 → 本地設定 / 不記存取
+try:
+    from vault.config import MARKET_CONFIG
+except Exception:
+    from scripts.explorer_config import MARKET_CONFIG
+try:
+    from vault.access_catalog import touch_write
+except Exception:
+    def touch_write(path):
+        pass
+
+MARKET = "JP"
 
 VAULT_ROOT = r"E:\Quant-Vault"
 BASE_DIR = os.path.join(VAULT_ROOT, "STOCK_DB", "JP")
@@ -18,50 +39,50 @@ for d in (UNIVERSE_DIR, SHORTLIST_DIR, CORE_WATCH_DIR):
     os.makedirs(d, exist_ok=True)
 
 
-def fetch_market_universe() -> List[Dict]:
+def fetch_market_universe(chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
     """
-    取得日股全市場候選（示意）
-    真實來源可接：你既有 safe_yfinance / 外部資料
-    無資料 → 回傳空陣列（上層會停止）
+    取得日股全市場候選
+    資料來源：safe_yfinance（K 棒快取）
+    以分塊串流產出評分結果（核心股 + 完整 Explorer 股池，不截斷）
     """
-    return []  # 尚未初始化資料層，保持安全行為
-
+    cfg = MARKET_CONFIG[MARKET]["explorer"]
+    seed = list(cfg["core_watch"]) + list(MARKET_CONFIG[MARKET].get("symbols", []))
+    symbols = list(dict.fromkeys(seed + load_pool(cfg)))
+    return iter_universe_chunks(symbols, chunk_size)
 
-def rank_and_select(universe: List[Dict]) -> Dict[str, List[Dict]]:
-    """
-    排序並選擇：
-    - shortlist：Top 5
-    - core_watch：<= 7（示意，實務可接穩定度/衰退權重）
-    """
-    if not universe:
-        return {"shortlist": [], "core_watch": []}
 
-    sorted_items = universe[:]
-    return {
-        "shortlist": sorted_items[:5],
-        "core_watch": sorted_items[:7],
-    }
+def _collect(chunks: Iterable[List[Dict]], scored: List) -> Iterator[List[Dict]]:
+    """串流經過時記下 (score, symbol)，掃描後寫回 Explorer 股池"""
+    for chunk in chunks:
+        scored.extend((item.get("score") or 0.0, item["symbol"]) for item in chunk)
+        yield chunk
 
 
 def write_snapshot(folder: str, name: str, data):
     path = os.path.join(folder, f"{name}.json")
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    touch_write(path)
 
 
 def main():
-    universe = fetch_market_universe()
-    if not universe:
+    ts = datetime.utcnow().strftime("%Y%m%d")
+
+    # universe 邊掃邊寫；shortlist / core_watch 只保留 heap
+    scored: List = []
+    universe_path = os.path.join(UNIVERSE_DIR, f"universe_{ts}.json")
+    ranked = stream_scan(_collect(fetch_market_universe(), scored), universe_path=universe_path)
+    if not ranked["scanned"]:
         # 無資料 → 不寫任何東西（避免假資料）
         return
+    touch_write(universe_path)
 
-    ranked = rank_and_select(universe)
-    ts = datetime.utcnow().strftime("%Y%m%d")
-
-    write_snapshot(UNIVERSE_DIR, f"universe_{ts}", universe)
     write_snapshot(SHORTLIST_DIR, f"shortlist_{ts}", ranked["shortlist"])
     write_snapshot(CORE_WATCH_DIR, f"core_watch_{ts}", ranked["core_watch"])
 
+    # explorer_engine 讀取的股池（依 mom20 由高到低）
+    save_pool(MARKET_CONFIG[MARKET]["explorer"], [s for _, s in sorted(scored, key=lambda x: -x[0])])
+
 
 if __name__ == "__main__":
     main()
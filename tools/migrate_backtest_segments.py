@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backtest Segment Migration
+--------------------------
+用途：
+1) 將 LOCKED_RAW/backtest/<market>/SYMBOL_YYYY-MM-DD.json 小檔併入每日 segment
+   （LOCKED_RAW/backtest/<market>/segments/<YYYY>/<YYYY-MM-DD>.ndjson）
+2) 今日以前的 segment 併完即封存（footer 索引 + 唯讀），並產生日彙總
+3) 逐日驗證：segment 內該日 symbol 必須涵蓋所有舊檔
+4) --archive-legacy：驗證通過的舊檔移至 LOCKED_RAW/backtest_legacy/<market>/（不刪除）
+
+設計原則：
+- 不覆寫既有 segment 紀錄（同日同 symbol 以 segment 為準）
+- 可重複執行（已遷移的日期只做驗證）
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from vault.backtest_segment_store import (  # noqa: E402
+    legacy_files, append_record, is_sealed, read_segment, seal_segment, segment_path,
+)
+from vault.backtest_rollup import build_day_rollup  # noqa: E402
+from vault.backtest_manifest import rebuild_manifest  # noqa: E402
+
+MARKETS = ["TW", "US", "JP", "CRYPTO"]
+
+
+def migrate_market(root: str, market: str, archive: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+    today = date.today().isoformat()
+    legacy = legacy_files(market, root)
+    report = {"market": market, "days": 0, "files": 0, "appended": 0, "sealed": 0, "archived": 0, "errors": []}
+
+    for day in sorted(legacy):
+        paths = sorted(legacy[day])
+        report["days"] += 1
+        report["files"] += len(paths)
+        seg = segment_path(market, day, root)
+        if dry_run:
+            continue
+
+        for p in paths:
+            symbol = os.path.basename(p).rsplit("_", 1)[0]
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    rec = json.load(f)
+            except Exception as e:
+                report["errors"].append(f"{p}: {e}")
+                continue
+            if not isinstance(rec, dict):
+                report["errors"].append(f"{p}: not an object")
+                continue
+            rec.pop("symbol", None)
+            if not is_sealed(seg) and append_record(market, symbol, rec, day=day, root=root):
+                report["appended"] += 1
+
+        if day < today and not is_sealed(seg):
+            seal_segment(seg)
+            report["sealed"] += 1
+
+        # 驗證：所有舊檔的 symbol 都在 segment 裡
+        have = {r.get("symbol") for r in read_segment(seg)} if os.path.exists(seg) else set()
+        missing = [p for p in paths if os.path.basename(p).rsplit("_", 1)[0] not in have]
+        if missing:
+            report["errors"].append(f"{market} {day}: {len(missing)} legacy files not in segment")
+            continue
+
+        if is_sealed(seg):
+            build_day_rollup(market, day, root)
+
+        if archive:
+            dst_dir = os.path.join(root, "LOCKED_RAW", "backtest_legacy", market, day[:4])
+            os.makedirs(dst_dir, exist_ok=True)
+            for p in paths:
+                shutil.move(p, os.path.join(dst_dir, os.path.basename(p)))
+                report["archived"] += 1
+
+    # 舊檔已併入 / 移走 → 重建並落地 manifest（讀取端不會自行寫檔）
+    if not dry_run and legacy:
+        rebuild_manifest(market, root)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrate per-symbol backtest JSON files into daily segments")
+    ap.add_argument("--root", default=os.environ.get("VAULT_ROOT", r"E:\Quant-Vault"), help="Quant-Vault root")
+    ap.add_argument("--market", action="append", help="TW|US|JP|CRYPTO（可重複；預設全部）")
+    ap.add_argument("--archive-legacy", action="store_true", help="驗證通過後移走舊檔")
+    ap.add_argument("--dry-run", action="store_true", help="只統計，不寫入")
+    args = ap.parse_args()
+
+    failed = False
+    for market in args.market or MARKETS:
+        r = migrate_market(args.root, market.upper(), args.archive_legacy, args.dry_run)
+        failed |= bool(r["errors"])
+        print(json.dumps(r, ensure_ascii=False))
+
+    print("⚠️ Migration finished with errors." if failed else "✅ Backtest segment migration done.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
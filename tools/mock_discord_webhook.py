@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mock Discord Webhook Server
+---------------------------
+用途：
+1) 離線模擬 Discord webhook（HTTP/1.1 keep-alive、每 webhook 限流、429 retry_after、隨機 5xx）
+2) --bench：啟動 mock server，透過 notify.delivery 客戶端壓測，輸出吞吐量 / 延遲分位數
+
+用法：
+  python tools/mock_discord_webhook.py --port 8765                 # 只開 server
+  python tools/mock_discord_webhook.py --bench 200 --webhooks 4    # 壓測
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from notify.delivery import DeliveryClient  # noqa: E402
+
+
+class MockWebhookServer:
+    def __init__(self, rate: float = 2.5, burst: int = 5, latency: float = 0.02, error_rate: float = 0.0):
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = {"connections": 0, "requests": 0, "ok": 0, "429": 0, "5xx": 0}
+        self.messages: Dict[str, int] = {}
+        self._buckets: Dict[str, list] = {}  # path -> [tokens, stamp]
+
+    def _take(self, path: str) -> float:
+        """回傳 0 = 放行；否則為需等待秒數"""
+        now = time.monotonic()
+        b = self._buckets.setdefault(path, [float(self.burst), now])
+        b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+        b[1] = now
+        if b[0] >= 1:
+            b[0] -= 1
+            return 0.0
+        return (1 - b[0]) / self.rate
+
+    async def handle(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                path = line.decode("latin-1").split(" ")[1]
+                headers = {}
+                while True:
+                    h = await reader.readuntil(b"\r\n")
+                    if h == b"\r\n":
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                await reader.readexactly(int(headers.get("content-length", 0)))
+                self.stats["requests"] += 1
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                wait = self._take(path)
+                if wait:
+                    self.stats["429"] += 1
+                    body = json.dumps({"message": "You are being rate limited.", "retry_after": round(wait, 3), "global": False}).encode()
+                    extra = f"Retry-After: {max(int(wait + 0.999), 1)}\r\nX-RateLimit-Remaining: 0\r\n"
+                    status = "429 Too Many Requests"
+                elif random.random() < self.error_rate:
+                    self.stats["5xx"] += 1
+                    body, extra, status = b'{"message": "upstream"}', "", "503 Service Unavailable"
+                else:
+                    self.stats["ok"] += 1
+                    self.messages[path] = self.messages.get(path, 0) + 1
+                    body, extra, status = b"", "", "204 No Content"
+
+                writer.write((
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"{extra}"
+                    "Connection: keep-alive\r\n\r\n"
+                ).encode("latin-1") + body)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """背景執行緒啟動，回傳實際埠號"""
+        ready = threading.Event()
+        box = {}
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            server = loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+            box["port"] = server.sockets[0].getsockname()[1]
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="mock-webhook", daemon=True).start()
+        ready.wait()
+        return box["port"]
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def bench(n: int, webhooks: int, server: MockWebhookServer, rate: float, burst: int):
+    port = server.start_in_thread()
+    urls = [f"http://127.0.0.1:{port}/api/webhooks/{i}/token" for i in range(webhooks)]
+    client = DeliveryClient(rate=rate, burst=burst, backoff=0.05)
+
+    t0 = time.perf_counter()
+    futures = [client.submit(urls[i % webhooks], {"content": f"bench #{i}"}) for i in range(n)]
+    submit_sec = time.perf_counter() - t0
+    results = [f.result() for f in futures]
+    total = time.perf_counter() - t0
+    client.close()
+
+    lat = [r["latency"] for r in results]
+    sent = sum(r["sent"] for r in results)
+    print(json.dumps({
+        "messages": n,
+        "webhooks": webhooks,
+        "sent": sent,
+        "failed": n - sent,
+        "submit_ms": round(submit_sec * 1000, 2),
+        "total_sec": round(total, 3),
+        "throughput_msg_s": round(n / total, 2),
+        "latency_p50": round(_pct(lat, 0.50), 4),
+        "latency_p95": round(_pct(lat, 0.95), 4),
+        "latency_max": round(max(lat), 4),
+        "client": client.stats_snapshot(),
+        "connections_opened": client.pool.opened,
+        "server": server.stats,
+    }, ensure_ascii=False, indent=2))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mock Discord webhook server / delivery benchmark")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--rate", type=float, default=2.5, help="server 每 webhook 每秒放行數")
+    ap.add_argument("--burst", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.02, help="每個請求模擬延遲（秒）")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="隨機 503 比例")
+    ap.add_argument("--bench", type=int, default=0, help="壓測訊息數（0 = 只開 server）")
+    ap.add_argument("--webhooks", type=int, default=4)
+    ap.add_argument("--client-rate", type=float, default=None, help="客戶端 token bucket（預設同 server）")
+    args = ap.parse_args()
+
+    server = MockWebhookServer(args.rate, args.burst, args.latency, args.error_rate)
+    if args.bench:
+        bench(args.bench, args.webhooks, server, args.client_rate or args.rate, args.burst)
+        return
+
+    async def serve():
+        srv = await asyncio.start_server(server.handle, args.host, args.port)
+        print(f"[MOCK] listening on http://{args.host}:{args.port}/api/webhooks/<id>/<token>")
+        async with srv:
+            await srv.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print(json.dumps({"server": server.stats, "messages": server.messages}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
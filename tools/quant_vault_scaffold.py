@@ -17,12 +17,18 @@ import hashlib
 import json
 import os
 import platform
-import shutil
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+try:
+    from tools.vault_ledger import append_entry, last_hash
+    from tools.raw_blob_store import index_backtest, store_raw
+except ImportError:
+    from vault_ledger import append_entry, last_hash
+    from raw_blob_store import index_backtest, store_raw
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
@@ -169,39 +175,10 @@ class LedgerEntry:
     entry_hash: str
 
 def ledger_last_hash(ledger_path: Path) -> str:
-    if not ledger_path.exists() or ledger_path.stat().st_size == 0:
-        return "GENESIS"
-    last_line = ""
-    with ledger_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                last_line = line
-    if not last_line:
-        return "GENESIS"
-    try:
-        obj = json.loads(last_line)
-        return obj.get("entry_hash") or "GENESIS"
-    except Exception:
-        return "GENESIS"
+    return last_hash(ledger_path)
 
 def append_ledger(ledger_path: Path, action: str, src: Optional[str], dst: Optional[str], sha256: Optional[str], meta: Dict[str, Any]) -> LedgerEntry:
-    prev = ledger_last_hash(ledger_path)
-    payload = {
-        "ts": utc_now_iso(),
-        "action": action,
-        "src": src,
-        "dst": dst,
-        "sha256": sha256,
-        "meta": meta,
-        "prev_hash": prev,
-    }
-    entry_hash = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
-    payload["entry_hash"] = entry_hash
-
-    ledger_path.parent.mkdir(parents=True, exist_ok=True)
-    with ledger_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-
+    payload = append_entry(ledger_path, action, src, dst, sha256, meta)
     return LedgerEntry(
         ts=payload["ts"],
         action=action,
@@ -209,8 +186,8 @@ def append_ledger(ledger_path: Path, action: str, src: Optional[str], dst: Optio
         dst=dst,
         sha256=sha256,
         meta=meta,
-        prev_hash=prev,
-        entry_hash=entry_hash,
+        prev_hash=payload["prev_hash"],
+        entry_hash=payload["entry_hash"],
     )
 
 def create_structure(vault_root: Path) -> None:
@@ -262,13 +239,13 @@ def ingest_raw(vault_root: Path, src_file: Path, category: str, market: Optional
     else:
         dst_dir = vault_root / "LOCKED_RAW" / category
 
-    dst_dir.mkdir(parents=True, exist_ok=True)
-    dst_path = dst_dir / fname
-    if dst_path.exists():
-        raise FileExistsError(str(dst_path))
-
-    shutil.copy2(src_file, dst_path)
-    digest = sha256_file(dst_path)
+    # 邊複製邊 hash；內容已存在 → hard link / 參照既有 blob，不再複製
+    stored = store_raw(vault_root, src_file, dst_dir / fname)
+    dst_path = stored["dst"]
+    if category == "backtest":
+        index_backtest(vault_root, dst_dir.name, dst_path)
+    digest = stored["sha256"]
+    dedup = {"dedup": stored["dedup"], "dedup_of": stored["dedup_of"]} if stored["dedup"] else {}
 
     manifest_dir = vault_root / "MANIFESTS" / "raw"
     manifest_dir.mkdir(parents=True, exist_ok=True)
@@ -281,7 +258,8 @@ def ingest_raw(vault_root: Path, src_file: Path, category: str, market: Optional
         "sha256": digest,
         "category": category,
         "market": (market.upper() if market else None),
-        "note": note
+        "note": note,
+        **dedup
     }, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
     ledger = vault_root / "MANIFESTS" / "ledger.ndjson"
@@ -291,7 +269,7 @@ def ingest_raw(vault_root: Path, src_file: Path, category: str, market: Optional
         src=str(src_file),
         dst=str(dst_path.relative_to(vault_root)),
         sha256=digest,
-        meta={"category": category, "market": market, "note": note}
+        meta={"category": category, "market": market, "note": note, **dedup}
     )
     return dst_path
 
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LOCKED_RAW Blob Store (hash-while-copy + dedupe)
+------------------------------------------------
+用途：
+1) copy_and_hash()：一次串流同時複製與計算 sha256（每個位元組只過一次磁碟）
+2) MANIFESTS/raw_blobs.ndjson：LOCKED_RAW 內容雜湊索引（sha256 → 既有檔案、大小）
+3) store_raw()：內容已存在 → 不複製，改建 hard link；檔案系統不支援（exFAT 外接硬碟等）→ 只記參照
+4) index_backtest()：promote 進 LOCKED_RAW/backtest/<market> 的檔案登記到回測 manifest
+   （讀取端不重掃市場目錄，沒登記的舊版小檔不會出現在時間窗查詢）
+
+設計原則：
+- 不覆寫 LOCKED_RAW 既有檔案（目的地已存在 → FileExistsError）
+- 大小不同的檔案不可能重複：只有索引內有同大小 blob 時才先算雜湊
+- 索引 append-only；不存在時由 MANIFESTS/raw/*.json sidecar 重建
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from tools.vault_ledger import ledger_lock
+except ImportError:
+    from vault_ledger import ledger_lock
+
+CHUNK = 1024 * 1024
+
+DEDUP_LINK = "hardlink"
+DEDUP_REF = "reference"
+
+_LOCK = threading.Lock()
+# vault → {"covered": bytes, "by_hash": {sha: {dst, size}}, "sizes": {size: count}}
+_INDEXES: Dict[str, Dict[str, Any]] = {}
+
+
+def utc() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for c in iter(lambda: f.read(CHUNK), b""):
+            h.update(c)
+    return h.hexdigest()
+
+
+def copy_and_hash(src: Path, dst: Path) -> Tuple[str, int]:
+    """
+    串流複製到 dst（先寫 .tmp，fsync 後落地），同時計算 sha256
+    落地不可覆寫：hard link tmp → dst（dst 已存在即失敗，原子）；
+    不支援 hard link → O_EXCL 先佔住 dst 再 rename
+    回傳 (sha256, bytes)
+    """
+    h = hashlib.sha256()
+    n = 0
+    tmp = dst.with_name(dst.name + ".tmp")
+    try:
+        with src.open("rb") as fin, tmp.open("wb") as fout:
+            for c in iter(lambda: fin.read(CHUNK), b""):
+                h.update(c)
+                fout.write(c)
+                n += len(c)
+            fout.flush()
+            os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)
+        try:
+            os.link(tmp, dst)
+        except FileExistsError:
+            raise
+        except OSError:
+            os.close(os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return h.hexdigest(), n
+
+# -------------------------------------------------
+# 內容雜湊索引
+# -------------------------------------------------
+
+def index_path(vault: Path) -> Path:
+    return vault / "MANIFESTS" / "raw_blobs.ndjson"
+
+
+def _add(index: Dict[str, Any], rec: Dict[str, Any]) -> None:
+    if rec["sha256"] in index["by_hash"]:
+        return
+    index["by_hash"][rec["sha256"]] = {"dst": rec["dst"], "size": rec["size"]}
+    index["sizes"][rec["size"]] = index["sizes"].get(rec["size"], 0) + 1
+
+
+def _rebuild_from_sidecars(vault: Path) -> None:
+    rows = []
+    seen = set()
+    sidecar_dir = vault / "MANIFESTS" / "raw"
+    for sc in sorted(sidecar_dir.glob("*.json")) if sidecar_dir.is_dir() else []:
+        try:
+            meta = json.loads(sc.read_text(encoding="utf-8"))
+            digest, dst = meta["sha256"], meta["dst"]
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        path = vault / dst
+        if not digest or digest in seen or not path.is_file():
+            continue
+        seen.add(digest)
+        rows.append(json.dumps({"sha256": digest, "dst": dst, "size": path.stat().st_size, "ts": utc()}) + "\n")
+    path = index_path(vault)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with ledger_lock(path):
+        if not path.exists():
+            path.write_text("".join(rows), encoding="utf-8")
+
+
+def _index(vault: Path) -> Dict[str, Any]:
+    key = str(vault)
+    path = index_path(vault)
+    if not path.exists():
+        _rebuild_from_sidecars(vault)
+    index = _INDEXES.setdefault(key, {"covered": 0, "by_hash": {}, "sizes": {}})
+    if path.stat().st_size > index["covered"]:
+        with path.open("rb") as f:
+            f.seek(index["covered"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                index["covered"] += len(line)
+                try:
+                    _add(index, json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+    return index
+
+
+def lookup(vault: Path, digest: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        return _index(vault)["by_hash"].get(digest)
+
+
+def _register(vault: Path, digest: str, dst: str, size: int) -> Optional[Dict[str, Any]]:
+    """
+    加入索引；若其他行程 / 執行緒已先登記同內容 → 回傳既有 blob（呼叫端改走去重）
+    """
+    path = index_path(vault)
+    with _LOCK, ledger_lock(path):
+        index = _index(vault)
+        existing = index["by_hash"].get(digest)
+        if existing:
+            return existing
+        with path.open("ab") as f:
+            f.write((json.dumps({"sha256": digest, "dst": dst, "size": size, "ts": utc()}) + "\n").encode("utf-8"))
+        _index(vault)
+    return None
+
+# -------------------------------------------------
+# 寫入 LOCKED_RAW
+# -------------------------------------------------
+
+def _dedupe(vault: Path, blob: Dict[str, Any], dst: Path) -> Tuple[Path, str]:
+    """hard link 到既有 blob；失敗（跨磁碟 / 不支援）→ 參照既有 blob"""
+    try:
+        os.link(vault / blob["dst"], dst)
+        return dst, DEDUP_LINK
+    except OSError:
+        return vault / blob["dst"], DEDUP_REF
+
+
+def store_raw(vault: Path, src: Path, dst: Path) -> Dict[str, Any]:
+    """
+    src → LOCKED_RAW 的 dst
+    回傳 {"dst": 實際路徑, "sha256", "size", "dedup": None|hardlink|reference, "dedup_of": 既有 blob 相對路徑}
+    """
+    if dst.exists():
+        raise FileExistsError(str(dst))
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    size = src.stat().st_size
+
+    # 有同大小 blob 才可能重複：先只讀來源算雜湊，命中就完全不寫
+    with _LOCK:
+        maybe_dup = _index(vault)["sizes"].get(size, 0) > 0
+    if maybe_dup:
+        digest = sha256_file(src)
+        blob = lookup(vault, digest)
+        if blob:
+            path, mode = _dedupe(vault, blob, dst)
+            return {"dst": path, "sha256": digest, "size": size, "dedup": mode, "dedup_of": blob["dst"]}
+
+    digest, size = copy_and_hash(src, dst)
+    rel = str(dst.relative_to(vault))
+    blob = _register(vault, digest, rel, size)
+    if blob:
+        # 並行 promote 同內容：後到者刪掉自己的副本，改為去重
+        dst.unlink()
+        path, mode = _dedupe(vault, blob, dst)
+        return {"dst": path, "sha256": digest, "size": size, "dedup": mode, "dedup_of": blob["dst"]}
+    return {"dst": dst, "sha256": digest, "size": size, "dedup": None, "dedup_of": None}
+
+# -------------------------------------------------
+# 回測 manifest
+# -------------------------------------------------
+
+def index_backtest(vault: Path, market: str, dst: Path) -> None:
+    """category == backtest 的 promote 完成後呼叫（manifest 在 vault/ 內，延遲載入）"""
+    repo = str(Path(__file__).resolve().parents[1])
+    if repo not in sys.path:
+        sys.path.insert(0, repo)
+    from vault.backtest_manifest import add_legacy_file
+    add_legacy_file(market, str(dst), root=str(vault))
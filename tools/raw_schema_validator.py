@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Raw Schema Validator (streaming)
+--------------------------------
+用途：
+1) 以固定列數分塊讀取 CSV / Parquet（不整檔載入 pandas）
+2) 檢查：必要欄位、欄位型別、NaN 比例、時間遞增、重複 key
+3) 回傳驗證 profile（rows / 欄位 / NaN 比例 / 時間範圍 / 違規數）
+4) validate_many()：多個 inbox 檔案平行驗證
+
+設計原則：
+- 常數記憶體：每塊只保留計數器與「每個 symbol 的上一個時間」
+  （時間遞增時，重複 key = 同 symbol 連續兩筆同時間，不需保留所有 key）
+- 非 CSV / Parquet → 不做 schema 檢查（由 basic_validate 把關）
+- Parquet 需要 pyarrow；未安裝 → 該檔驗證失敗（parquet_unsupported），不猜測內容
+
+用法：
+  python tools/raw_schema_validator.py FILE [FILE ...] [--category market_raw] [--schema schema.json]
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+CHUNK_ROWS = 100_000
+WORKERS = 4
+
+TIME_CANDIDATES = ("timestamp", "datetime", "date", "Date", "Datetime", "time")
+SYMBOL_CANDIDATES = ("symbol", "ticker", "Symbol", "Ticker")
+
+# 各 category 預設 schema（可用 --schema 覆寫）
+# required：必要欄位（任一 alternatives 成立即可）；dtypes：numeric / datetime / str
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "market_raw": {
+        "required": [["close", "Close", "price"]],
+        "dtypes": {
+            "open": "numeric", "high": "numeric", "low": "numeric", "close": "numeric",
+            "Open": "numeric", "High": "numeric", "Low": "numeric", "Close": "numeric",
+            "volume": "numeric", "Volume": "numeric", "price": "numeric",
+        },
+        "max_nan_ratio": 0.05,
+        "require_time": True,
+    },
+    "backtest": {
+        "required": [],
+        "dtypes": {"confidence": "numeric"},
+        "max_nan_ratio": 0.2,
+        "require_time": False,
+    },
+    "black_swan": {
+        "required": [],
+        "dtypes": {},
+        "max_nan_ratio": 1.0,
+        "require_time": False,
+    },
+}
+
+SUPPORTED = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+
+# -------------------------------------------------
+# 分塊讀取
+# -------------------------------------------------
+
+def _chunks(path: Path, fmt: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if fmt == "csv":
+        # 全部先以字串讀入：型別檢查自己做，避免 pandas 每塊推論不同型別
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=True)
+        return
+    if pq is None:
+        raise RuntimeError("parquet_unsupported")
+    pf = pq.ParquetFile(path)
+    for batch in pf.iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def _pick(columns: List[str], candidates) -> Optional[str]:
+    for c in candidates:
+        if c in columns:
+            return c
+    return None
+
+# -------------------------------------------------
+# 驗證
+# -------------------------------------------------
+
+def validate_file(
+    path: Path,
+    category: str = "market_raw",
+    schema: Optional[Dict[str, Any]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Dict[str, Any]:
+    path = Path(path)
+    t0 = time.perf_counter()
+    fmt = SUPPORTED.get(path.suffix.lower())
+    profile: Dict[str, Any] = {
+        "file": path.name,
+        "format": fmt,
+        "ok": True,
+        "errors": [],
+        "warnings": [],
+        "rows": 0,
+        "bytes": path.stat().st_size if path.exists() else 0,
+    }
+    if fmt is None:
+        profile["warnings"].append("schema_not_checked")
+        return profile
+
+    schema = schema or SCHEMAS.get(category, {"required": [], "dtypes": {}, "max_nan_ratio": 1.0, "require_time": False})
+
+    columns: Optional[List[str]] = None
+    nulls: Dict[str, int] = {}
+    bad_values: Dict[str, int] = {}
+    time_col = symbol_col = None
+    last_ts: Dict[Any, np.datetime64] = {}
+    t_min = t_max = None
+    bad_time = non_monotonic = dup_keys = 0
+
+    try:
+        for df in _chunks(path, fmt, chunk_rows):
+            if columns is None:
+                columns = [str(c) for c in df.columns]
+                time_col = schema.get("time_column") or _pick(columns, TIME_CANDIDATES)
+                symbol_col = schema.get("symbol_column") or _pick(columns, SYMBOL_CANDIDATES)
+            elif [str(c) for c in df.columns] != columns:
+                profile["errors"].append("column_mismatch_between_chunks")
+                break
+
+            n = len(df)
+            profile["rows"] += n
+            for c, k in df.isna().sum().items():
+                nulls[str(c)] = nulls.get(str(c), 0) + int(k)
+
+            # ---------- 型別 ----------
+            for c, kind in schema.get("dtypes", {}).items():
+                if c not in df.columns:
+                    continue
+                col = df[c]
+                if kind == "numeric":
+                    conv = pd.to_numeric(col, errors="coerce")
+                elif kind == "datetime":
+                    conv = pd.to_datetime(col, errors="coerce")
+                else:
+                    continue
+                bad_values[c] = bad_values.get(c, 0) + int((conv.isna() & col.notna()).sum())
+
+            # ---------- 時間遞增 / 重複 key ----------
+            if time_col is None:
+                continue
+            ts = pd.to_datetime(df[time_col], errors="coerce", utc=True).dt.tz_localize(None).to_numpy()
+            valid = ~np.isnat(ts)
+            bad_time += int((~valid).sum())
+            if not valid.any():
+                continue
+            tv = ts[valid]
+            lo, hi = tv.min(), tv.max()
+            t_min = lo if t_min is None else min(t_min, lo)
+            t_max = hi if t_max is None else max(t_max, hi)
+
+            keys = df[symbol_col].astype(str).to_numpy()[valid] if symbol_col else np.zeros(len(tv), dtype=np.int8)
+            # 分組後（穩定排序，保留檔案內順序）逐組比較相鄰時間
+            order = np.argsort(keys, kind="stable") if symbol_col else np.arange(len(tv))
+            k_sorted, t_sorted = keys[order], tv[order]
+            starts = np.flatnonzero(np.r_[True, k_sorted[1:] != k_sorted[:-1]])
+            ends = np.r_[starts[1:], len(k_sorted)]
+            for s, e in zip(starts, ends):
+                k = k_sorted[s]
+                seq = t_sorted[s:e]
+                prev = last_ts.get(k)
+                if prev is not None:
+                    seq = np.r_[np.array([prev], dtype=seq.dtype), seq]
+                diff = seq[1:] - seq[:-1]
+                zero = np.timedelta64(0)
+                non_monotonic += int((diff < zero).sum())
+                dup_keys += int((diff == zero).sum())
+                last_ts[k] = seq[-1]
+    except RuntimeError as e:
+        profile["errors"].append(str(e))
+    except (ValueError, OSError, pd.errors.ParserError) as e:
+        profile["errors"].append(f"unreadable: {e.__class__.__name__}")
+
+    columns = columns or []
+    profile["columns"] = columns
+    total = max(profile["rows"], 1)
+    profile["nan_ratio"] = {c: round(nulls.get(c, 0) / total, 4) for c in columns}
+
+    if not profile["errors"]:
+        if profile["rows"] == 0:
+            profile["errors"].append("no_rows")
+
+        for alternatives in schema.get("required", []):
+            alts = [alternatives] if isinstance(alternatives, str) else list(alternatives)
+            if not any(a in columns for a in alts):
+                profile["errors"].append(f"missing_column:{'|'.join(alts)}")
+
+        for c, k in bad_values.items():
+            if k:
+                profile["errors"].append(f"bad_dtype:{c}:{k}")
+
+        limit = schema.get("max_nan_ratio", 1.0)
+        for c, r in profile["nan_ratio"].items():
+            if r > limit:
+                profile["errors"].append(f"nan_ratio:{c}:{r}")
+
+        if time_col is None:
+            if schema.get("require_time"):
+                profile["errors"].append("missing_time_column")
+        else:
+            profile["time"] = {
+                "column": time_col,
+                "key": symbol_col,
+                "min": str(t_min) if t_min is not None else None,
+                "max": str(t_max) if t_max is not None else None,
+                "unparsable": bad_time,
+                "non_monotonic": non_monotonic,
+                "duplicate_keys": dup_keys,
+            }
+            if bad_time:
+                profile["errors"].append(f"bad_timestamps:{bad_time}")
+            if non_monotonic:
+                profile["errors"].append(f"non_monotonic_time:{non_monotonic}")
+            if dup_keys:
+                profile["errors"].append(f"duplicate_keys:{dup_keys}")
+
+    profile["ok"] = not profile["errors"]
+    profile["seconds"] = round(time.perf_counter() - t0, 3)
+    return profile
+
+
+def validate_many(
+    paths: List[Path],
+    category: str = "market_raw",
+    schema: Optional[Dict[str, Any]] = None,
+    workers: int = WORKERS,
+) -> Dict[str, Dict[str, Any]]:
+    """{path: profile}；pandas C parser 解析時會釋放 GIL，執行緒即可並行"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda p: validate_file(p, category, schema), paths)
+        return {str(p): r for p, r in zip(paths, results)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming CSV/Parquet schema validator")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--category", default="market_raw", help="market_raw|black_swan|backtest")
+    ap.add_argument("--schema", default=None, help="schema JSON（覆寫預設）")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args()
+
+    schema = None
+    if args.schema:
+        with open(args.schema, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+
+    res = validate_many([Path(p) for p in args.files], args.category, schema, args.workers)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+    sys.exit(0 if all(r["ok"] for r in res.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,63 +4,48 @@
 Raw Validator & Promoter
 ------------------------
 用途：
-1) 驗證 INBOX_STAGING/raw_drop 內的原始資料（schema/缺值/時間序/大小）
+1) 驗證 INBOX_STAGING/raw_drop 內的原始資料（大小 + raw_schema_validator 串流檢查 schema/缺值/時間序）
 2) 通過者「不可變」提升(promote)至 LOCKED_RAW（append-only）
 3) 失敗者移至 INBOX_STAGING/quarantine（保留證據）
-4) 全程寫入 MANIFESTS/ledger.ndjson（雜湊鏈台帳）
+4) 全程寫入 MANIFESTS/ledger.ndjson（雜湊鏈台帳；每 LEDGER_BATCH 筆一次鎖 + fsync）
 
 設計原則：
 - 不直接覆寫任何 LOCKED_* 內容
-- Promote = copy + hash + sidecar manifest + ledger
+- Promote = 邊複製邊 hash（單次串流）+ sidecar manifest + ledger
+- 內容已在 LOCKED_RAW → 不複製，hard link / 參照既有 blob（raw_blob_store）
+- inbox 檔案以 IO_WORKERS 個執行緒並行處理；台帳仍由主執行緒依序串鏈
 """
 
 from __future__ import annotations
 import argparse
 from pathlib import Path
-from typing import Dict, Any, Optional
-import hashlib, json, shutil
+from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json, shutil
 from datetime import datetime, timezone
 
+try:
+    from tools.vault_ledger import LedgerBatch, append_entry
+    from tools.raw_blob_store import index_backtest, store_raw
+    from tools.raw_schema_validator import validate_file
+except ImportError:
+    from vault_ledger import LedgerBatch, append_entry
+    from raw_blob_store import index_backtest, store_raw
+    from raw_schema_validator import validate_file
+
+LEDGER_BATCH = 100
+IO_WORKERS = 4
+
 def utc() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
-def sha256(p: Path) -> str:
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for c in iter(lambda: f.read(1024*1024), b""):
-            h.update(c)
-    return h.hexdigest()
-
 def append_ledger(vault: Path, action: str, src: str, dst: Optional[str], digest: Optional[str], meta: Dict[str, Any]):
-    ledger = vault / "MANIFESTS" / "ledger.ndjson"
-    ledger.parent.mkdir(parents=True, exist_ok=True)
-    prev = "GENESIS"
-    if ledger.exists() and ledger.stat().st_size > 0:
-        with ledger.open("r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        prev = json.loads(line).get("entry_hash", prev)
-                    except Exception:
-                        pass
-    payload = {
-        "ts": utc(),
-        "action": action,
-        "src": src,
-        "dst": dst,
-        "sha256": digest,
-        "meta": meta,
-        "prev_hash": prev
-    }
-    entry_hash = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
-    payload["entry_hash"] = entry_hash
-    with ledger.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    append_entry(vault / "MANIFESTS" / "ledger.ndjson", action, src, dst, digest, meta)
 
 def basic_validate(p: Path, max_mb: int = 500) -> Dict[str, Any]:
     """
     最小驗證：存在、大小、非空
-    （你之後可以在此加入 CSV/Parquet schema 驗證）
+    （CSV/Parquet schema 檢查見 raw_schema_validator.validate_file）
     """
     res = {"ok": True, "errors": []}
     if not p.exists() or not p.is_file():
@@ -75,32 +60,74 @@ def basic_validate(p: Path, max_mb: int = 500) -> Dict[str, Any]:
         res["errors"].append("file_too_large")
     return res
 
-def promote(vault: Path, src: Path, category: str, market: Optional[str], note: str):
+def promote(vault: Path, src: Path, category: str, market: Optional[str], note: str, ledger: Optional[LedgerBatch] = None, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     fname = f"{ts}__{src.stem}{src.suffix}"
     if category == "backtest":
         dst_dir = vault / "LOCKED_RAW" / "backtest" / (market or "UNKNOWN").upper()
     else:
         dst_dir = vault / "LOCKED_RAW" / category
-    dst_dir.mkdir(parents=True, exist_ok=True)
-    dst = dst_dir / fname
-    shutil.copy2(src, dst)
-    digest = sha256(dst)
+    stored = store_raw(vault, src, dst_dir / fname)
+    if category == "backtest":
+        index_backtest(vault, dst_dir.name, stored["dst"])
+    dst = str(stored["dst"].relative_to(vault))
 
     sidecar = vault / "MANIFESTS" / "raw" / (fname + ".json")
     sidecar.parent.mkdir(parents=True, exist_ok=True)
-    sidecar.write_text(json.dumps({
+    manifest = {
         "schema": "raw_ingest_manifest.v1",
         "ingested_at": utc(),
         "src": str(src),
-        "dst": str(dst.relative_to(vault)),
-        "sha256": digest,
+        "dst": dst,
+        "sha256": stored["sha256"],
         "category": category,
         "market": market,
         "note": note
-    }, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    }
+    if stored["dedup"]:
+        manifest.update({"dedup": stored["dedup"], "dedup_of": stored["dedup_of"]})
+    if profile is not None:
+        manifest["validation"] = profile
+    sidecar.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    meta = {"category": category, "market": market, "note": note}
+    if stored["dedup"]:
+        meta.update({"dedup": stored["dedup"], "dedup_of": stored["dedup_of"]})
+    if ledger is not None:
+        ledger.add("PROMOTE_RAW", str(src), dst, stored["sha256"], meta)
+    else:
+        append_ledger(vault, "PROMOTE_RAW", str(src), dst, stored["sha256"], meta)
+    return stored
+
+class _EntryCollector:
+    """promote() 的 ledger 參數替身：只收下 entry，不寫檔"""
+    entry: Tuple[str, str, Optional[str], Optional[str], Dict[str, Any]]
 
-    append_ledger(vault, "PROMOTE_RAW", str(src), str(dst.relative_to(vault)), digest, {"category": category, "market": market, "note": note})
+    def add(self, action, src, dst, digest, meta):
+        self.entry = (action, src, dst, digest, meta)
+
+def process_inbox_file(vault: Path, p: Path, quarantine: Path, category: str, market: Optional[str], note: str) -> Tuple[str, str, Optional[str], Optional[str], Dict[str, Any]]:
+    """
+    單一 inbox 檔案：驗證 → promote / quarantine（於 worker 執行緒）
+    回傳台帳 entry 參數，由主執行緒依完成順序寫入（LedgerBatch 非執行緒安全）
+    """
+    v = basic_validate(p)
+    profile = None
+    if v["ok"]:
+        # CSV / Parquet：分塊串流檢查欄位 / 型別 / NaN / 時間序 / 重複 key
+        profile = validate_file(p, category)
+        v["ok"], v["errors"] = profile["ok"], profile["errors"]
+    if v["ok"]:
+        collector = _EntryCollector()
+        promote(vault, p, category, market, note, collector, profile)
+        p.unlink()  # remove from inbox after successful promote
+        return collector.entry
+    q = quarantine / p.name
+    shutil.move(str(p), q)
+    if profile is not None:
+        (quarantine / (p.name + ".validation.json")).write_text(
+            json.dumps(profile, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return ("QUARANTINE", str(p), str(q.relative_to(vault)), None, {"errors": v["errors"]})
 
 def main():
     ap = argparse.ArgumentParser()
@@ -108,6 +135,7 @@ def main():
     ap.add_argument("--category", default="market_raw", help="market_raw|black_swan|backtest")
     ap.add_argument("--market", default=None, help="TW|US|JP|CRYPTO (for backtest)")
     ap.add_argument("--note", default="", help="note for ledger")
+    ap.add_argument("--workers", type=int, default=IO_WORKERS, help="concurrent inbox files (bounded I/O)")
     args = ap.parse_args()
 
     vault = Path(args.root).expanduser().resolve()
@@ -115,16 +143,28 @@ def main():
     quarantine = vault / "INBOX_STAGING" / "quarantine"
     quarantine.mkdir(parents=True, exist_ok=True)
 
-    for p in inbox.glob("*"):
-        v = basic_validate(p)
-        if v["ok"]:
-            promote(vault, p, args.category, args.market, args.note)
-            p.unlink()  # remove from inbox after successful promote
-        else:
-            q = quarantine / p.name
-            shutil.move(str(p), q)
-            append_ledger(vault, "QUARANTINE", str(p), str(q.relative_to(vault)), None, {"errors": v["errors"]})
+    stats = {"promoted": 0, "deduped": 0, "quarantined": 0, "failed": 0}
+    with LedgerBatch(vault / "MANIFESTS" / "ledger.ndjson", LEDGER_BATCH) as ledger, \
+            ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(process_inbox_file, vault, p, quarantine, args.category, args.market, args.note): p
+            for p in sorted(inbox.glob("*")) if p.is_file()
+        }
+        for fut in as_completed(futures):
+            try:
+                entry = fut.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"⚠️ {futures[fut].name}: {e}")
+                continue
+            ledger.add(*entry)
+            if entry[0] == "QUARANTINE":
+                stats["quarantined"] += 1
+            else:
+                stats["promoted"] += 1
+                stats["deduped"] += int(bool(entry[4].get("dedup")))
 
+    print(json.dumps(stats, ensure_ascii=False))
     print("✅ Validation & promotion done.")
 
 if __name__ == "__main__":
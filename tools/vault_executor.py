@@ -1,8 +1,25 @@
 from pathlib import Path
 
+try:
+    from vault.access_catalog import forget
+except ImportError:
+    forget = None
+
+try:
+    from vault.vault_tiering import tier_managed
+except ImportError:
+    tier_managed = None
+
 def safe_delete(path: Path):
     if not path.exists():
         return
 
+    # 分層範圍 / WARM .gz 由 vault_tiering 管理（manifest 仍指向它）
+    # 載入不到 vault_tiering → 無法判斷，一律不刪（fail closed）
+    if tier_managed is None or tier_managed(path):
+        return
+
     if path.is_file():
         path.unlink()
+        if forget is not None:
+            forget(path)
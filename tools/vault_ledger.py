@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vault Hash-Chain Ledger Writer
+------------------------------
+用途：
+1) MANIFESTS/ledger.ndjson 雜湊鏈台帳的唯一寫入入口（scaffold / raw promoter 共用）
+2) 取前一筆 entry_hash 為 O(1)：
+   - 優先讀 ledger.ndjson.tail（含 checksum 與對應檔案大小）
+   - tail 檔不存在 / 損毀 / 與台帳大小不符 → 從 EOF 往回找最後一行
+3) 批次追加：多筆 entry 在同一把檔案鎖內串鏈、一次寫入、一次 fsync
+
+設計原則：
+- entry 格式與雜湊算法不變（payload 以 sort_keys 序列化後 sha256）
+- tail 檔只是快取；真相永遠是台帳本身
+- 檔案鎖：POSIX 用 fcntl.flock，Windows 用 msvcrt.locking（ledger.ndjson.lock）
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+GENESIS = "GENESIS"
+TAIL_SUFFIX = ".tail"
+LOCK_SUFFIX = ".lock"
+TAIL_BLOCK = 64 * 1024
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def compute_entry_hash(payload: Dict[str, Any]) -> str:
+    """payload 不含 entry_hash"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# -------------------------------------------------
+# 檔案鎖
+# -------------------------------------------------
+
+@contextmanager
+def ledger_lock(ledger_path: Path):
+    lock_path = Path(str(ledger_path) + LOCK_SUFFIX)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    f = open(lock_path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)  # LK_LOCK 自身重試 10 次後仍失敗 → 繼續等
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+# -------------------------------------------------
+# tail hash
+# -------------------------------------------------
+
+def _tail_checksum(size: int, entry_hash: str) -> str:
+    return hashlib.sha256(f"{size}:{entry_hash}".encode("utf-8")).hexdigest()
+
+
+def _read_tail_sidecar(ledger_path: Path, size: int) -> Optional[str]:
+    try:
+        obj = json.loads(Path(str(ledger_path) + TAIL_SUFFIX).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(obj, dict) or obj.get("size") != size:
+        return None
+    h = obj.get("entry_hash")
+    if not isinstance(h, str) or obj.get("checksum") != _tail_checksum(size, h):
+        return None
+    return h
+
+
+def _write_tail_sidecar(ledger_path: Path, size: int, entry_hash: str) -> None:
+    path = Path(str(ledger_path) + TAIL_SUFFIX)
+    tmp = Path(str(path) + ".tmp")
+    tmp.write_text(json.dumps({
+        "size": size,
+        "entry_hash": entry_hash,
+        "checksum": _tail_checksum(size, entry_hash),
+        "updated_at": utc_now_iso(),
+    }) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _scan_tail(ledger_path: Path) -> str:
+    """從 EOF 往回讀到最後一個非空行"""
+    with ledger_path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = [ln for ln in buf.split(b"\n") if ln.strip()]
+            # 至少兩行或已讀到檔頭 → 最後一行完整
+            if len(lines) >= 2 or (pos == 0 and lines):
+                try:
+                    return json.loads(lines[-1]).get("entry_hash") or GENESIS
+                except Exception:
+                    return GENESIS
+    return GENESIS
+
+
+def last_hash(ledger_path: Path) -> str:
+    ledger_path = Path(ledger_path)
+    if not ledger_path.exists():
+        return GENESIS
+    size = ledger_path.stat().st_size
+    if size == 0:
+        return GENESIS
+    return _read_tail_sidecar(ledger_path, size) or _scan_tail(ledger_path)
+
+# -------------------------------------------------
+# 追加
+# -------------------------------------------------
+
+def make_entry(action: str, src: Optional[str], dst: Optional[str], sha256: Optional[str], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {"action": action, "src": src, "dst": dst, "sha256": sha256, "meta": meta}
+
+
+def append_entries(ledger_path: Path, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    entries：make_entry() 產生的 dict（可自帶 ts）
+    回傳完整 payload（含 prev_hash / entry_hash），順序與輸入相同
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    ledger_path = Path(ledger_path)
+    ledger_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with ledger_lock(ledger_path):
+        prev = last_hash(ledger_path)
+        out: List[Dict[str, Any]] = []
+        lines = []
+        for e in entries:
+            payload = {
+                "ts": e.get("ts") or utc_now_iso(),
+                "action": e["action"],
+                "src": e.get("src"),
+                "dst": e.get("dst"),
+                "sha256": e.get("sha256"),
+                "meta": e.get("meta") or {},
+                "prev_hash": prev,
+            }
+            payload["entry_hash"] = prev = compute_entry_hash(payload)
+            lines.append(json.dumps(payload, ensure_ascii=False) + "\n")
+            out.append(payload)
+
+        with ledger_path.open("ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        _write_tail_sidecar(ledger_path, size, prev)
+    return out
+
+
+def append_entry(ledger_path: Path, action: str, src: Optional[str], dst: Optional[str], sha256: Optional[str], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return append_entries(ledger_path, [make_entry(action, src, dst, sha256, meta)])[0]
+
+
+class LedgerBatch:
+    """
+    累積 entry，滿 batch_size 或離開 with 區塊時一次寫入
+    用於大量 promote：每批只取一次鎖、一次 fsync
+    """
+
+    def __init__(self, ledger_path: Path, batch_size: int = 100):
+        self.ledger_path = Path(ledger_path)
+        self.batch_size = batch_size
+        self.pending: List[Dict[str, Any]] = []
+        self.written = 0
+
+    def add(self, action: str, src: Optional[str], dst: Optional[str], sha256: Optional[str], meta: Dict[str, Any]) -> None:
+        e = make_entry(action, src, dst, sha256, meta)
+        e["ts"] = utc_now_iso()
+        self.pending.append(e)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.written += len(append_entries(self.ledger_path, self.pending))
+            self.pending = []
+
+    def __enter__(self) -> "LedgerBatch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # 例外時也要寫：已 promote 的檔案不能沒有台帳紀錄
+        self.flush()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vault Ledger & Raw Integrity Verifier
+-------------------------------------
+用途：
+1) 驗證 MANIFESTS/ledger.ndjson 雜湊鏈（prev_hash 串接 + entry_hash 重算）
+2) 每 N 筆寫一個 checkpoint（MANIFESTS/ledger.checkpoints.ndjson）；
+   --resume 從最後一個「仍與台帳吻合」的 checkpoint 接續，不必每次從頭讀
+3) 依 MANIFESTS/raw/*.json sidecar 重算 LOCKED_RAW 檔案 sha256
+   （thread pool 平行讀取；同時在途的檔案數有上限，避免外接硬碟被預讀塞爆）
+4) 輸出 MB/s、entries/s，估算外接硬碟完整巡檢所需時間
+
+設計原則：
+- 只讀 LOCKED_*；唯一寫入是 checkpoint 檔（append-only）
+- checkpoint 自身也串鏈（checksum 含前一個 checkpoint）：只偵測截斷 / 損毀；
+  未加金鑰，能寫檔的人可重算整條鏈 → 不防竄改（--resume 仍會核對台帳該行）
+- 任何不一致 → exit 1
+
+用法：
+  python tools/verify_vault_ledger.py --root E:\\Quant-Vault [--resume] [--every 1000] [--workers 4]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from tools.vault_ledger import GENESIS, compute_entry_hash, utc_now_iso
+except ImportError:
+    from vault_ledger import GENESIS, compute_entry_hash, utc_now_iso
+
+CHECKPOINT_EVERY = 1000
+WORKERS = 4
+READ_AHEAD = 2          # 每個 worker 最多預排幾個檔案
+CHUNK = 1024 * 1024
+MB = 1024 * 1024
+
+# -------------------------------------------------
+# checkpoint
+# -------------------------------------------------
+
+def checkpoint_path(vault: Path) -> Path:
+    return vault / "MANIFESTS" / "ledger.checkpoints.ndjson"
+
+
+def _cp_checksum(prev_checksum: str, entries: int, offset: int, entry_hash: str) -> str:
+    """無金鑰 sha256 串鏈：偵測損毀用，不是防竄改簽章"""
+    return hashlib.sha256(f"{prev_checksum}:{entries}:{offset}:{entry_hash}".encode("utf-8")).hexdigest()
+
+
+def load_checkpoints(vault: Path) -> List[Dict[str, Any]]:
+    """只回傳 checksum 串鏈完整的前綴"""
+    path = checkpoint_path(vault)
+    out: List[Dict[str, Any]] = []
+    if not path.exists():
+        return out
+    prev = GENESIS
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                cp = json.loads(line)
+            except ValueError:
+                break
+            if cp.get("checksum") != _cp_checksum(prev, cp.get("entries"), cp.get("offset"), cp.get("entry_hash")):
+                break
+            out.append(cp)
+            prev = cp["checksum"]
+    return out
+
+
+def _entry_ending_at(ledger: Path, offset: int) -> Optional[Dict[str, Any]]:
+    """讀取結束於 offset 的那一行（往回找上一個換行）"""
+    if offset <= 0:
+        return None
+    with ledger.open("rb") as f:
+        start = max(0, offset - CHUNK)
+        f.seek(start)
+        buf = f.read(offset - start)
+    if not buf.endswith(b"\n"):
+        return None
+    line = buf[:-1].rsplit(b"\n", 1)[-1]
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def trusted_checkpoint(vault: Path, ledger: Path) -> Optional[Dict[str, Any]]:
+    """最後一個仍與台帳內容吻合的 checkpoint（台帳被截短 / 改寫 → 往前退）"""
+    size = ledger.stat().st_size if ledger.exists() else 0
+    for cp in reversed(load_checkpoints(vault)):
+        if cp["offset"] > size:
+            continue
+        e = _entry_ending_at(ledger, cp["offset"])
+        if e and e.get("entry_hash") == cp["entry_hash"]:
+            return cp
+    return None
+
+
+class CheckpointWriter:
+    def __init__(self, vault: Path):
+        self.path = checkpoint_path(vault)
+        cps = load_checkpoints(vault)
+        self.prev = cps[-1]["checksum"] if cps else GENESIS
+        self.last_entries = cps[-1]["entries"] if cps else 0
+
+    def write(self, entries: int, offset: int, entry_hash: str) -> None:
+        if entries <= self.last_entries:
+            return
+        checksum = _cp_checksum(self.prev, entries, offset, entry_hash)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "entries": entries,
+                "offset": offset,
+                "entry_hash": entry_hash,
+                "created_at": utc_now_iso(),
+                "checksum": checksum,
+            }) + "\n")
+        self.prev = checksum
+        self.last_entries = entries
+
+# -------------------------------------------------
+# 雜湊鏈
+# -------------------------------------------------
+
+def verify_chain(vault: Path, resume: bool = False, every: int = CHECKPOINT_EVERY) -> Dict[str, Any]:
+    ledger = vault / "MANIFESTS" / "ledger.ndjson"
+    res: Dict[str, Any] = {"entries": 0, "bytes": 0, "resumed_from": 0, "errors": []}
+    if not ledger.exists():
+        res["errors"].append("ledger_missing")
+        return res
+
+    offset, entries, prev = 0, 0, GENESIS
+    if resume:
+        cp = trusted_checkpoint(vault, ledger)
+        if cp:
+            offset, entries, prev = cp["offset"], cp["entries"], cp["entry_hash"]
+            res["resumed_from"] = entries
+
+    writer = CheckpointWriter(vault)
+    start_offset = offset
+    t0 = time.perf_counter()
+    with ledger.open("rb") as f:
+        f.seek(offset)
+        for line in f:
+            lineno = entries + 1
+            offset += len(line)
+            if not line.strip():
+                continue
+            if not line.endswith(b"\n"):
+                res["errors"].append(f"entry {lineno}: truncated line")
+                break
+            try:
+                obj = json.loads(line)
+                claimed = obj.pop("entry_hash")
+            except (ValueError, KeyError, AttributeError):
+                res["errors"].append(f"entry {lineno}: unparsable")
+                break
+            if obj.get("prev_hash") != prev:
+                res["errors"].append(f"entry {lineno}: prev_hash mismatch")
+                break
+            if compute_entry_hash(obj) != claimed:
+                res["errors"].append(f"entry {lineno}: entry_hash mismatch")
+                break
+            prev = claimed
+            entries += 1
+            if every and entries % every == 0:
+                writer.write(entries, offset, prev)
+
+    res["seconds"] = time.perf_counter() - t0
+    res["entries"] = entries - res["resumed_from"]
+    res["bytes"] = offset - start_offset
+    res["tail_hash"] = prev
+    return res
+
+# -------------------------------------------------
+# LOCKED_RAW 檔案
+# -------------------------------------------------
+
+def _hash_file(path: Path) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    n = 0
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+            n += len(chunk)
+    return h.hexdigest(), n
+
+
+def _check(vault: Path, sidecar: Path) -> Tuple[int, Optional[str]]:
+    try:
+        meta = json.loads(sidecar.read_text(encoding="utf-8"))
+        dst, expected = meta["dst"], meta["sha256"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0, f"{sidecar.name}: bad sidecar"
+    path = vault / dst
+    if not path.is_file():
+        return 0, f"{dst}: missing"
+    try:
+        digest, n = _hash_file(path)
+    except OSError as e:
+        return 0, f"{dst}: {e}"
+    return n, None if digest == expected else f"{dst}: sha256 mismatch"
+
+
+def verify_files(vault: Path, workers: int = WORKERS, read_ahead: int = READ_AHEAD) -> Dict[str, Any]:
+    sidecar_dir = vault / "MANIFESTS" / "raw"
+    res: Dict[str, Any] = {"files": 0, "bytes": 0, "errors": []}
+    sidecars = sorted(sidecar_dir.glob("*.json")) if sidecar_dir.is_dir() else []
+
+    t0 = time.perf_counter()
+    limit = max(1, workers * read_ahead)
+    inflight: deque = deque()
+
+    def drain(n: int):
+        while len(inflight) > n:
+            nbytes, err = inflight.popleft().result()
+            res["files"] += 1
+            res["bytes"] += nbytes
+            if err:
+                res["errors"].append(err)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for sc in sidecars:
+            inflight.append(pool.submit(_check, vault, sc))
+            drain(limit - 1)
+        drain(0)
+
+    res["seconds"] = time.perf_counter() - t0
+    return res
+
+# -------------------------------------------------
+
+def _rates(r: Dict[str, Any], count_key: str) -> None:
+    secs = max(r.get("seconds", 0.0), 1e-9)
+    r["mb_per_s"] = round(r["bytes"] / MB / secs, 2)
+    r[f"{count_key}_per_s"] = round(r[count_key] / secs, 1)
+    r["seconds"] = round(r["seconds"], 3)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verify vault ledger hash chain and LOCKED_RAW digests")
+    ap.add_argument("--root", default=os.environ.get("VAULT_ROOT", r"E:\Quant-Vault"), help="Quant-Vault root")
+    ap.add_argument("--resume", action="store_true", help="從最後一個可信 checkpoint 接續驗證雜湊鏈（之前的內容視為已驗證）")
+    ap.add_argument("--every", type=int, default=CHECKPOINT_EVERY, help="每 N 筆寫一個 checkpoint（0 = 不寫）")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="sha256 重算執行緒數")
+    ap.add_argument("--read-ahead", type=int, default=READ_AHEAD, help="每個 worker 最多預排檔案數")
+    ap.add_argument("--skip-chain", action="store_true")
+    ap.add_argument("--skip-files", action="store_true")
+    args = ap.parse_args()
+
+    vault = Path(args.root).expanduser().resolve()
+    report: Dict[str, Any] = {"root": str(vault)}
+    failed = False
+
+    if not args.skip_chain:
+        chain = verify_chain(vault, args.resume, args.every)
+        _rates(chain, "entries")
+        report["chain"] = chain
+        failed |= bool(chain["errors"])
+
+    if not args.skip_files:
+        files = verify_files(vault, args.workers, args.read_ahead)
+        _rates(files, "files")
+        report["files"] = files
+        failed |= bool(files["errors"])
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print("⚠️ Integrity check FAILED." if failed else "✅ Vault integrity verified.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,10 @@
 import json
 import os
 import time
-import urllib.request
 from typing import Optional
 
+from notify.delivery import send, SEND_TIMEOUT
+
 # 防重複狀態（僅暫存，不影響決策）
 STATE_PATH = os.path.join(
     os.environ.get("VAULT_ROOT", ""),
@@ -47,21 +48,9 @@ def _get_webhook_url(env_key: str) -> Optional[str]:
 
 
 def _post(webhook_url: str, content: str) -> bool:
-    payload = {"content": content}
-    data = json.dumps(payload).encode("utf-8")
-
-    req = urllib.request.Request(
-        webhook_url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return 200 <= resp.status < 300
-    except Exception:
-        return False
+    # 共用發送客戶端：keep-alive 連線池 + 每 webhook 限流 + 429 Retry-After
+    # 防重狀態需要結果 → 同步等待
+    return send(webhook_url, {"content": content}, timeout=SEND_TIMEOUT).get("sent", False)
 
 
 # --------------------------------------------------
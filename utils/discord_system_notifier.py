@@ -1,9 +1,10 @@
 import json
 import os
 import time
-import urllib.request
 from typing import Dict, Optional
 
+from notify.delivery import send, SEND_TIMEOUT
+
 # ==============================
 # 系統訊息狀態（只存指紋與時間）
 # ==============================
@@ -44,21 +45,8 @@ def _save_state(state: Dict[str, int]) -> None:
 # ==============================
 
 def _post_to_discord(webhook_url: str, content: str) -> bool:
-    payload = {"content": content}
-    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-
-    req = urllib.request.Request(
-        webhook_url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return 200 <= resp.status < 300
-    except Exception:
-        return False
+    # 走 notify.delivery；成功與否決定是否寫入指紋，所以等結果
+    return send(webhook_url, {"content": content}, timeout=SEND_TIMEOUT).get("sent", False)
 
 
 def _get_webhook_url(env_key: str) -> Optional[str]:
@@ -1,24 +1,24 @@
 import os
-import time
 
-COLD_DAYS = 90  # 可調，但不是 0
-NOW = time.time()
+from vault.access_catalog import cold_files, forget
+from vault.vault_tiering import tier_managed
 
-def is_cold(path):
-    last_access = os.path.getatime(path)
-    days = (NOW - last_access) / 86400
-    return days >= COLD_DAYS
+COLD_DAYS = 90  # 可調，但不是 0
 
 
 def clean_dir(root):
-    for base, _, files in os.walk(root):
-        for f in files:
-            p = os.path.join(base, f)
-            if is_cold(p):
-                try:
-                    os.remove(p)
-                except Exception:
-                    pass
+    # 冷資料由 access_catalog 索引查詢；刪除前逐檔 stat 複核（verify），不單信 seed 的 mtime
+    for f in cold_files(root, COLD_DAYS, verify=True):
+        p = f["path"]
+        if tier_managed(p):
+            continue  # 分層範圍由 vault_tiering 搬移，不刪
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            continue
+        forget(p)
 
 
 def run():
@@ -0,0 +1,357 @@
+# access_catalog.py
+# Vault 存取目錄（MANIFESTS/access_catalog.sqlite）
+# 職責：
+# - 每個檔案一列：大小 / 最後寫入 / 最後讀取 / 讀取次數
+# - 寫入端（safe_write）、讀取端、刪除端即時更新；不依賴檔案系統 atime（外接硬碟常關閉）
+# - 冷資料 / 保留期查詢走索引 (last_access)，與 Vault 檔案數無關
+# - 首次查詢某目錄時 seed（os.walk，mtime 當最後存取）
+# - 重掃（補上掛鉤外寫入的新檔、移除已消失的檔案）是維護步驟：seed --refresh 手動 / 低頻排程；
+#   查詢端只在 seed 超過 SEED_MAX_AGE（遠長於每日清理排程）時才自動重掃
+# - 刪除端查詢請用 verify=True：逐檔 stat，取 max(目錄, mtime, atime)，不單信 seed 的 mtime
+# ❌ 不刪檔 ❌ 不做保留判斷（只回答「多久沒用」）
+#
+# 用法：
+#   python vault/access_catalog.py seed STOCK_DB [--refresh]
+#   python vault/access_catalog.py cold --days 180 [--under STOCK_DB]
+#   python vault/access_catalog.py stats
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# =================================================
+# Vault Root（鐵律）
+# =================================================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+CATALOG_PATH = os.path.join(VAULT_ROOT, "MANIFESTS", "access_catalog.sqlite")
+
+DAY = 86400
+SEED_MAX_AGE = 30 * DAY
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL DEFAULT 0,
+    last_write  REAL NOT NULL,
+    last_read   REAL,
+    last_access REAL NOT NULL,
+    read_count  INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_files_last_access ON files(last_access);
+CREATE TABLE IF NOT EXISTS seeded (
+    prefix    TEXT PRIMARY KEY,
+    seeded_at REAL NOT NULL
+);
+"""
+
+_LOCAL = threading.local()
+
+# -------------------------------------------------
+# 連線 / 路徑
+# -------------------------------------------------
+
+def _conn() -> sqlite3.Connection:
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = _LOCAL.conns = {}
+    conn = conns.get(CATALOG_PATH)
+    if conn is None:
+        os.makedirs(os.path.dirname(CATALOG_PATH), exist_ok=True)
+        conn = sqlite3.connect(CATALOG_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[CATALOG_PATH] = conn
+    return conn
+
+
+def _key(path) -> str:
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def _prefix_range(under) -> tuple:
+    """under 目錄底下所有 key 的區間 [lo, hi)（走 PRIMARY KEY 索引）"""
+    lo = _key(under).rstrip(os.sep) + os.sep
+    return lo, lo[:-1] + chr(ord(os.sep) + 1)
+
+
+def _stat(path: str):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+# -------------------------------------------------
+# 寫入端 / 讀取端 / 刪除端掛鉤（目錄失敗不影響本體讀寫）
+# -------------------------------------------------
+
+def _best_effort(fn):
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except (sqlite3.Error, OSError):
+            return None
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+@_best_effort
+def touch_write(path, size: Optional[int] = None, ts: Optional[float] = None):
+    ts = ts or time.time()
+    if size is None:
+        st = _stat(str(path))
+        size = st.st_size if st else 0
+    _conn().execute(
+        """
+        INSERT INTO files(path, size, last_write, last_access) VALUES (?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            size = excluded.size,
+            last_write = excluded.last_write,
+            last_access = MAX(files.last_access, excluded.last_access)
+        """,
+        (_key(path), size, ts, ts),
+    )
+
+
+@_best_effort
+def touch_read(path, ts: Optional[float] = None):
+    ts = ts or time.time()
+    k = _key(path)
+    cur = _conn().execute(
+        """
+        UPDATE files SET last_read = ?, read_count = read_count + 1,
+            last_access = MAX(last_access, ?)
+        WHERE path = ?
+        """,
+        (ts, ts, k),
+    )
+    if cur.rowcount == 0:
+        st = _stat(str(path))
+        if st is None:
+            return
+        _conn().execute(
+            "INSERT OR IGNORE INTO files(path, size, last_write, last_read, last_access, read_count) "
+            "VALUES (?, ?, ?, ?, ?, 1)",
+            (k, st.st_size, st.st_mtime, ts, max(ts, st.st_mtime)),
+        )
+
+
+@_best_effort
+def forget(path):
+    _conn().execute("DELETE FROM files WHERE path = ?", (_key(path),))
+
+# -------------------------------------------------
+# seed（一次性全掃；之後由掛鉤維護）
+# -------------------------------------------------
+
+def seeded_at(under) -> Optional[float]:
+    """涵蓋 under 的最新 seed 時間；未 seed 回 None"""
+    k = _key(under).rstrip(os.sep)
+    best = None
+    for prefix, ts in _conn().execute("SELECT prefix, seeded_at FROM seeded"):
+        if k == prefix or k.startswith(prefix + os.sep):
+            best = ts if best is None else max(best, ts)
+    return best
+
+
+def is_seeded(under) -> bool:
+    return seeded_at(under) is not None
+
+
+def seed(under, refresh: bool = False) -> Dict[str, int]:
+    """
+    os.walk 一次寫入目錄：
+    - 新檔案以 mtime 當最後存取
+    - 既有紀錄只往後推（取 max；掛鉤寫入的讀寫時間不會被較舊的 mtime 蓋掉）
+    - refresh：另外移除已不存在的檔案
+    """
+    under = os.path.abspath(str(under))
+    conn = _conn()
+    rows = []
+    seen = set()
+    for base, _, files in os.walk(under):
+        for f in files:
+            p = os.path.join(base, f)
+            st = _stat(p)
+            if st is None:
+                continue
+            k = _key(p)
+            if k.startswith(_key(CATALOG_PATH)):
+                continue  # 目錄本身（含 -wal / -shm）
+            seen.add(k)
+            rows.append((k, st.st_size, st.st_mtime, st.st_mtime))
+
+    removed = 0
+    conn.execute("BEGIN")
+    try:
+        conn.executemany(
+            """
+            INSERT INTO files(path, size, last_write, last_access) VALUES (?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size,
+                last_write = MAX(files.last_write, excluded.last_write),
+                last_access = MAX(files.last_access, excluded.last_access)
+            """,
+            rows,
+        )
+        if refresh:
+            lo, hi = _prefix_range(under)
+            stale = [(k,) for (k,) in conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (lo, hi)) if k not in seen]
+            conn.executemany("DELETE FROM files WHERE path = ?", stale)
+            removed = len(stale)
+        conn.execute(
+            "INSERT OR REPLACE INTO seeded(prefix, seeded_at) VALUES (?, ?)",
+            (_key(under).rstrip(os.sep), time.time()),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {"files": len(rows), "removed": removed}
+
+
+def ensure_seeded(under, max_age: float = SEED_MAX_AGE):
+    """未 seed → 全掃；seed 超過 max_age → 增量重掃（refresh）；平常的重掃走 seed --refresh"""
+    ts = seeded_at(under)
+    if ts is None:
+        seed(under)
+    elif time.time() - ts > max_age:
+        seed(under, refresh=True)
+
+# -------------------------------------------------
+# 查詢
+# -------------------------------------------------
+
+def _row(r, now: float) -> Dict[str, Any]:
+    path, size, last_write, last_read, last_access, read_count = r
+    return {
+        "path": path,
+        "size": size,
+        "last_write": last_write,
+        "last_read": last_read,
+        "read_count": read_count,
+        "age_days": int((now - last_access) / DAY),
+        "last_access_days": (now - last_access) / DAY,
+        "last_modify_days": (now - last_write) / DAY,
+    }
+
+
+def iter_files(
+    under,
+    older_than_days: Optional[float] = None,
+    suffix: Optional[str] = None,
+    exclude: Iterable[str] = (),
+    limit: Optional[int] = None,
+    verify: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    under 底下的檔案（最久沒用的在前）
+    - older_than_days：只回傳最後存取早於 N 天前者（走 last_access 索引）
+    - exclude：路徑片段（例如 "LOCKED_"）
+    - verify：刪除端用；逐檔 stat，已消失者 forget，
+      最後存取取 max(目錄, mtime, atime)，變新的檔案順便回寫目錄並略過
+    """
+    ensure_seeded(under)
+    now = time.time()
+    lo, hi = _prefix_range(under)
+    sql = "SELECT path, size, last_write, last_read, last_access, read_count FROM files WHERE path >= ? AND path < ?"
+    args: List[Any] = [lo, hi]
+    if older_than_days is not None:
+        sql += " AND last_access < ?"
+        args.append(now - older_than_days * DAY)
+    if suffix:
+        sql += " AND path LIKE ?"
+        args.append(f"%{os.path.normcase(suffix)}")
+    for frag in exclude:
+        sql += " AND instr(path, ?) = 0"
+        args.append(os.path.normcase(frag))
+    sql += " ORDER BY last_access"
+    if limit and not verify:
+        sql += f" LIMIT {int(limit)}"
+    if not verify:
+        for r in _conn().execute(sql, args):
+            yield _row(r, now)
+        return
+
+    cutoff = now - older_than_days * DAY if older_than_days is not None else None
+    n = 0
+    for r in _conn().execute(sql, args).fetchall():
+        path, size, last_write, last_read, last_access, read_count = r
+        st = _stat(path)
+        if st is None:
+            forget(path)
+            continue
+        last_write = max(last_write, st.st_mtime)
+        last_access = max(last_access, st.st_mtime, st.st_atime)
+        if cutoff is not None and last_access >= cutoff:
+            _refresh_row(path, st.st_size, last_write, last_access)
+            continue
+        yield _row((path, st.st_size, last_write, last_read, last_access, read_count), now)
+        n += 1
+        if limit and n >= limit:
+            return
+
+
+@_best_effort
+def _refresh_row(path: str, size: int, last_write: float, last_access: float):
+    _conn().execute(
+        "UPDATE files SET size = ?, last_write = MAX(last_write, ?), last_access = MAX(last_access, ?) WHERE path = ?",
+        (size, last_write, last_access, path),
+    )
+
+
+def cold_files(
+    under,
+    days: float,
+    exclude: Iterable[str] = (),
+    limit: Optional[int] = None,
+    verify: bool = False,
+) -> List[Dict[str, Any]]:
+    return list(iter_files(under, older_than_days=days, exclude=exclude, limit=limit, verify=verify))
+
+
+def stats() -> Dict[str, Any]:
+    n, size, oldest = _conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(last_access) FROM files").fetchone()
+    seeded = [p for (p,) in _conn().execute("SELECT prefix FROM seeded ORDER BY prefix")]
+    return {
+        "catalog": CATALOG_PATH,
+        "files": n,
+        "bytes": size,
+        "oldest_access_days": round((time.time() - oldest) / DAY, 1) if oldest else None,
+        "seeded": seeded,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Vault access catalog")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("seed")
+    s.add_argument("under", help="目錄（相對 VAULT_ROOT 或絕對路徑）")
+    s.add_argument("--refresh", action="store_true", help="同時移除已不存在的檔案")
+    c = sub.add_parser("cold")
+    c.add_argument("--days", type=float, default=180)
+    c.add_argument("--under", default="")
+    c.add_argument("--limit", type=int, default=50)
+    sub.add_parser("stats")
+    args = ap.parse_args()
+
+    if args.command == "seed":
+        res = seed(os.path.join(VAULT_ROOT, args.under), args.refresh)
+    elif args.command == "cold":
+        t0 = time.perf_counter()
+        files = cold_files(os.path.join(VAULT_ROOT, args.under), args.days, exclude=("LOCKED_",), limit=args.limit)
+        res = {"count": len(files), "ms": round((time.perf_counter() - t0) * 1000, 1), "files": files}
+    else:
+        res = stats()
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
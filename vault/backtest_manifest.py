@@ -0,0 +1,188 @@
+# backtest_manifest.py
+# 回測檔案索引（DERIVED/backtest/<market>/manifest.json）
+# 職責：
+# - 每市場一份已排序的 日期 → 檔案清單（segment + 舊版小檔）
+# - 寫入端新增 segment 時即時更新（檔案鎖內讀改寫）；時間窗查詢以 bisect 取區段，不再 listdir + 解析檔名
+# - 只有寫入端（add_file / rebuild / 遷移工具）會落地 manifest；讀取端不寫檔
+# - 新鮮度以 segment 為準：最後一個年份目錄裡有 manifest 沒記到的 segment → 在記憶體重建
+#   （不靠目錄 mtime：外接硬碟 / 網路磁碟不可靠）
+# - 舊版小檔由 promote 端（raw_validator_and_promoter / quant_vault_scaffold.ingest_raw）以 add_legacy_file 收錄
+# ❌ 不讀內容 ❌ 不改 LOCKED_RAW
+#
+# 用法：
+#   python vault/backtest_manifest.py rebuild [--market TW] [--root E:\Quant-Vault]
+
+import os
+import sys
+import json
+import bisect
+import argparse
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from vault.backtest_segment_store import (
+        VAULT_ROOT, SEGMENT_DIRNAME, SEGMENT_EXT, legacy_day, legacy_files, market_dir, segment_days, segment_path,
+    )
+    from vault.file_lock import file_lock
+except ImportError:
+    from backtest_segment_store import (
+        VAULT_ROOT, SEGMENT_DIRNAME, SEGMENT_EXT, legacy_day, legacy_files, market_dir, segment_days, segment_path,
+    )
+    from file_lock import file_lock
+
+MARKETS = ["TW", "US", "JP", "CRYPTO"]
+MANIFEST_VERSION = 1
+
+# -------------------------------------------------
+
+def manifest_path(market: str, root: str = VAULT_ROOT) -> str:
+    return os.path.join(root, "DERIVED", "backtest", market, "manifest.json")
+
+
+def _save(market: str, root: str, manifest: Dict[str, Any]):
+    """只由寫入端呼叫（須持有 manifest 鎖）"""
+    path = manifest_path(market, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    manifest.pop("dir_mtime_ns", None)
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _scan(market: str, root: str) -> Dict[str, Any]:
+    """全量掃描（只在記憶體，不寫檔）"""
+    base = market_dir(market, root)
+    files: Dict[str, List[str]] = {}
+    for d in segment_days(market, root):
+        files.setdefault(d, []).append(os.path.relpath(segment_path(market, d, root), base))
+    for d, paths in legacy_files(market, root).items():
+        files.setdefault(d, []).extend(sorted(os.path.relpath(p, base) for p in paths))
+
+    return {"version": MANIFEST_VERSION, "dates": sorted(files), "files": files}
+
+
+def rebuild_manifest(market: str, root: str = VAULT_ROOT) -> Dict[str, Any]:
+    """全量掃描重建並落地（既有 Vault 首次導入 / 遷移後 / 手動修復用）"""
+    with file_lock(manifest_path(market, root)):
+        manifest = _scan(market, root)
+        _save(market, root, manifest)
+    return manifest
+
+
+def _unindexed_segments(market: str, root: str, manifest: Dict[str, Any]) -> bool:
+    """
+    manifest 最後一天所在年份 ~ 今年的 segment 目錄裡，有沒有 manifest 沒記到的 segment
+    （寫入端漏記 / manifest 遺失後才出現的 segment）；每年份一次 listdir
+    """
+    files = manifest["files"]
+    last = manifest["dates"][-1] if manifest["dates"] else None
+    first_year = int(last[:4]) if last else None
+    base = os.path.join(market_dir(market, root), SEGMENT_DIRNAME)
+    if first_year is None:
+        return os.path.isdir(base) and any(os.scandir(base))
+    for year in range(first_year, max(first_year, date.today().year) + 1):
+        ydir = os.path.join(base, str(year))
+        if not os.path.isdir(ydir):
+            continue
+        for fn in os.listdir(ydir):
+            if not fn.endswith(SEGMENT_EXT):
+                continue
+            day = fn[: -len(SEGMENT_EXT)]
+            rel = os.path.relpath(os.path.join(ydir, fn), market_dir(market, root))
+            if rel not in files.get(day, ()):
+                return True
+    return False
+
+
+def _read(market: str, root: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(market, root), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def load_manifest(market: str, root: str = VAULT_ROOT) -> Dict[str, Any]:
+    """讀取端：無副作用；manifest 缺失 / 過期 → 記憶體重建（由下一次寫入落地）"""
+    if not os.path.isdir(market_dir(market, root)):
+        return {"version": MANIFEST_VERSION, "dates": [], "files": {}}
+    manifest = _read(market, root)
+    if manifest is None or _unindexed_segments(market, root, manifest):
+        return _scan(market, root)
+    return manifest
+
+
+def add_file(market: str, day: str, path: str, root: str = VAULT_ROOT) -> Dict[str, Any]:
+    """寫入端呼叫：鎖內讀改寫，新檔加入索引（日期以 insort 保持排序）"""
+    with file_lock(manifest_path(market, root)):
+        return _add_locked(market, day, path, root)
+
+
+def add_legacy_file(market: str, path: str, root: str = VAULT_ROOT) -> Optional[Dict[str, Any]]:
+    """
+    promote 端呼叫：新進 LOCKED_RAW 的舊版小檔（[TS__]SYMBOL_YYYY-MM-DD.json）加入索引
+    不在市場目錄內（去重參照到別處的 blob）/ 檔名不是舊版格式 → 不動，回傳 None
+    """
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(market_dir(market, root)):
+        return None
+    day = legacy_day(os.path.basename(path))
+    if day is None:
+        return None
+    return add_file(market, day, path, root)
+
+
+def _add_locked(market: str, day: str, path: str, root: str) -> Dict[str, Any]:
+    manifest = load_manifest(market, root)
+    rel = os.path.relpath(path, market_dir(market, root))
+    entry = manifest["files"].setdefault(day, [])
+    if rel not in entry:
+        # segment 永遠排在同日舊版小檔前面（讀取時以 segment 為準）
+        if rel.endswith(SEGMENT_EXT):
+            entry.insert(0, rel)
+        else:
+            entry.append(rel)
+    i = bisect.bisect_left(manifest["dates"], day)
+    if i == len(manifest["dates"]) or manifest["dates"][i] != day:
+        manifest["dates"].insert(i, day)
+    _save(market, root, manifest)
+    return manifest
+
+
+def window_files(market: str, start: str, end: str, root: str = VAULT_ROOT) -> List[Tuple[str, List[str]]]:
+    """[start, end] 內的 (day, [abs path])，日期遞增；bisect 取區段"""
+    manifest = load_manifest(market, root)
+    dates = manifest["dates"]
+    lo = bisect.bisect_left(dates, start)
+    hi = bisect.bisect_right(dates, end)
+    base = market_dir(market, root)
+    return [(d, [os.path.join(base, rel) for rel in manifest["files"][d]]) for d in dates[lo:hi]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest manifest index")
+    ap.add_argument("command", choices=["rebuild", "show"], help="rebuild 會落地；show 只讀")
+    ap.add_argument("--root", default=VAULT_ROOT, help="Quant-Vault root")
+    ap.add_argument("--market", action="append", help="TW|US|JP|CRYPTO（可重複；預設全部）")
+    args = ap.parse_args()
+
+    for market in args.market or MARKETS:
+        market = market.upper()
+        m = rebuild_manifest(market, args.root) if args.command == "rebuild" else load_manifest(market, args.root)
+        dates = m["dates"]
+        print(json.dumps({
+            "market": market,
+            "days": len(dates),
+            "files": sum(len(v) for v in m["files"].values()),
+            "first": dates[0] if dates else None,
+            "last": dates[-1] if dates else None,
+        }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
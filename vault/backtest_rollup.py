@@ -0,0 +1,229 @@
+# backtest_rollup.py
+# 回測每日彙總（DERIVED/backtest/<market>/rollups/<YYYY>/<YYYY-MM-DD>.json）
+# 職責：
+# - 每市場每日一份「部分彙總」：命中數 / 信心總和 / 信心分級 / 指標歸因
+# - 日結（segment 封存）時產生；N 日摘要 = 合併 N 份日彙總（O(天數)，不再 O(筆數)）
+# - 同一份日彙總可輸出 build_backtest_summary（base）與 _ext 兩種形狀
+# ✔ 只讀 LOCKED_RAW ✔ 只寫 DERIVED
+# ❌ 不學習 ❌ 不寫權重 ❌ 不做市場判斷
+
+import os
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from vault.backtest_segment_store import (
+        VAULT_ROOT, SEGMENT_EXT, is_sealed, read_day, read_footer, window_days, as_day,
+    )
+except ImportError:
+    from backtest_segment_store import (
+        VAULT_ROOT, SEGMENT_EXT, is_sealed, read_day, read_footer, window_days, as_day,
+    )
+
+ROLLUP_VERSION = 1
+BANDS = ("high", "mid", "low")
+
+# 缺 confidence 時的預設值：base 0.5（mid）、ext 0.0（low）
+DEFAULT_CONFIDENCE = {"base": 0.5, "ext": 0.0}
+
+# -------------------------------------------------
+# 部分彙總
+# -------------------------------------------------
+
+def _band(conf: float) -> str:
+    if conf >= 0.6:
+        return "high"
+    if conf >= 0.3:
+        return "mid"
+    return "low"
+
+
+def empty_partial() -> Dict[str, Any]:
+    return {
+        "sample_size": 0,
+        "hit_count": 0,
+        "confidence_sum": 0.0,                    # 僅含有 confidence 的紀錄
+        "no_confidence": {"hits": 0, "total": 0},  # 缺 confidence → 依形狀套預設值
+        "bands": {b: {"hits": 0, "total": 0} for b in BANDS},
+        "by_indicator": {},
+    }
+
+
+def aggregate(records: Iterable[Dict[str, Any]], partial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    p = partial or empty_partial()
+    for data in records:
+        pred = data.get("pred")
+        actual = data.get("actual")
+        if pred is None or actual is None:
+            continue
+
+        is_hit = (pred == actual)
+        p["sample_size"] += 1
+        p["hit_count"] += int(is_hit)
+
+        conf = data.get("confidence")
+        if conf is None:
+            bucket = p["no_confidence"]
+        else:
+            conf = float(conf)
+            p["confidence_sum"] += conf
+            bucket = p["bands"][_band(conf)]
+        bucket["total"] += 1
+        bucket["hits"] += int(is_hit)
+
+        indicators = data.get("indicators", ["__global__"])
+        if indicators is None:
+            indicators = ["__global__"]
+        for ind in indicators:
+            ref = p["by_indicator"].setdefault(ind, {"hit": 0, "miss": 0})
+            ref["hit" if is_hit else "miss"] += 1
+    return p
+
+
+def merge(partials: Iterable[Dict[str, Any]], into: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    out = into or empty_partial()
+    for p in partials:
+        out["sample_size"] += p["sample_size"]
+        out["hit_count"] += p["hit_count"]
+        out["confidence_sum"] += p["confidence_sum"]
+        for k in ("hits", "total"):
+            out["no_confidence"][k] += p["no_confidence"][k]
+            for b in BANDS:
+                out["bands"][b][k] += p["bands"][b][k]
+        for ind, s in p["by_indicator"].items():
+            ref = out["by_indicator"].setdefault(ind, {"hit": 0, "miss": 0})
+            ref["hit"] += s["hit"]
+            ref["miss"] += s["miss"]
+    return out
+
+
+def finalize(p: Dict[str, Any], shape: str = "base") -> Dict[str, Any]:
+    """部分彙總 → build_backtest_summary / build_backtest_summary_ext 的輸出形狀"""
+    default = DEFAULT_CONFIDENCE[shape]
+    missing = p["no_confidence"]
+    total = p["sample_size"]
+    confidence_sum = p["confidence_sum"] + default * missing["total"]
+
+    bands = {b: {"hits": v["hits"], "total": v["total"], "rate": 0.0} for b, v in p["bands"].items()}
+    bands[_band(default)]["hits"] += missing["hits"]
+    bands[_band(default)]["total"] += missing["total"]
+
+    result: Dict[str, Any] = {
+        "sample_size": total,
+        "hit_count": p["hit_count"],
+    }
+    by_indicator = {k: dict(v) for k, v in p["by_indicator"].items()}
+    if shape == "base":
+        result.update({
+            "confidence_sum": confidence_sum,
+            "hit_rate": 0.0,
+            "avg_confidence": 0.0,
+            "by_indicator": by_indicator,
+            "by_confidence_band": bands,
+        })
+    else:
+        result.update({
+            "hit_rate": 0.0,
+            "avg_confidence": 0.0,
+            "by_confidence_band": bands,
+            "by_indicator": by_indicator,
+        })
+
+    if total > 0:
+        result["hit_rate"] = round(p["hit_count"] / total, 4)
+        result["avg_confidence"] = round(confidence_sum / total, 4)
+        for band in bands.values():
+            if band["total"] > 0:
+                band["rate"] = round(band["hits"] / band["total"], 4)
+    return result
+
+# -------------------------------------------------
+# 日彙總（DERIVED）
+# -------------------------------------------------
+
+def rollup_path(market: str, day: str, root: str = VAULT_ROOT) -> str:
+    return os.path.join(root, "DERIVED", "backtest", market, "rollups", day[:4], f"{day}.json")
+
+
+def _settled_source(paths: List[str]) -> Optional[str]:
+    """
+    已封存 segment 且同日舊版小檔都已被涵蓋（遷移後未移走）→ 可快取，回傳 body sha256
+    """
+    if not paths or not paths[0].endswith(SEGMENT_EXT) or not is_sealed(paths[0]):
+        return None
+    footer = read_footer(paths[0])
+    if not footer:
+        return None
+    covered = footer.get("symbols", {})
+    if any(os.path.basename(p).rsplit("_", 1)[0] not in covered for p in paths[1:]):
+        return None
+    return footer.get("sha256")
+
+
+def _load_rollup(path: str, source: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            r = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if r.get("version") != ROLLUP_VERSION or r.get("source") != source:
+        return None
+    return r["partial"]
+
+
+def _save_rollup(path: str, source: str, partial: Dict[str, Any]):
+    # 讀取路徑上建快取：多個讀取端可能同時寫同一天 → 各用獨立 tmp（同目錄，rename 仍為原子）
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": ROLLUP_VERSION,
+                "source": source,
+                "built_at": datetime.utcnow().isoformat(),
+                "partial": partial,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def day_partial(market: str, day: str, paths: List[str], root: str = VAULT_ROOT) -> Dict[str, Any]:
+    """
+    已結算日：讀 / 建日彙總
+    未結算日（今日、尚有舊版小檔）：直接由原始紀錄計算
+    """
+    source = _settled_source(paths)
+    if source is None:
+        return aggregate(read_day(paths))
+
+    path = rollup_path(market, day, root)
+    partial = _load_rollup(path, source)
+    if partial is None:
+        partial = aggregate(read_day(paths))
+        _save_rollup(path, source, partial)
+    return partial
+
+
+def build_day_rollup(market: str, day, root: str = VAULT_ROOT) -> Optional[Dict[str, Any]]:
+    """日結時呼叫（segment 封存之後）"""
+    day = as_day(day)
+    for d, paths in window_days(market, day, day, root):
+        return day_partial(market, d, paths, root)
+    return None
+
+
+def window_partials(market: str, days: int, root: str = VAULT_ROOT, today=None) -> List[tuple]:
+    """最近 days 天的 [(day, partial)]，日期遞增"""
+    cutoff = (date.fromisoformat(as_day(today)) - timedelta(days=days)).isoformat()
+    return [(d, day_partial(market, d, paths, root)) for d, paths in window_days(market, cutoff, None, root)]
+
+
+def summarize(market: str, days: int, shape: str = "base", root: str = VAULT_ROOT, today=None) -> Dict[str, Any]:
+    return finalize(merge(p for _, p in window_partials(market, days, root, today)), shape)
@@ -0,0 +1,411 @@
+# backtest_segment_store.py
+# 回測分段儲存（LOCKED_RAW/backtest/<market>/segments/<YYYY>/<YYYY-MM-DD>.ndjson）
+# 職責：
+# - 每市場每日一個 append-only NDJSON segment（取代 SYMBOL_YYYY-MM-DD.json 小檔）
+# - 同日同 symbol 只寫一次（write-once）；日結後封存：補 footer 索引 + 設為唯讀
+#   多行程：append / 封存在市場層級檔案鎖（segments/_append.lock）內重新確認後才寫
+#   萬一 segment 內仍有重複 symbol（鎖外的舊資料）→ 一律以第一筆（最早寫入）為準
+# - 讀取：逐筆 / 依 footer 隨機存取單一 symbol / 時間窗載入為陣列
+# - 相容舊版小檔：同日 segment 未涵蓋的 symbol 仍會讀到
+# ❌ 不覆寫 ❌ 不刪除 ❌ 不做統計判斷
+
+import os
+import json
+import stat
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from vault.file_lock import file_lock
+except ImportError:
+    from file_lock import file_lock
+
+# =================================================
+# Vault Root（鐵律）
+# =================================================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+
+SEGMENT_DIRNAME = "segments"
+SEGMENT_EXT = ".ndjson"
+FOOTER_KEY = "__footer__"
+
+# 同一行程內已知的 symbol：{path: {"covered": bytes, "symbols": set}}
+# 鎖內只重掃 covered 之後其他行程新增的行（不必每次 append 都重掃當日 segment）
+_OPEN_SYMBOLS: Dict[str, Dict[str, Any]] = {}
+
+def _sibling(name: str):
+    # 延遲載入：backtest_manifest / backtest_rollup 依賴本模組
+    import importlib
+    try:
+        return importlib.import_module(f"vault.{name}")
+    except ImportError:
+        return importlib.import_module(name)
+
+
+def _manifest():
+    return _sibling("backtest_manifest")
+
+# -------------------------------------------------
+# 路徑
+# -------------------------------------------------
+
+def market_dir(market: str, root: str = VAULT_ROOT) -> str:
+    return os.path.join(root, "LOCKED_RAW", "backtest", market)
+
+
+def segment_path(market: str, day: str, root: str = VAULT_ROOT) -> str:
+    return os.path.join(market_dir(market, root), SEGMENT_DIRNAME, day[:4], f"{day}{SEGMENT_EXT}")
+
+
+def _lock_path(segment: str) -> str:
+    """同市場所有 segment 共用一把鎖（file_lock 會加 .lock）"""
+    return os.path.join(os.path.dirname(os.path.dirname(segment)), "_append")
+
+
+def as_day(d) -> str:
+    if d is None:
+        return date.today().isoformat()
+    if isinstance(d, (date, datetime)):
+        return d.isoformat()[:10]
+    return str(d)[:10]
+
+
+def is_sealed(path: str) -> bool:
+    """封存後的 segment 為唯讀"""
+    try:
+        return not (os.stat(path).st_mode & stat.S_IWUSR)
+    except OSError:
+        return False
+
+# -------------------------------------------------
+# 低階讀取
+# -------------------------------------------------
+
+def _iter_lines(path: str) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line)；忽略未以換行結尾的殘行（寫入中斷）"""
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield offset, line
+            offset += len(line)
+
+
+def read_footer(path: str) -> Optional[Dict[str, Any]]:
+    """從檔尾往回讀最後一行；無 footer（未封存）回傳 None"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            block = b""
+            pos = end
+            while pos > 0 and block.count(b"\n") < 2:
+                step = min(65536, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step) + block
+        last = block.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        obj = json.loads(last)
+        return obj.get(FOOTER_KEY) if isinstance(obj, dict) else None
+    except Exception:
+        return None
+
+
+def read_segment(path: str) -> List[Dict[str, Any]]:
+    """segment 內全部紀錄；同 symbol 重複時只保留第一筆"""
+    out = []
+    seen = set()
+    for _, line in _iter_lines(path):
+        try:
+            rec = json.loads(line)
+        except Exception:
+            continue
+        if FOOTER_KEY in rec:
+            break
+        if rec.get("symbol") in seen:
+            continue
+        seen.add(rec.get("symbol"))
+        out.append(rec)
+    return out
+
+
+def read_symbol(path: str, symbol: str) -> Optional[Dict[str, Any]]:
+    """封存 segment：依 footer offset 直接讀單筆；未封存則逐行找"""
+    footer = read_footer(path)
+    if footer is None:
+        for rec in read_segment(path):
+            if rec.get("symbol") == symbol:
+                return rec
+        return None
+
+    loc = footer.get("symbols", {}).get(symbol)
+    if not loc:
+        return None
+    with open(path, "rb") as f:
+        f.seek(loc[0])
+        return json.loads(f.read(loc[1]))
+
+# -------------------------------------------------
+# 寫入
+# -------------------------------------------------
+
+def _segment_symbols(path: str) -> set:
+    """當日 segment 已有的 symbol（須在 _lock_path 鎖內呼叫，才能涵蓋其他行程的寫入）"""
+    ent = _OPEN_SYMBOLS.get(path)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if ent is None or size < ent["covered"]:
+        ent = _OPEN_SYMBOLS[path] = {"covered": 0, "symbols": set()}
+    if size > ent["covered"]:
+        with open(path, "rb") as f:
+            f.seek(ent["covered"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                ent["covered"] += len(line)
+                try:
+                    ent["symbols"].add(json.loads(line).get("symbol"))
+                except Exception:
+                    continue
+    return ent["symbols"]
+
+
+def append_record(
+    market: str,
+    symbol: str,
+    record: Dict[str, Any],
+    day=None,
+    root: str = VAULT_ROOT,
+) -> bool:
+    """
+    追加一筆回測紀錄到當日 segment
+    - 已封存 / 同日同 symbol 已存在 → False（LOCKED_RAW 不覆寫）
+    - 判斷與寫入都在市場鎖內：多行程同時寫同一 symbol 只有一筆落地
+    """
+    day = as_day(day)
+    path = segment_path(market, day, root)
+    if is_sealed(path):
+        return False
+
+    line = (json.dumps({"symbol": symbol, **record}, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with file_lock(_lock_path(path)):
+        # 鎖內重新確認：其他行程可能剛封存或剛寫入同一 symbol
+        if is_sealed(path):
+            return False
+        syms = _segment_symbols(path)
+        if symbol in syms:
+            return False
+
+        created = not os.path.exists(path)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, line)  # 單次 write，整行落地
+        finally:
+            os.close(fd)
+        syms.add(symbol)
+
+    # 封存會自行取鎖 → 放在鎖外
+    if created:
+        _manifest().add_file(market, day, path, root)
+        # 新的一天：把本市場之前未封存的 segment 封存
+        seal_before(market, day, root)
+    return True
+
+
+def seal_segment(path: str) -> Optional[Dict[str, Any]]:
+    """
+    日結封存：
+    - 追加 footer（symbol → [offset, length]、筆數、欄位、body sha256）
+    - 設為唯讀（之後 append_record 一律拒絕）
+    - 同 symbol 重複（鎖外寫入的舊資料）→ footer 指向第一筆，count 為不重複筆數
+    已封存 → 回傳既有 footer
+    """
+    if not os.path.exists(path):
+        return None
+    with file_lock(_lock_path(path)):
+        return _seal_locked(path)
+
+
+def _seal_locked(path: str) -> Optional[Dict[str, Any]]:
+    if is_sealed(path):
+        return read_footer(path)
+
+    h = hashlib.sha256()
+    symbols: Dict[str, List[int]] = {}
+    fields = set()
+    count = 0
+    end = 0
+    for offset, line in _iter_lines(path):
+        try:
+            rec = json.loads(line)
+        except Exception:
+            continue
+        if FOOTER_KEY in rec:
+            break
+        h.update(line)
+        end = offset + len(line)
+        if rec.get("symbol") in symbols:
+            continue
+        count += 1
+        fields.update(rec.keys())
+        symbols[rec.get("symbol")] = [offset, len(line)]
+
+    footer = {
+        "count": count,
+        "body_bytes": end,
+        "sha256": h.hexdigest(),
+        "fields": sorted(fields),
+        "symbols": symbols,
+        "sealed_at": datetime.utcnow().isoformat(),
+    }
+    with open(path, "ab") as f:
+        f.write((json.dumps({FOOTER_KEY: footer}, ensure_ascii=False) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+    _OPEN_SYMBOLS.pop(path, None)
+    return footer
+
+
+def segment_days(market: str, root: str) -> List[str]:
+    base = os.path.join(market_dir(market, root), SEGMENT_DIRNAME)
+    if not os.path.isdir(base):
+        return []
+    days = []
+    for year in os.listdir(base):
+        ydir = os.path.join(base, year)
+        if not os.path.isdir(ydir):
+            continue
+        days.extend(fn[: -len(SEGMENT_EXT)] for fn in os.listdir(ydir) if fn.endswith(SEGMENT_EXT))
+    return sorted(days)
+
+
+def seal_before(market: str, day, root: str = VAULT_ROOT) -> List[str]:
+    """封存 day 之前所有未封存的 segment"""
+    day = as_day(day)
+    sealed = []
+    for d in segment_days(market, root):
+        if d >= day:
+            break
+        path = segment_path(market, d, root)
+        if not is_sealed(path):
+            seal_segment(path)
+            sealed.append(d)
+            # 日結：產生當日彙總
+            _sibling("backtest_rollup").build_day_rollup(market, d, root)
+    return sealed
+
+# -------------------------------------------------
+# 時間窗讀取
+# -------------------------------------------------
+
+def legacy_day(fn: str) -> Optional[str]:
+    """舊版小檔名（[TS__]SYMBOL_YYYY-MM-DD.json）→ 日期；不是舊版小檔 → None"""
+    if not fn.endswith(".json"):
+        return None
+    try:
+        _, d_str = fn.rsplit("_", 1)
+        return date.fromisoformat(d_str.replace(".json", "")).isoformat()
+    except Exception:
+        return None
+
+
+def legacy_files(market: str, root: str) -> Dict[str, List[str]]:
+    """舊版 SYMBOL_YYYY-MM-DD.json → {day: [path]}"""
+    base = market_dir(market, root)
+    out: Dict[str, List[str]] = {}
+    if not os.path.isdir(base):
+        return out
+    for fn in os.listdir(base):
+        d = legacy_day(fn)
+        if d is None:
+            continue
+        out.setdefault(d, []).append(os.path.join(base, fn))
+    return out
+
+
+def window_days(market: str, start, end=None, root: str = VAULT_ROOT) -> List[Tuple[str, List[str]]]:
+    """
+    [start, end] 內有資料的日期與檔案（segment 在前、舊版小檔在後），依日期遞增
+    以 DERIVED/backtest/<market>/manifest.json 二分查找，不掃目錄
+    """
+    start, end = as_day(start), as_day(end) if end is not None else "9999-12-31"
+    return _manifest().window_files(market, start, end, root)
+
+
+def read_day(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    單日所有紀錄：segment 為準，舊版小檔只補 segment 沒有的 symbol
+    """
+    records: List[Dict[str, Any]] = []
+    seen = set()
+    for p in paths:
+        if p.endswith(SEGMENT_EXT):
+            for rec in read_segment(p):
+                records.append(rec)
+                seen.add(rec.get("symbol"))
+            continue
+        symbol = os.path.basename(p).rsplit("_", 1)[0]
+        if symbol in seen:
+            continue
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                rec = json.load(f)
+        except Exception:
+            continue
+        if isinstance(rec, dict):
+            rec.setdefault("symbol", symbol)
+            records.append(rec)
+            seen.add(symbol)
+    return records
+
+
+def iter_window(market: str, start, end=None, root: str = VAULT_ROOT) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """逐筆 (day, record)，日期遞增"""
+    for d, paths in window_days(market, start, end, root):
+        for rec in read_day(paths):
+            yield d, rec
+
+
+def iter_recent(market: str, days: int, root: str = VAULT_ROOT, today=None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """最近 days 天（含 cutoff 當日，與舊版 _iter_backtest_files 相同）"""
+    cutoff = (date.fromisoformat(as_day(today)) - timedelta(days=days)).isoformat()
+    return iter_window(market, cutoff, None, root)
+
+
+def load_window(
+    market: str,
+    start,
+    end=None,
+    fields: Iterable[str] = ("pred", "actual", "confidence"),
+    root: str = VAULT_ROOT,
+) -> Dict[str, np.ndarray]:
+    """
+    時間窗載入為欄位陣列：
+    - date：datetime64[D]；symbol：object
+    - 其餘欄位：可轉數值 → float64（缺值 NaN），否則 object（缺值 None）
+    """
+    fields = list(fields)
+    dates, symbols = [], []
+    cols: Dict[str, list] = {f: [] for f in fields}
+    for d, rec in iter_window(market, start, end, root):
+        dates.append(d)
+        symbols.append(rec.get("symbol"))
+        for f in fields:
+            cols[f].append(rec.get(f))
+
+    out = {
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "symbol": np.array(symbols, dtype=object),
+    }
+    for f, values in cols.items():
+        try:
+            out[f] = np.array([np.nan if v is None else float(v) for v in values], dtype="float64")
+        except (TypeError, ValueError):
+            out[f] = np.array(values, dtype=object)
+    return out
@@ -0,0 +1,87 @@
+# backtest_window_stats.py
+# 多時間窗回測統計引擎（單次掃描）
+# 職責：
+# - 只讀一次最大視窗內的日彙總（或當日原始紀錄），依資料日距今天數分桶
+# - 由近到遠累加，依序輸出 5 / 20 / 60 / 250 日等所有視窗
+# - 同一次掃描同時輸出 base（build_backtest_summary）與 ext（build_backtest_summary_ext）形狀
+# ✔ 只讀 LOCKED_RAW（日彙總快取於 DERIVED）
+# ❌ 不學習 ❌ 不寫權重 ❌ 不做市場判斷
+#
+# 用法：
+#   python vault/backtest_window_stats.py TW [--windows 5 20 60 250]
+#   python -m vault.backtest_window_stats TW [--windows 5 20 60 250]
+
+import sys
+import json
+import argparse
+from datetime import date
+from typing import Any, Dict, Iterable, Tuple
+
+try:
+    from vault.backtest_segment_store import VAULT_ROOT, as_day
+    from vault.backtest_rollup import empty_partial, finalize, merge, window_partials
+except ImportError:
+    from backtest_segment_store import VAULT_ROOT, as_day
+    from backtest_rollup import empty_partial, finalize, merge, window_partials
+
+WINDOWS = (5, 20, 60, 250)
+SHAPES = ("base", "ext")
+
+
+def build_backtest_windows(
+    market: str,
+    windows: Iterable[int] = WINDOWS,
+    shapes: Tuple[str, ...] = SHAPES,
+    root: str = VAULT_ROOT,
+    today=None,
+) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """
+    回傳 {shape: {days: summary}}
+    每個 summary 與 build_backtest_summary(market, days) / _ext 相同
+    """
+    ws = sorted(set(int(w) for w in windows))
+    out: Dict[str, Dict[int, Dict[str, Any]]] = {s: {} for s in shapes}
+    if not ws:
+        return out
+
+    today = date.fromisoformat(as_day(today))
+    parts = window_partials(market, ws[-1], root, today)
+
+    acc = empty_partial()
+    i = 0
+
+    def emit(w: int):
+        for s in shapes:
+            out[s][w] = finalize(acc, s)
+
+    # 由新到舊：資料日距今超過視窗 → 該視窗已累加完成
+    for d, p in reversed(parts):
+        age = (today - date.fromisoformat(d)).days
+        while i < len(ws) and age > ws[i]:
+            emit(ws[i])
+            i += 1
+        merge([p], into=acc)
+
+    while i < len(ws):
+        emit(ws[i])
+        i += 1
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-window backtest hit rates (single scan)")
+    ap.add_argument("market", help="TW|US|JP|CRYPTO")
+    ap.add_argument("--windows", type=int, nargs="+", default=list(WINDOWS))
+    ap.add_argument("--root", default=VAULT_ROOT, help="Quant-Vault root")
+    ap.add_argument("--shape", choices=SHAPES, default="base")
+    args = ap.parse_args()
+
+    res = build_backtest_windows(args.market.upper(), args.windows, (args.shape,), args.root)[args.shape]
+    print(json.dumps({
+        f"{w}d": {"sample_size": s["sample_size"], "hit_rate": s["hit_rate"], "avg_confidence": s["avg_confidence"]}
+        for w, s in res.items()
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,27 @@
-import os, json, time
-from datetime import datetime, timedelta
+import os, json
 from .resolver import ensure_market
+from .access_catalog import cold_files, forget
+from .vault_tiering import tier_managed
 
 N_DAYS = 180
 K_TOP5 = 30
 
-def is_cold(file_path):
-    last_access = datetime.fromtimestamp(os.path.getatime(file_path))
-    return datetime.now() - last_access > timedelta(days=N_DAYS)
-
 def clean_market(market: str, protect_symbols: set):
     root = ensure_market(market)
     for cat in ["history", "cache"]:
         d = os.path.join(root, cat)
-        for f in os.listdir(d):
-            fp = os.path.join(d, f)
-            if not is_cold(fp):
-                continue
+        # 只取超過 N_DAYS 未存取者（access_catalog 索引；刪除前逐檔 stat 複核）
+        for f in cold_files(d, N_DAYS, verify=True):
+            fp = f["path"]
+            if tier_managed(fp):
+                continue  # 分層範圍由 vault_tiering 搬移，不刪
             try:
-                data = json.load(open(fp))
+                with open(fp) as fh:
+                    data = json.load(fh)
                 symbols = set(data.get("symbols", []))
                 if symbols & protect_symbols:
                     continue
                 os.remove(fp)
+                forget(fp)
             except Exception:
                 continue
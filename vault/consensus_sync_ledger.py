@@ -4,24 +4,41 @@
 # - 記錄 Guardian / Stock-Genius / Orchestrator 三方每一次權重或狀態同步
 # - 強制共識：未達門檻不可寫入正式狀態
 # - 作為「互相學習 × 互相約制 × 可回溯審計」的唯一依據
+# 儲存：
+# - sync_ledger.ndjson：append-only，一行一筆（寫入 O(1)，不再整檔重寫）
+# - sync_ledger.idx：旁掛 offset 索引（market \t offset \t length），同樣 append-only
+# - latest_records：由檔尾往回讀；指定 market 時走 offset 索引
+# - 舊版 sync_ledger.json（整份陣列）首次存取時自動轉換，原檔改名保留
 # ❌ 不計算權重 ❌ 不做市場判斷 ❌ 不觸發學習
+#
+# 用法：
+#   python vault/consensus_sync_ledger.py convert
+#   python vault/consensus_sync_ledger.py tail [--market TW] [--limit 20]
 
 import os
+import sys
 import json
+import argparse
+import threading
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 # =================================================
 # Vault Root（鐵律）
 # =================================================
-VAULT_ROOT = r"E:\Quant-Vault"
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
 
-LEDGER_PATH = os.path.join(
-    VAULT_ROOT,
-    "LOCKED_DECISION",
-    "consensus",
-    "sync_ledger.json"
-)
+LEDGER_DIR = os.path.join(VAULT_ROOT, "LOCKED_DECISION", "consensus")
+LEDGER_PATH = os.path.join(LEDGER_DIR, "sync_ledger.ndjson")
+INDEX_PATH = os.path.join(LEDGER_DIR, "sync_ledger.idx")
+LEGACY_PATH = os.path.join(LEDGER_DIR, "sync_ledger.json")
+LEGACY_CONVERTED_SUFFIX = ".converted"
+
+TAIL_BLOCK = 64 * 1024
+
+_LOCK = threading.Lock()
+# 記憶體中的 offset 索引：{"covered": bytes, "markets": {market: [(offset, length)]}}
+_INDEX: Optional[Dict[str, Any]] = None
 
 # =================================================
 # 內部工具
@@ -31,17 +48,145 @@ def _now() -> str:
     return datetime.utcnow().isoformat()
 
 
-def _load() -> List[Dict[str, Any]]:
-    if not os.path.exists(LEDGER_PATH):
-        return []
-    with open(LEDGER_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _append_bytes(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, data)  # 單次 write，整行落地
+    finally:
+        os.close(fd)
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def convert_legacy() -> int:
+    """
+    舊版 JSON 陣列 → NDJSON（一次性）
+    - 已有 NDJSON 帳本時不動作（避免重複）
+    - 轉換成功後舊檔改名為 sync_ledger.json.converted
+    """
+    if not os.path.exists(LEGACY_PATH) or os.path.exists(LEDGER_PATH):
+        return 0
+    with open(LEGACY_PATH, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    tmp = LEDGER_PATH + ".tmp"
+    with open(tmp, "wb") as f:
+        for rec in records:
+            f.write(_encode(rec))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, LEDGER_PATH)
+    os.replace(LEGACY_PATH, LEGACY_PATH + LEGACY_CONVERTED_SUFFIX)
+    return len(records)
+
+
+def _iter_from(offset: int):
+    """(offset, line)；只處理以換行結尾的完整行"""
+    with open(LEDGER_PATH, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield offset, line
+            offset += len(line)
+
 
+def _load_index() -> Dict[str, Any]:
+    index: Dict[str, Any] = {"covered": 0, "markets": {}}
+    seen = set()
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            for row in f:
+                parts = row.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue
+                market, off, length = parts[0], int(parts[1]), int(parts[2])
+                if off in seen:
+                    continue  # 多行程同時補索引 → 以 offset 去重
+                seen.add(off)
+                index["markets"].setdefault(market, []).append((off, length))
+                index["covered"] = max(index["covered"], off + length)
+    except (OSError, ValueError):
+        index = {"covered": 0, "markets": {}}
+    for offs in index["markets"].values():
+        offs.sort()
+    return index
 
-def _save(records: List[Dict[str, Any]]):
-    os.makedirs(os.path.dirname(LEDGER_PATH), exist_ok=True)
-    with open(LEDGER_PATH, "w", encoding="utf-8") as f:
-        json.dump(records, f, indent=2, ensure_ascii=False)
+
+def _sync_index() -> Dict[str, Any]:
+    """索引追上帳本：只掃描 covered 之後新增的位元組"""
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = _load_index()
+    if _size(LEDGER_PATH) < _INDEX["covered"]:
+        # 帳本被替換（例如重新轉換）→ 重建
+        try:
+            os.remove(INDEX_PATH)
+        except OSError:
+            pass
+        _INDEX = {"covered": 0, "markets": {}}
+    if _size(LEDGER_PATH) == _INDEX["covered"]:
+        return _INDEX
+
+    rows = []
+    for offset, line in _iter_from(_INDEX["covered"]):
+        _INDEX["covered"] = offset + len(line)
+        try:
+            market = str(json.loads(line).get("market"))
+        except (ValueError, AttributeError):
+            continue
+        _INDEX["markets"].setdefault(market, []).append((offset, len(line)))
+        rows.append(f"{market}\t{offset}\t{len(line)}\n")
+    if rows:
+        _append_bytes(INDEX_PATH, "".join(rows).encode("utf-8"))
+    return _INDEX
+
+
+def _read_at(locs: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    out = []
+    with open(LEDGER_PATH, "rb") as f:
+        for off, length in locs:
+            f.seek(off)
+            out.append(json.loads(f.read(length)))
+    return out
+
+
+def _tail(limit: int) -> List[Dict[str, Any]]:
+    """由檔尾往回讀，直到取得 limit 行"""
+    if limit <= 0 or not os.path.exists(LEDGER_PATH):
+        return []
+    with open(LEDGER_PATH, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        # 最後一行若不以換行結尾（寫入中）→ 不計入
+        while pos > 0 and buf.count(b"\n") <= limit:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    lines = buf.split(b"\n")
+    lines = lines[:-1]            # 最後一個換行之後：空字串或殘行
+    if pos > 0:
+        lines = lines[1:]         # 區塊開頭可能是截斷的行
+    out = []
+    for line in lines[-limit:]:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue
+    return out
 
 
 # =================================================
@@ -73,13 +218,51 @@ def record_consensus(
         "final_action": final_action
     }
 
-    records = _load()
-    records.append(record)
-    _save(records)
+    with _LOCK:
+        convert_legacy()
+        _append_bytes(LEDGER_PATH, _encode(record))
 
     return record
 
 
-def latest_records(limit: int = 20) -> List[Dict[str, Any]]:
-    records = _load()
-    return records[-limit:]
+def latest_records(limit: int = 20, market: Optional[str] = None) -> List[Dict[str, Any]]:
+    """最近 limit 筆（舊 → 新）；指定 market 時只取該市場"""
+    with _LOCK:
+        convert_legacy()
+        if market is None:
+            return _tail(limit)
+        if limit <= 0 or not os.path.exists(LEDGER_PATH):
+            return []
+        locs = _sync_index()["markets"].get(str(market), [])
+        return _read_at(locs[-limit:])
+
+
+def market_records(market: str) -> List[Dict[str, Any]]:
+    """單一市場全部紀錄（舊 → 新），只讀該市場的行"""
+    with _LOCK:
+        convert_legacy()
+        if not os.path.exists(LEDGER_PATH):
+            return []
+        return _read_at(list(_sync_index()["markets"].get(str(market), [])))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Consensus sync ledger")
+    ap.add_argument("command", choices=["convert", "tail"])
+    ap.add_argument("--market", help="TW|US|JP|CRYPTO")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    if args.command == "convert":
+        with _LOCK:
+            n = convert_legacy()
+            if os.path.exists(LEDGER_PATH):
+                _sync_index()
+        print(f"✅ converted {n} records → {LEDGER_PATH}" if n else "ℹ️ nothing to convert")
+        return
+    for rec in latest_records(args.limit, args.market):
+        print(json.dumps(rec, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
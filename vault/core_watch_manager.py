@@ -2,6 +2,11 @@ from datetime import datetime
 from pathlib import Path
 import json
 
+try:
+    from vault.access_catalog import touch_read, touch_write
+except ImportError:
+    from access_catalog import touch_read, touch_write
+
 CORE_LIMIT = 7
 DECAY_DAYS = 30
 
@@ -11,11 +16,13 @@ HISTORY_PATH = Path("E:/Quant-Vault/STOCK_DB/history_rank.json")
 def load_json(path):
     if not path.exists():
         return {}
+    touch_read(path)
     return json.loads(path.read_text(encoding="utf-8"))
 
 def save_json(path, data):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    touch_write(path)
 
 def decay_score(last_seen: str):
     days = (datetime.utcnow() - datetime.fromisoformat(last_seen)).days
@@ -0,0 +1,45 @@
+# file_lock.py
+# 跨行程檔案鎖（vault/ 內共用）
+# 職責：
+# - file_lock(path)：獨佔 <path>.lock；POSIX 用 fcntl.flock，Windows 用 msvcrt.locking
+# - 與 tools/vault_ledger.ledger_lock 同一把鎖檔格式（同路徑互斥）；
+#   放在 vault/ 內 → 以 python vault/xxx.py 直接執行時也載入得到
+# - flock 以「開檔」為單位：同一行程內不可對同一路徑巢狀上鎖（會自鎖）
+# ❌ 不寫資料（只開 .lock 檔）
+
+import os
+import time
+from contextlib import contextmanager
+
+LOCK_SUFFIX = ".lock"
+
+
+@contextmanager
+def file_lock(path):
+    lock_path = str(path) + LOCK_SUFFIX
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    f = open(lock_path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)  # LK_LOCK 自身重試 10 次後仍失敗 → 繼續等
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
@@ -0,0 +1,208 @@
+# model_registry.py
+# 模型指紋註冊表（MODELS/registry）
+# 職責：
+# - 以 (symbol, 特徵集, 超參數) 為模型規格，以訓練資料雜湊為版本指紋
+# - 資料未變 → 直接重用；只多了新 K 棒 → 熱啟動補幾輪 boosting；其餘 → 重新訓練
+# - 記錄每次訓練耗時與模型大小（train_log.ndjson），觀察每輪重訓成本
+# ❌ 不訓練（由呼叫端執行 xgboost）❌ 不做市場判斷 ❌ 不寫 LOCKED_*
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# =================================================
+# Vault Root（鐵律）
+# =================================================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+
+REGISTRY_DIR = os.path.join(VAULT_ROOT, "MODELS", "registry")
+
+# 熱啟動規則
+WARM_ROUNDS = 20          # 每次新 K 棒補幾輪
+MAX_NEW_ROWS = 10         # 新增列超過此數 → 視為資料大改，重新訓練
+MAX_TREE_RATIO = 2.0      # 總樹數超過基礎 n_estimators × 倍數 → 重新訓練（避免無限長大）
+
+# -------------------------------------------------
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p)
+    return h.hexdigest()
+
+
+def _as_bytes(a) -> bytes:
+    return np.ascontiguousarray(np.asarray(a, dtype="float64")).tobytes()
+
+
+def spec_id(symbol: str, feats: List[str], params: Dict[str, Any]) -> str:
+    """模型規格 ID：symbol + 特徵集 + 超參數"""
+    spec = json.dumps(
+        {"symbol": symbol, "feats": list(feats), "params": params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return _digest(spec.encode("utf-8"))[:16]
+
+
+def data_hash(X, y) -> str:
+    """訓練資料指紋（特徵 + target，逐列順序敏感）"""
+    X = np.asarray(X, dtype="float64")
+    return _digest(str(X.shape).encode("ascii"), _as_bytes(X), _as_bytes(y))
+
+
+def _row_hash(X, y, i: int) -> str:
+    return _digest(_as_bytes(np.asarray(X)[i]), _as_bytes(np.asarray(y)[i:i + 1]))
+
+
+# =================================================
+# 公開 API
+# =================================================
+
+class ModelRegistry:
+    def __init__(self, root: str = REGISTRY_DIR, warm_rounds: int = WARM_ROUNDS):
+        self.root = root
+        self.warm_rounds = warm_rounds
+        self.log_path = os.path.join(root, "train_log.ndjson")
+
+    # ---------- 檔案層 ----------
+
+    def _paths(self, symbol: str, sid: str) -> Tuple[str, str]:
+        d = os.path.join(self.root, symbol.replace("/", "_"))
+        return os.path.join(d, f"{sid}.json"), os.path.join(d, f"{sid}.ubj")
+
+    def get(self, symbol: str, sid: str) -> Tuple[Optional[Dict[str, Any]], Optional[bytes]]:
+        meta_path, model_path = self._paths(symbol, sid)
+        if not (os.path.exists(meta_path) and os.path.exists(model_path)):
+            return None, None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(model_path, "rb") as f:
+                return meta, f.read()
+        except Exception:
+            return None, None
+
+    # ---------- 決策 ----------
+
+    def plan(
+        self,
+        symbol: str,
+        feats: List[str],
+        params: Dict[str, Any],
+        X,
+        y,
+    ) -> Tuple[str, Optional[Dict[str, Any]], Optional[bytes]]:
+        """
+        回傳 (action, meta, model_bytes)
+        - reuse：訓練資料指紋相同
+        - warm ：舊訓練資料最後一列仍在，且其後只多了少量新列
+        - train：無紀錄 / 資料大改 / 樹數已達上限
+        """
+        sid = spec_id(symbol, feats, params)
+        meta, raw = self.get(symbol, sid)
+        if meta is None:
+            return "train", None, None
+
+        if meta.get("data_hash") == data_hash(X, y):
+            return "reuse", meta, raw
+
+        n = len(y)
+        base = int(params.get("n_estimators", 100))
+        if meta.get("n_trees", 0) + self.warm_rounds > base * MAX_TREE_RATIO:
+            return "train", meta, None
+
+        tail = meta.get("tail_hash")
+        for k in range(n - 2, max(n - 2 - MAX_NEW_ROWS, -1), -1):
+            if _row_hash(X, y, k) == tail:
+                return "warm", meta, raw
+
+        return "train", meta, None
+
+    def save(
+        self,
+        symbol: str,
+        feats: List[str],
+        params: Dict[str, Any],
+        X,
+        y,
+        model_bytes: bytes,
+        action: str,
+        train_sec: float,
+        n_trees: int,
+    ) -> Dict[str, Any]:
+        sid = spec_id(symbol, feats, params)
+        meta_path, model_path = self._paths(symbol, sid)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        with open(model_path + ".tmp", "wb") as f:
+            f.write(model_bytes)
+        os.replace(model_path + ".tmp", model_path)
+
+        meta = {
+            "symbol": symbol,
+            "spec_id": sid,
+            "feats": list(feats),
+            "params": params,
+            "data_hash": data_hash(X, y),
+            "tail_hash": _row_hash(X, y, len(y) - 1) if len(y) else None,
+            "n_rows": int(len(y)),
+            "n_trees": int(n_trees),
+            "action": action,
+            "train_sec": round(float(train_sec), 4),
+            "size_bytes": len(model_bytes),
+            "trained_at": _now(),
+        }
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(meta_path + ".tmp", meta_path)
+
+        self.log(symbol, sid, action, train_sec, len(model_bytes))
+        return meta
+
+    # ---------- 成本紀錄 ----------
+
+    def touch(self, symbol: str, feats: List[str], params: Dict[str, Any]):
+        """記錄一次重用（不重寫模型）"""
+        self.log(symbol, spec_id(symbol, feats, params), "reuse")
+
+    def log(self, symbol: str, sid: str, action: str, train_sec: float = 0.0, size_bytes: int = 0):
+        os.makedirs(self.root, exist_ok=True)
+        line = json.dumps({
+            "ts": _now(),
+            "symbol": symbol,
+            "spec_id": sid,
+            "action": action,
+            "train_sec": round(float(train_sec), 4),
+            "size_bytes": int(size_bytes),
+        }, ensure_ascii=False)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def cost_summary(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        彙整訓練成本（since：ISO 時間字串，只計之後的紀錄）
+        """
+        out = {a: {"count": 0, "train_sec": 0.0, "size_bytes": 0} for a in ("train", "warm", "reuse")}
+        if not os.path.exists(self.log_path):
+            return out
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except Exception:
+                    continue
+                if since and r.get("ts", "") < since:
+                    continue
+                bucket = out.setdefault(r.get("action", "train"), {"count": 0, "train_sec": 0.0, "size_bytes": 0})
+                bucket["count"] += 1
+                bucket["train_sec"] = round(bucket["train_sec"] + r.get("train_sec", 0.0), 4)
+                bucket["size_bytes"] += r.get("size_bytes", 0)
+        return out
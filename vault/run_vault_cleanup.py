@@ -1,11 +1,20 @@
 from pathlib import Path
-from vault.vault_meta_builder import build_meta
+from vault.access_catalog import iter_files
 from vault.vault_ai_judge import ai_should_delete
 from vault.vault_executor import safe_delete
+from tools.vault_ai_judge import COLD_DAYS
 
 def run_cleanup(root: Path):
-    for p in root.rglob("*.json"):
-        meta = build_meta(p)
+    # 檔案清單來自 access_catalog（不 rglob）；只取超過判斷門檻的候選檔，
+    # 候選檔再逐檔 stat 複核（verify），不單信 seed 的 mtime
+    for f in iter_files(root, older_than_days=COLD_DAYS, suffix=".json", verify=True):
+        p = Path(f["path"])
+        meta = {
+            "path": f["path"],
+            "last_access_days": f["last_access_days"],
+            "last_modify_days": f["last_modify_days"],
+            "size": f["size"],
+        }
 
         # 這些標記由你現有模組補
         meta.update({
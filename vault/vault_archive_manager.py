@@ -1,18 +1,185 @@
+# Vault 冷資料封存管理器（pack 版）
+# 職責：
+# - 批次封存：多個檔案寫進同一個大型 pack（LOCKED_RAW/archive/packs/pack-*.vpk）
+# - 每個成員獨立 zlib 壓縮 → 還原時依 offset 直接 seek 讀單一成員，不解整包
+# - offset 索引：packs/index.ndjson（archive_id → pack / offset / 長度 / sha256），append-only
+# - 舊版「一檔一 zip」封存仍由 vault_restore_manager 相容還原
+# - 寫入端跨行程互斥：index.ndjson.lock（file_lock）涵蓋 pack append + 索引 append，
+#   鎖內重讀索引 → 兩個封存程序不會拿到同一個 archive_id 或交錯寫進同一個 pack
+# ❌ 不刪原檔（由 vault_safe_deleter 負責） ❌ 不改寫既有 pack
+
 import os
-import zipfile
+import json
+import zlib
+import hashlib
+import threading
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional
 
-ARCHIVE_ROOT = r"E:\Quant-Vault\LOCKED_RAW\archive"
+try:
+    from vault.file_lock import file_lock
+except ImportError:
+    from file_lock import file_lock
 
-def archive_file(file_path: str) -> str:
-    os.makedirs(ARCHIVE_ROOT, exist_ok=True)
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+ARCHIVE_ROOT = os.path.join(VAULT_ROOT, "LOCKED_RAW", "archive")
+AUDIT_LOG = os.path.join(VAULT_ROOT, "LOG", "vault_deletion_audit.log")
+
+PACK_DIR = os.path.join(ARCHIVE_ROOT, "packs")
+PACK_INDEX = os.path.join(PACK_DIR, "index.ndjson")
+PACK_EXT = ".vpk"
+PACK_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+_LOCK = threading.Lock()
+# {"covered": bytes, "members": {archive_id: entry}}
+_INDEX: Optional[Dict] = None
+
+
+def _audit(msg: str):
+    os.makedirs(os.path.dirname(AUDIT_LOG), exist_ok=True)
+    with open(AUDIT_LOG, "a", encoding="utf-8") as f:
+        f.write(msg + "\n")
+
+# -------------------------------------------------
+# offset 索引
+# -------------------------------------------------
+
+def _index() -> Dict:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = {"covered": 0, "members": {}}
+    try:
+        size = os.path.getsize(PACK_INDEX)
+    except OSError:
+        return _INDEX
+    if size > _INDEX["covered"]:
+        with open(PACK_INDEX, "rb") as f:
+            f.seek(_INDEX["covered"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                _INDEX["covered"] += len(line)
+                try:
+                    e = json.loads(line)
+                    _INDEX["members"][e["id"]] = e
+                except (ValueError, KeyError):
+                    continue
+    return _INDEX
+
+
+def lookup(archive_id: str) -> Optional[Dict]:
+    with _LOCK:
+        return _index()["members"].get(archive_id)
+
+
+def _current_pack() -> str:
+    packs = sorted(fn for fn in os.listdir(PACK_DIR) if fn.endswith(PACK_EXT)) if os.path.isdir(PACK_DIR) else []
+    if packs:
+        path = os.path.join(PACK_DIR, packs[-1])
+        if os.path.getsize(path) < PACK_MAX_BYTES:
+            return path
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(PACK_DIR, f"pack-{ts}-{len(packs) + 1:05d}{PACK_EXT}")
+
+# -------------------------------------------------
+# 封存
+# -------------------------------------------------
+
+def archive_files(file_paths: Iterable[str]) -> Dict[str, str]:
+    """
+    批次封存（跨行程以 file_lock 互斥）
+    回傳 {原路徑: archive_id}；讀不到的檔案不列入
+    """
+    file_paths = list(file_paths)
+    out: Dict[str, str] = {}
+    if not file_paths:
+        return out
 
+    os.makedirs(PACK_DIR, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    name = os.path.basename(file_path)
-    zip_name = f"{name}.{ts}.zip"
-    zip_path = os.path.join(ARCHIVE_ROOT, zip_name)
+    entries: List[Dict] = []
+
+    with _LOCK, file_lock(PACK_INDEX):
+        # 鎖內重讀：其他程序剛寫入的成員與 pack 大小都要看到
+        members = _index()["members"]
+        pack_path = _current_pack()
+        f = open(pack_path, "ab")
+        try:
+            for src in file_paths:
+                try:
+                    with open(src, "rb") as fh:
+                        raw = fh.read()
+                except OSError:
+                    continue
+
+                name = os.path.basename(src)
+                archive_id, n = f"{name}.{ts}", 1
+                while archive_id in members or archive_id in out.values():
+                    archive_id = f"{name}.{ts}.{n}"
+                    n += 1
+
+                # pack 滿了 → 換新 pack（同一批可跨多個 pack）
+                if f.tell() >= PACK_MAX_BYTES:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    pack_path = _current_pack()
+                    f = open(pack_path, "ab")
+
+                blob = zlib.compress(raw, COMPRESS_LEVEL)
+                offset = f.tell()
+                f.write(blob)
+                entries.append({
+                    "id": archive_id,
+                    "pack": os.path.basename(pack_path),
+                    "offset": offset,
+                    "length": len(blob),
+                    "size": len(raw),
+                    "sha256": hashlib.sha256(raw).hexdigest(),
+                    "name": name,
+                    "source": src,
+                    "archived_at": datetime.utcnow().isoformat(),
+                })
+                out[src] = archive_id
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+
+        # 資料先落地，索引後寫（索引裡的每一筆都保證可讀）
+        if entries:
+            with open(PACK_INDEX, "ab") as idx:
+                idx.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8"))
+                idx.flush()
+                os.fsync(idx.fileno())
+            _index()
+
+    if entries:
+        packs = sorted({e["pack"] for e in entries})
+        _audit(f"[{datetime.utcnow().isoformat()}] ARCHIVED: {len(entries)} files -> {', '.join(packs)}")
+    return out
+
+
+def archive_file(file_path: str) -> str:
+    """單檔封存（相容舊介面）；回傳 archive_id（restore 用）"""
+    archived = archive_files([file_path])
+    if file_path not in archived:
+        raise FileNotFoundError(file_path)
+    return archived[file_path]
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-        z.write(file_path, arcname=name)
+# -------------------------------------------------
+# 隨機存取讀取
+# -------------------------------------------------
 
-    return zip_path
+def read_member(archive_id: str) -> bytes:
+    """依 offset 直接讀出單一成員並驗證 sha256"""
+    e = lookup(archive_id)
+    if e is None:
+        raise KeyError(archive_id)
+    with open(os.path.join(PACK_DIR, e["pack"]), "rb") as f:
+        f.seek(e["offset"])
+        raw = zlib.decompress(f.read(e["length"]))
+    if hashlib.sha256(raw).hexdigest() != e["sha256"]:
+        raise ValueError(f"checksum mismatch: {archive_id}")
+    return raw
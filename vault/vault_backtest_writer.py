@@ -1,7 +1,6 @@
-import os
-import json
 from datetime import date
-from writer import safe_write
+from vault_root_guard import assert_vault_ready
+from backtest_segment_store import append_record
 
 VAULT_ROOT = r"E:\Quant-Vault"
 
@@ -13,15 +12,14 @@ def write_backtest_prediction(
 ) -> bool:
     """
     Day 0：寫入預測，用於 5 日後回測
+    追加到 LOCKED_RAW/backtest/<market>/segments/<YYYY>/<YYYY-MM-DD>.ndjson
+    （同日同 symbol 只寫一次）
     """
-    today = date.today().isoformat()
+    assert_vault_ready(None)
 
-    path = os.path.join(
-        VAULT_ROOT,
-        "LOCKED_RAW",
-        "backtest",
-        market,
-        f"{symbol}_{today}.json"
-    )
+    today = date.today().isoformat()
 
-    return safe_write(path, json.dumps(prediction, ensure_ascii=False, indent=2))
+    try:
+        return append_record(market, symbol, prediction, day=today, root=VAULT_ROOT)
+    except Exception:
+        return False
@@ -1,30 +1,15 @@
 # 掃描 Vault 中的冷資料（不做任何刪除）
+# 最後存取時間來自 access_catalog（索引查詢，不再 os.walk）；候選逐檔 stat 複核
 
-import os
-import time
+try:
+    from vault.access_catalog import cold_files
+except ImportError:
+    from access_catalog import cold_files
 
 COLD_DAYS = 180
-NOW = time.time()
 
 def scan(path: str):
-    cold_files = []
-
-    for root, _, files in os.walk(path):
-        if "LOCKED_" in root:
-            continue
-
-        for f in files:
-            full = os.path.join(root, f)
-            try:
-                last_access = os.path.getatime(full)
-            except OSError:
-                continue
-
-            age_days = (NOW - last_access) / 86400
-            if age_days >= COLD_DAYS:
-                cold_files.append({
-                    "path": full,
-                    "age_days": int(age_days)
-                })
-
-    return cold_files
+    return [
+        {"path": f["path"], "age_days": f["age_days"]}
+        for f in cold_files(path, COLD_DAYS, exclude=("LOCKED_",), verify=True)
+    ]
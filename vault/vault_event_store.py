@@ -1,12 +1,393 @@
+# vault_event_store.py
+# Vault 事件日誌（LOG/events/segments/events-NNNNNN.ndjson）
+# 職責：
+# - 系統唯一合法事件寫入器（AI 預測、黑天鵝、系統中止、回測）
+# - append-only NDJSON segment，超過 SEGMENT_MAX_BYTES 換新檔
+# - 三個索引：
+#   1) 事件索引 event_id（= {event_type}_{fingerprint}）→ segment 位置：O(1) 去重 / 單筆讀取
+#   2) 時間索引 (timestamp, event_id) 遞增：「最近 N 筆」由尾端往回取
+#   3) tombstone：刪除只追加墓碑紀錄，不改既有 segment（批次刪除一次追加）
+# - 索引快照存於 LOG/events/segments/_index.json；載入後只重播快照之後新增的位元組
+# - 多行程寫入：去重檢查 + 追加 + 換檔 + compact 都在 segments/_append.lock 內（file_lock），
+#   鎖內先追上其他行程的寫入再判斷；快照 tmp 檔以 pid 區分，atexit 落地不互相踩到
+# - compact：重寫舊 segment，移除已刪除事件（墓碑保留供審計）；併入舊版單檔事件
+#   完成後遞增 compaction 世代（segments/_generation）：其他行程的記憶體索引 / 舊快照
+#   世代不符 → 全量重建（offset 已失效，不可沿用）
+# - 相容舊版 LOG/events/{event_type}_{fingerprint}.json（唯讀索引）
+# ❌ 不判斷 ❌ 不覆寫既有事件
+#
+# 用法：
+#   python vault/vault_event_store.py stats
+#   python vault/vault_event_store.py compact [--fold-legacy]
+
 import os
+import sys
 import json
-from datetime import datetime
-from typing import Dict, Any
+import bisect
+import atexit
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from vault.file_lock import file_lock
+except ImportError:
+    from file_lock import file_lock
 
-VAULT_ROOT = r"E:\Quant-Vault"
+# =================================================
+# Vault Root（鐵律）
+# =================================================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
 EVENT_DIR = os.path.join(VAULT_ROOT, "LOG", "events")
+SEGMENT_DIR = os.path.join(EVENT_DIR, "segments")
+INDEX_PATH = os.path.join(SEGMENT_DIR, "_index.json")
+GENERATION_PATH = os.path.join(SEGMENT_DIR, "_generation")
+APPEND_LOCK_PATH = os.path.join(SEGMENT_DIR, "_append")  # file_lock 會加 .lock
+LEGACY_ARCHIVE_DIR = os.path.join(EVENT_DIR, "legacy_archive")
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_EXT = ".ndjson"
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+INDEX_VERSION = 2
+
+OP_EVENT = "event"
+OP_TOMBSTONE = "tombstone"
+
+RECENT_HOURS = 24
+BACKTEST_EVENT_TYPE = "backtest"
+
+# 事件索引欄位：[segment, offset, length, timestamp, event_type, fingerprint]
+# segment == "" → 舊版單檔事件（EVENT_DIR/{event_id}.json）
+LEGACY = ""
+
+_LOCK = threading.RLock()
+_STATE: Optional[Dict[str, Any]] = None
+
+# -------------------------------------------------
+# 路徑 / 格式
+# -------------------------------------------------
+
+def event_id(event_type: str, fingerprint: str) -> str:
+    return f"{event_type}_{fingerprint}"
+
+
+def _segment_name(seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{seq:06d}{SEGMENT_EXT}"
+
+
+def _segment_seq(name: str) -> int:
+    return int(name[len(SEGMENT_PREFIX): -len(SEGMENT_EXT)])
+
+
+def _list_segments() -> List[str]:
+    if not os.path.isdir(SEGMENT_DIR):
+        return []
+    return sorted(
+        fn for fn in os.listdir(SEGMENT_DIR)
+        if fn.startswith(SEGMENT_PREFIX) and fn.endswith(SEGMENT_EXT)
+    )
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _dir_mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _generation() -> int:
+    """compaction 世代（每次 compact +1；檔案不存在 = 0）"""
+    try:
+        with open(GENERATION_PATH, "r", encoding="ascii") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _bump_generation() -> int:
+    gen = _generation() + 1
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    tmp = GENERATION_PATH + ".tmp"
+    with open(tmp, "w", encoding="ascii") as f:
+        f.write(str(gen))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, GENERATION_PATH)
+    return gen
+
+
+def _encode(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _parse_ts(ts) -> Optional[datetime]:
+    if not ts:
+        return None
+    if isinstance(ts, datetime):
+        return ts
+    try:
+        return datetime.fromisoformat(str(ts))
+    except ValueError:
+        return None
+
+# -------------------------------------------------
+# 索引狀態
+# -------------------------------------------------
+
+def _empty_state() -> Dict[str, Any]:
+    return {
+        "generation": 0,     # 建立索引時的 compaction 世代
+        "covered": {},       # segment → 已索引到的位元組
+        "events": {},        # event_id → [segment, offset, length, ts, type, fp]
+        "tombstones": [],    # 依寫入順序
+        "legacy_mtime_ns": 0,
+        "time": [],          # [(ts, event_id)] 遞增（衍生，不存檔）
+        "fp_latest": {},     # fingerprint → 最新 ts（衍生，不存檔）
+        "dirty": False,
+    }
+
+
+def _derive(state: Dict[str, Any]):
+    events = state["events"]
+    state["time"] = sorted((loc[3], eid) for eid, loc in events.items())
+    fp_latest: Dict[str, str] = {}
+    for loc in events.values():
+        if loc[3] > fp_latest.get(loc[5], ""):
+            fp_latest[loc[5]] = loc[3]
+    state["fp_latest"] = fp_latest
+
+
+def _index_event(state: Dict[str, Any], eid: str, loc: list):
+    # write-once：同一 event_id 以第一筆為準
+    if eid in state["events"]:
+        return
+    state["events"][eid] = loc
+    bisect.insort(state["time"], (loc[3], eid))
+    if loc[3] > state["fp_latest"].get(loc[5], ""):
+        state["fp_latest"][loc[5]] = loc[3]
+
+
+def _apply_tombstone(state: Dict[str, Any], rec: Dict[str, Any]):
+    loc = state["events"].pop(rec["id"], None)
+    state["tombstones"].append({
+        "id": rec["id"],
+        "event_type": rec.get("event_type") or (loc[4] if loc else None),
+        "reason": rec.get("reason"),
+        "deleted_at": rec.get("deleted_at"),
+    })
+    if loc is None:
+        return
+    # 時間索引同步移除（避免已刪除的 id 在時間索引裡無限累積）
+    times = state["time"]
+    i = bisect.bisect_left(times, (loc[3], rec["id"]))
+    if i < len(times) and times[i] == (loc[3], rec["id"]):
+        del times[i]
+    fp = loc[5]
+    if state["fp_latest"].get(fp) == loc[3]:
+        state["fp_latest"].pop(fp, None)
+
+
+def _replay(state: Dict[str, Any], seg: str):
+    """從已索引位置往後重播 segment（只處理以換行結尾的完整行）"""
+    path = os.path.join(SEGMENT_DIR, seg)
+    offset = state["covered"].get(seg, 0)
+    if _size(path) <= offset:
+        state["covered"].setdefault(seg, offset)
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                rec = None
+            if isinstance(rec, dict):
+                op = rec.get("op")
+                if op == OP_EVENT:
+                    _index_event(state, rec["id"], [
+                        seg, offset, len(line), rec.get("timestamp", ""),
+                        rec.get("event_type"), rec.get("fingerprint"),
+                    ])
+                elif op == OP_TOMBSTONE:
+                    _apply_tombstone(state, rec)
+            offset += len(line)
+    state["covered"][seg] = offset
+    state["dirty"] = True
+
+
+def _scan_legacy(state: Dict[str, Any]):
+    """舊版單檔事件：目錄 mtime 變動時才重掃"""
+    mtime = _dir_mtime(EVENT_DIR)
+    if mtime == state["legacy_mtime_ns"]:
+        return
+    deleted = {t["id"] for t in state["tombstones"]}
+    if os.path.isdir(EVENT_DIR):
+        for fn in os.listdir(EVENT_DIR):
+            if not fn.endswith(".json") or fn.startswith("_"):
+                continue
+            eid = fn[:-len(".json")]
+            if eid in state["events"] or eid in deleted:
+                continue
+            try:
+                with open(os.path.join(EVENT_DIR, fn), "r", encoding="utf-8") as f:
+                    ev = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(ev, dict):
+                continue
+            _index_event(state, eid, [
+                LEGACY, 0, 0, ev.get("timestamp", ""),
+                ev.get("event_type"), ev.get("fingerprint"),
+            ])
+    state["legacy_mtime_ns"] = mtime
+    state["dirty"] = True
+
+
+def _load_state() -> Dict[str, Any]:
+    gen = _generation()
+    state = _empty_state()
+    state["generation"] = gen
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+        # 版本或 compaction 世代不符 → 快照的 offset 不可信，全量重建
+        if snap.get("version") == INDEX_VERSION and snap.get("generation") == gen:
+            for k in ("covered", "events", "tombstones", "legacy_mtime_ns"):
+                state[k] = snap[k]
+    except (OSError, ValueError, KeyError):
+        state = _empty_state()
+        state["generation"] = gen
+
+    segs = _list_segments()
+    # 快照指向的 segment 已不存在 / 被縮小 → 全量重建
+    if any(s not in segs or _size(os.path.join(SEGMENT_DIR, s)) < off for s, off in state["covered"].items()):
+        state = _empty_state()
+        state["generation"] = gen
+
+    _derive(state)
+    for seg in segs:
+        _replay(state, seg)
+    _scan_legacy(state)
+    return state
+
+
+@contextmanager
+def _writer():
+    """寫入端：行程內 _LOCK + 跨行程檔案鎖（同一行程內不可巢狀進入）"""
+    with _LOCK, file_lock(APPEND_LOCK_PATH):
+        yield
+
+
+def _state() -> Dict[str, Any]:
+    global _STATE
+    if _STATE is None:
+        _STATE = _load_state()
+    return _STATE
+
+
+def _active_segment(state: Dict[str, Any]) -> Optional[str]:
+    return max(state["covered"]) if state["covered"] else None
+
+
+def _refresh(state: Dict[str, Any]):
+    """
+    追上其他行程的寫入：
+    - compaction 世代改變 → 就地全量重建（所有呼叫端持有的 state 一併更新）
+    - 已知的每個 segment 都重播新增位元組（其他行程可能仍在追加較舊的 segment），
+      再往後找新 segment（不 listdir；每個 segment 一次 stat）
+    """
+    if _generation() != state["generation"]:
+        state.clear()
+        state.update(_load_state())
+        return
+    seg = _active_segment(state)
+    if seg is None:
+        for s in _list_segments():
+            _replay(state, s)
+        return
+    for s in sorted(state["covered"]):
+        if s != seg:
+            _replay(state, s)
+    while True:
+        _replay(state, seg)
+        nxt = _segment_name(_segment_seq(seg) + 1)
+        if not os.path.exists(os.path.join(SEGMENT_DIR, nxt)):
+            return
+        seg = nxt
+
+
+def _save_index(state: Dict[str, Any]):
+    if not state["dirty"]:
+        return
+    if state["generation"] != _generation():
+        return  # 其他行程已 compact：這份索引已過期，不可蓋掉新快照
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    tmp = f"{INDEX_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "generation": state["generation"],
+            "covered": state["covered"],
+            "events": state["events"],
+            "tombstones": state["tombstones"],
+            "legacy_mtime_ns": state["legacy_mtime_ns"],
+            "saved_at": datetime.utcnow().isoformat(),
+        }, f, ensure_ascii=False)
+    os.replace(tmp, INDEX_PATH)
+    state["dirty"] = False
+
+
+def flush_index():
+    with _LOCK:
+        if _STATE is not None:
+            _save_index(_STATE)
+
+
+atexit.register(flush_index)
+
+# -------------------------------------------------
+# 寫入
+# -------------------------------------------------
+
+def _append(state: Dict[str, Any], rec: Dict[str, Any]):
+    _append_many(state, [rec])
+
+
+def _append_many(state: Dict[str, Any], recs: List[Dict[str, Any]]):
+    """多筆紀錄一次 write 進同一個 segment（批次不跨檔）；呼叫端須持有 _writer()"""
+    data = b"".join(_encode(rec) for rec in recs)
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+
+    seg = _active_segment(state) or _segment_name(1)
+    path = os.path.join(SEGMENT_DIR, seg)
+    size = _size(path)
+    if size and size + len(data) > SEGMENT_MAX_BYTES:
+        seg = _segment_name(_segment_seq(seg) + 1)
+        path = os.path.join(SEGMENT_DIR, seg)
+        _save_index(state)  # 換檔時落地索引快照
+
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, data)  # 單次 write，整批落地
+    finally:
+        os.close(fd)
+
+    # 由日誌本身更新索引（實際 offset 以檔案為準）
+    state["covered"].setdefault(seg, 0)
+    _refresh(state)
 
-os.makedirs(EVENT_DIR, exist_ok=True)
 
 def record_event(
     event_type: str,
@@ -16,23 +397,330 @@ def record_event(
     """
     系統唯一合法事件寫入器
     - 用於：AI 預測、黑天鵝、系統中止、回測
+    - 同 event_type + fingerprint 已存在 → False（不覆寫）
+    """
+    eid = event_id(event_type, fingerprint)
+    with _writer():
+        state = _state()
+        _refresh(state)
+        if eid in state["events"]:
+            return False
+
+        _append(state, {
+            "op": OP_EVENT,
+            "id": eid,
+            "event_type": event_type,
+            "fingerprint": fingerprint,
+            "timestamp": datetime.utcnow().isoformat(),
+            "payload": payload,
+        })
+        return eid in state["events"]
+
+
+def _payload_fingerprint(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def write_event(event, payload: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    相容入口：
+    - write_event(event_dict)：event_dispatcher（fingerprint = event["id"]）
+    - write_event(event_type, payload)：vault_executor（fingerprint = payload 內容雜湊）
     """
+    if isinstance(event, dict):
+        fingerprint = str(event.get("id") or _payload_fingerprint(event))
+        return record_event(event.get("event_type", "generic"), event, fingerprint)
+    return record_event(str(event), payload or {}, _payload_fingerprint(payload or {}))
+
+
+def delete_vault_event(event_id: str, reason: str = "retention") -> bool:
+    """追加 tombstone；事件不存在 → False"""
+    with _writer():
+        state = _state()
+        _refresh(state)
+        loc = state["events"].get(event_id)
+        if loc is None:
+            return False
+        _append(state, {
+            "op": OP_TOMBSTONE,
+            "id": event_id,
+            "event_type": loc[4],
+            "reason": reason,
+            "deleted_at": datetime.utcnow().isoformat(),
+        })
+        return event_id not in state["events"]
+
+
+def delete_vault_events(event_ids: List[str], reason: str = "retention") -> List[str]:
+    """批次刪除：所有 tombstone 一次追加；回傳實際刪除的 event_id（不存在者略過）"""
+    with _writer():
+        state = _state()
+        _refresh(state)
+        now = datetime.utcnow().isoformat()
+        recs = []
+        for eid in dict.fromkeys(event_ids):
+            loc = state["events"].get(eid)
+            if loc is None:
+                continue
+            recs.append({
+                "op": OP_TOMBSTONE,
+                "id": eid,
+                "event_type": loc[4],
+                "reason": reason,
+                "deleted_at": now,
+            })
+        if not recs:
+            return []
+        _append_many(state, recs)
+        return [r["id"] for r in recs if r["id"] not in state["events"]]
+
+# -------------------------------------------------
+# 讀取
+# -------------------------------------------------
+
+def _read_at(loc: list, eid: str) -> Optional[Dict[str, Any]]:
+    try:
+        if loc[0] == LEGACY:
+            with open(os.path.join(EVENT_DIR, f"{eid}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        with open(os.path.join(SEGMENT_DIR, loc[0]), "rb") as f:
+            f.seek(loc[1])
+            return json.loads(f.read(loc[2]))
+    except (OSError, ValueError):
+        return None
+
+
+def _read_many(locs: List[Tuple[str, list]]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """批次讀取：同一 segment 只開一次，依 offset 順序 seek（結果維持輸入順序）"""
+    by_seg: Dict[str, List[int]] = {}
+    for i, (eid, loc) in enumerate(locs):
+        by_seg.setdefault(loc[0], []).append(i)
+
+    out: List[Optional[Dict[str, Any]]] = [None] * len(locs)
+    for seg, idxs in by_seg.items():
+        if seg == LEGACY:
+            for i in idxs:
+                out[i] = _read_at(locs[i][1], locs[i][0])
+            continue
+        try:
+            with open(os.path.join(SEGMENT_DIR, seg), "rb") as f:
+                for i in sorted(idxs, key=lambda i: locs[i][1][1]):
+                    loc = locs[i][1]
+                    f.seek(loc[1])
+                    try:
+                        out[i] = json.loads(f.read(loc[2]))
+                    except ValueError:
+                        pass
+        except OSError:
+            continue
+    return [(eid, ev) for (eid, _), ev in zip(locs, out)]
+
 
-    event = {
-        "event_type": event_type,
-        "fingerprint": fingerprint,
-        "timestamp": datetime.utcnow().isoformat(),
-        "payload": payload
+def _view(eid: str, ev: Dict[str, Any]) -> Dict[str, Any]:
+    payload = ev.get("payload") or {}
+    created_at = _parse_ts(ev.get("timestamp"))
+    last_used = payload.get("last_used_at") if isinstance(payload, dict) else None
+    return {
+        "id": eid,
+        "type": ev.get("event_type"),
+        "event_type": ev.get("event_type"),
+        "fingerprint": ev.get("fingerprint"),
+        "timestamp": ev.get("timestamp"),
+        "created_at": created_at,
+        "last_used_at": _parse_ts(last_used),
+        "payload": payload,
     }
 
-    filename = f"{event_type}_{fingerprint}.json"
-    path = os.path.join(EVENT_DIR, filename)
 
-    # 防止重複事件覆寫
-    if os.path.exists(path):
-        return False
+def has_event(event_type: str, fingerprint: str) -> bool:
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        return event_id(event_type, fingerprint) in state["events"]
+
+
+def get_event(event_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        loc = state["events"].get(event_id)
+    if loc is None:
+        return None
+    ev = _read_at(loc, event_id)
+    return _view(event_id, ev) if ev else None
+
+
+def _recent_ids(state: Dict[str, Any], limit: Optional[int], event_type: Optional[str]) -> List[str]:
+    """時間索引由新到舊；略過已刪除（tombstone）與舊位置"""
+    out: List[str] = []
+    events = state["events"]
+    for ts, eid in reversed(state["time"]):
+        loc = events.get(eid)
+        if loc is None or loc[3] != ts:
+            continue
+        if event_type is not None and loc[4] != event_type:
+            continue
+        out.append(eid)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
+
+def get_recent_events(limit: int = 20, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """最近 limit 筆（新 → 舊）"""
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        locs = [(eid, state["events"][eid]) for eid in _recent_ids(state, limit, event_type)]
+    return [_view(eid, ev) for eid, ev in _read_many(locs) if ev]
+
+
+def list_vault_events(event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """所有未刪除事件（舊 → 新）"""
+    return list(reversed(get_recent_events(limit=None, event_type=event_type)))
+
+
+def exists_recent(fingerprint: str, hours: int = RECENT_HOURS) -> bool:
+    """近 hours 小時內是否已有同 fingerprint 的事件（O(1)）"""
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        ts = _parse_ts(state["fp_latest"].get(str(fingerprint)))
+    return ts is not None and ts >= datetime.utcnow() - timedelta(hours=hours)
+
+
+def get_recent_deletions(limit: int = 5) -> List[Dict[str, Any]]:
+    """最近的 tombstone（新 → 舊）：{id, event_type, reason, deleted_at}"""
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        return [dict(t) for t in reversed(state["tombstones"][-limit:])] if limit else []
+
+
+def load_recent_backtests(limit: int = 10) -> List[Dict[str, Any]]:
+    """最近 limit 筆回測事件 payload（舊 → 新，與 summarize 的連續失誤計算一致）"""
+    events = get_recent_events(limit, event_type=BACKTEST_EVENT_TYPE)
+    return [e["payload"] for e in reversed(events)]
+
+# -------------------------------------------------
+# Compaction
+# -------------------------------------------------
+
+def _fold_legacy(state: Dict[str, Any]) -> int:
+    """舊版單檔事件併入日誌（保留原 timestamp），原檔移至 legacy_archive"""
+    folded = 0
+    for eid, loc in sorted(state["events"].items(), key=lambda kv: kv[1][3]):
+        if loc[0] != LEGACY:
+            continue
+        src = os.path.join(EVENT_DIR, f"{eid}.json")
+        ev = _read_at(loc, eid)
+        if not ev:
+            continue
+        del state["events"][eid]
+        _append(state, {
+            "op": OP_EVENT,
+            "id": eid,
+            "event_type": ev.get("event_type"),
+            "fingerprint": ev.get("fingerprint"),
+            "timestamp": ev.get("timestamp", ""),
+            "payload": ev.get("payload"),
+        })
+        os.makedirs(LEGACY_ARCHIVE_DIR, exist_ok=True)
+        os.replace(src, os.path.join(LEGACY_ARCHIVE_DIR, f"{eid}.json"))
+        folded += 1
+    return folded
+
+
+def compact_events(fold_legacy: bool = False) -> Dict[str, Any]:
+    """
+    重寫目前寫入中以外的 segment：
+    - 只保留仍存活的事件與全部 tombstone（刪除審計不可遺失）
+    - 完成後遞增 compaction 世代並全量重建索引（其他行程下次存取時自動重建）
+    單一維護排程執行；compact 期間其他行程的寫入在檔案鎖上等待
+    """
+    global _STATE
+    report = {"segments": 0, "bytes_before": 0, "bytes_after": 0, "dropped": 0, "folded": 0}
+    with _writer():
+        state = _state()
+        _refresh(state)
+        if fold_legacy:
+            report["folded"] = _fold_legacy(state)
+
+        active = _active_segment(state)
+        live = {(loc[0], loc[1]) for loc in state["events"].values()}
+        for seg in _list_segments():
+            if seg == active:
+                continue
+            path = os.path.join(SEGMENT_DIR, seg)
+            tmp = path + ".tmp"
+            before = _size(path)
+            offset = 0
+            kept = dropped = 0
+            with open(path, "rb") as src, open(tmp, "wb") as dst:
+                for line in src:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        rec = None
+                    keep = isinstance(rec, dict) and (
+                        rec.get("op") == OP_TOMBSTONE
+                        or (rec.get("op") == OP_EVENT and (seg, offset) in live)
+                    )
+                    offset += len(line)
+                    if keep:
+                        dst.write(line)
+                        kept += 1
+                    else:
+                        dropped += 1
+                dst.flush()
+                os.fsync(dst.fileno())
+            report["segments"] += 1
+            report["bytes_before"] += before
+            report["dropped"] += dropped
+            if dropped:
+                os.replace(tmp, path)
+            else:
+                os.remove(tmp)
+            report["bytes_after"] += _size(path)
+
+        try:
+            os.remove(INDEX_PATH)
+        except OSError:
+            pass
+        _bump_generation()
+        _STATE = _load_state()
+        _save_index(_STATE)
+        report["events"] = len(_STATE["events"])
+        report["tombstones"] = len(_STATE["tombstones"])
+    return report
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        state = _state()
+        _refresh(state)
+        return {
+            "segments": len(state["covered"]),
+            "bytes": sum(state["covered"].values()),
+            "events": len(state["events"]),
+            "legacy_events": sum(1 for loc in state["events"].values() if loc[0] == LEGACY),
+            "tombstones": len(state["tombstones"]),
+            "active_segment": _active_segment(state),
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Vault event log")
+    ap.add_argument("command", choices=["stats", "compact"])
+    ap.add_argument("--fold-legacy", action="store_true", help="舊版單檔事件併入日誌並移至 legacy_archive")
+    args = ap.parse_args()
+
+    res = compact_events(args.fold_legacy) if args.command == "compact" else stats()
+    print(json.dumps(res, ensure_ascii=False, indent=2))
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(event, f, ensure_ascii=False, indent=2)
 
-    return True
+if __name__ == "__main__":
+    sys.exit(main())
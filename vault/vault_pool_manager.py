@@ -2,21 +2,29 @@ from pathlib import Path
 import json
 from collections import Counter
 
+try:
+    from vault.access_catalog import touch_write
+    from vault.vault_tiering import list_files, read_json
+except ImportError:
+    from access_catalog import touch_write
+    from vault_tiering import list_files, read_json
+
 def update_core_watch(
     market_root: Path,
     history_days: int = 30,
     top_n: int = 5,
 ):
     history_dir = market_root / "history"
-    if not history_dir.exists():
-        return
 
-    files = sorted(history_dir.glob("*.json"))[-history_days:]
+    # 舊的 history 可能已被分層（WARM .gz / COLD pack）→ 走統一讀取 API
+    files = list_files(history_dir, ".json")[-history_days:]
+    if not files and not history_dir.exists():
+        return
     counter = Counter()
 
     for f in files:
         try:
-            data = json.loads(f.read_text(encoding="utf-8"))
+            data = read_json(f)
             for r in data:
                 counter[r["symbol"]] += 1
         except Exception:
@@ -31,3 +39,4 @@ def update_core_watch(
         json.dumps({"symbols": core}, ensure_ascii=False, indent=2),
         encoding="utf-8"
     )
+    touch_write(core_dir / "latest.json")
@@ -1,41 +1,78 @@
 # Vault 冷資料還原管理器（封頂版）
+# - pack 成員（archive_id）：依 offset 索引直接 seek 讀出單一成員
+# - 舊版單檔 zip（{name}.{ts}.zip）：照舊解壓
 
 import os
 import zipfile
 from datetime import datetime
 
-ARCHIVE_ROOT = r"E:\Quant-Vault\LOCKED_RAW\archive"
-AUDIT_LOG = r"E:\Quant-Vault\LOG\vault_deletion_audit.log"
+try:
+    from vault.access_catalog import touch_write
+    from vault.vault_archive_manager import lookup, read_member
+except ImportError:
+    from access_catalog import touch_write
+    from vault_archive_manager import lookup, read_member
+
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+ARCHIVE_ROOT = os.path.join(VAULT_ROOT, "LOCKED_RAW", "archive")
+AUDIT_LOG = os.path.join(VAULT_ROOT, "LOG", "vault_deletion_audit.log")
 
 def log(msg: str):
     with open(AUDIT_LOG, "a", encoding="utf-8") as f:
         f.write(msg + "\n")
 
-def restore(zip_name: str, target_dir: str) -> dict:
-    zip_path = os.path.join(ARCHIVE_ROOT, zip_name)
+def _restore_packed(archive_id: str, entry: dict, target_dir: str) -> dict:
+    target_path = os.path.join(target_dir, entry["name"])
+    if os.path.exists(target_path):
+        return {"ok": False, "reason": "TARGET_EXISTS"}
+
+    try:
+        raw = read_member(archive_id)
+    except (OSError, ValueError):
+        return {"ok": False, "reason": "INVALID_ARCHIVE"}
 
-    if not os.path.exists(zip_path):
-        return {"ok": False, "reason": "ARCHIVE_NOT_FOUND"}
+    os.makedirs(target_dir, exist_ok=True)
+    tmp = target_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, target_path)
+    return {"ok": True, "restored_to": target_path}
 
+def restore(zip_name: str, target_dir: str) -> dict:
+    """zip_name：pack 成員的 archive_id，或舊版 zip 檔名"""
     if "LOCKED_" in target_dir:
         return {"ok": False, "reason": "LOCKED_PATH"}
 
-    with zipfile.ZipFile(zip_path, "r") as z:
-        members = z.namelist()
-        if len(members) != 1:
-            return {"ok": False, "reason": "INVALID_ARCHIVE"}
+    entry = lookup(zip_name)
+    if entry is not None:
+        res = _restore_packed(zip_name, entry, target_dir)
+        if not res["ok"]:
+            return res
+        target_path = res["restored_to"]
+        source = f"{entry['pack']}@{entry['offset']}"
+    else:
+        zip_path = os.path.join(ARCHIVE_ROOT, zip_name)
+        if not os.path.exists(zip_path):
+            return {"ok": False, "reason": "ARCHIVE_NOT_FOUND"}
+
+        with zipfile.ZipFile(zip_path, "r") as z:
+            members = z.namelist()
+            if len(members) != 1:
+                return {"ok": False, "reason": "INVALID_ARCHIVE"}
 
-        filename = members[0]
-        target_path = os.path.join(target_dir, filename)
+            filename = members[0]
+            target_path = os.path.join(target_dir, filename)
 
-        if os.path.exists(target_path):
-            return {"ok": False, "reason": "TARGET_EXISTS"}
+            if os.path.exists(target_path):
+                return {"ok": False, "reason": "TARGET_EXISTS"}
 
-        os.makedirs(target_dir, exist_ok=True)
-        z.extract(filename, target_dir)
+            os.makedirs(target_dir, exist_ok=True)
+            z.extract(filename, target_dir)
+        source = zip_name
+    touch_write(target_path)  # 還原 = 重新使用，不可立刻又被判為冷資料
 
     ts = datetime.utcnow().isoformat()
-    log(f"[{ts}] RESTORED: {zip_name} -> {target_path}")
+    log(f"[{ts}] RESTORED: {zip_name} ({source}) -> {target_path}")
 
     return {
         "ok": True,
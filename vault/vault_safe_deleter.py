@@ -1,15 +1,45 @@
 import os
-from vault_archive_manager import archive_file
+from vault_archive_manager import archive_file, archive_files
+
+try:
+    from vault.access_catalog import forget
+    from vault.vault_tiering import tier_managed
+except ImportError:
+    from access_catalog import forget
+    from vault_tiering import tier_managed
 
 def safe_delete(path: str) -> dict:
     if not os.path.exists(path):
         return {"ok": False, "reason": "NOT_FOUND"}
+    if tier_managed(path):
+        return {"ok": False, "reason": "TIER_MANAGED"}
 
     archive = archive_file(path)
     os.remove(path)
+    forget(path)
 
     return {
         "ok": True,
         "deleted": path,
         "archived_to": archive
     }
+
+def safe_delete_many(paths) -> dict:
+    """批次：全部寫進同一個 pack 後才刪原檔；封存失敗的檔案不刪"""
+    paths = [p for p in paths if os.path.exists(p)]
+    skipped = {p for p in paths if tier_managed(p)}
+    paths = [p for p in paths if p not in skipped]
+    archived = archive_files(paths)
+
+    deleted = {}
+    for path, archive in archived.items():
+        os.remove(path)
+        forget(path)
+        deleted[path] = archive
+
+    return {
+        "ok": len(deleted) == len(paths),
+        "deleted": deleted,
+        "failed": [p for p in paths if p not in archived],
+        "skipped": sorted(skipped)
+    }
@@ -0,0 +1,428 @@
+# vault_tiering.py
+# Vault 冷熱分層服務（HOT / WARM / COLD）
+# 職責：
+# - 依 vault_cold_classifier.classify 的標籤實際搬移資料：
+#   HOT ：原檔不動
+#   WARM：原地壓縮成 <檔名>.gz（同目錄），原檔移除
+#   COLD：寫進 vault_archive_manager 的 pack（批次），原檔移除
+# - 候選檔案來自 access_catalog（last_access 索引），不逐檔 stat
+# - 分層紀錄：MANIFESTS/tier_manifest.ndjson（append-only，邏輯路徑 → 實際位置）
+# - 統一讀取 API：read_bytes / read_text / read_json / exists / list_files
+#   呼叫端只給邏輯路徑（原本的檔名），不需知道資料在哪一層
+# - 分層範圍內的檔案（含 WARM .gz）由本服務管理：各 cleaner / safe_delete 以 tier_managed() 判斷後略過
+# ❌ 不刪資料（COLD 只是換位置，可 promote 回 HOT） ❌ 不碰 LOCKED_*
+#
+# 用法：
+#   python vault/vault_tiering.py run [--zone "STOCK_DB/*/history"] [--dry-run]
+#   python vault/vault_tiering.py read STOCK_DB/TW/history/2025-01-02.json
+#   python vault/vault_tiering.py promote STOCK_DB/TW/history/2025-01-02.json
+#   python vault/vault_tiering.py stats
+
+import os
+import sys
+import glob
+import gzip
+import fnmatch
+import json
+import argparse
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from vault.access_catalog import iter_files, touch_read, touch_write, forget
+    from vault.vault_archive_manager import archive_files, read_member
+    from vault.vault_cold_classifier import classify, WARM_DAYS
+except ImportError:
+    from access_catalog import iter_files, touch_read, touch_write, forget
+    from vault_archive_manager import archive_files, read_member
+    from vault_cold_classifier import classify, WARM_DAYS
+
+# =================================================
+# Vault Root（鐵律）
+# =================================================
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
+MANIFEST_PATH = os.path.join(VAULT_ROOT, "MANIFESTS", "tier_manifest.ndjson")
+
+HOT, WARM, COLD = "HOT", "WARM", "COLD"
+WARM_EXT = ".gz"
+
+# 預設分層範圍（相對 VAULT_ROOT，可用 glob）
+# 只放「所有讀取端都已改走統一讀取 API」的目錄：history → vault_pool_manager
+# （STOCK_DB/*/cache、TEMP_CACHE/cache 的讀取端尚未改寫，不可分層）
+TIER_ZONES = [
+    "STOCK_DB/*/history",
+]
+# 路徑含以下片段 → classify 視為 protected（永遠 HOT）
+PROTECTED_MARKERS = ("LOCKED_", "black_swan", "persona")
+# 本身已壓縮：WARM 不再壓，直接留到 COLD 才進 pack
+COMPRESSED_SUFFIXES = (".gz", ".zip", ".parquet", ".pq", ".vpk", ".7z", ".xz", ".bz2")
+
+_LOCK = threading.Lock()
+# {"covered": bytes, "entries": {logical: rec}, "dirs": {logical_dir: set(name)}, "files": set(WARM .gz key)}
+_MANIFEST: Optional[Dict[str, Any]] = None
+
+# -------------------------------------------------
+# 路徑
+# -------------------------------------------------
+
+def logical_key(path) -> str:
+    """邏輯路徑 → 相對 VAULT_ROOT 的 key（"/" 分隔；磁碟代號改變也不影響）"""
+    p = str(path)
+    if not os.path.isabs(p):
+        p = os.path.join(VAULT_ROOT, p)
+    rel = os.path.relpath(os.path.abspath(p), os.path.abspath(VAULT_ROOT))
+    return os.path.normcase(rel).replace(os.sep, "/")
+
+
+def _physical(key: str) -> str:
+    return os.path.join(VAULT_ROOT, *key.split("/"))
+
+# -------------------------------------------------
+# 分層紀錄
+# -------------------------------------------------
+
+def _apply(m: Dict[str, Any], rec: Dict[str, Any]):
+    key = rec["path"]
+    parent, _, name = key.rpartition("/")
+    old = m["entries"].get(key)
+    if old and old.get("file"):
+        m["files"].discard(old["file"])
+    if rec.get("file"):
+        m["files"].add(rec["file"])
+    if rec["tier"] == HOT:
+        m["entries"].pop(key, None)
+        m["dirs"].get(parent, set()).discard(name)
+        return
+    m["entries"][key] = rec
+    m["dirs"].setdefault(parent, set()).add(name)
+
+
+def _manifest() -> Dict[str, Any]:
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = {"covered": 0, "entries": {}, "dirs": {}, "files": set()}
+    try:
+        size = os.path.getsize(MANIFEST_PATH)
+    except OSError:
+        return _MANIFEST
+    if size > _MANIFEST["covered"]:
+        with open(MANIFEST_PATH, "rb") as f:
+            f.seek(_MANIFEST["covered"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                _MANIFEST["covered"] += len(line)
+                try:
+                    _apply(_MANIFEST, json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+    return _MANIFEST
+
+
+def _record(recs: List[Dict[str, Any]]):
+    """一批紀錄單次 write；先落地紀錄，呼叫端才移除原檔"""
+    if not recs:
+        return
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs).encode("utf-8")
+    fd = os.open(MANIFEST_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    _manifest()
+
+
+def tier_of(path) -> str:
+    key = logical_key(path)
+    if os.path.isfile(_physical(key)):
+        return HOT
+    with _LOCK:
+        rec = _manifest()["entries"].get(key)
+    return rec["tier"] if rec else HOT
+
+
+def tier_managed(path, zones: Iterable[str] = TIER_ZONES) -> bool:
+    """
+    本服務管理的檔案 → True（cleaner 不可刪）：
+    - 位於分層範圍內（之後可能被搬到 WARM / COLD）
+    - 或是 manifest 仍指向的 WARM .gz
+    """
+    key = logical_key(path)
+    parts = key.split("/")
+    for z in zones:
+        zp = os.path.normcase(z).replace(os.sep, "/").split("/")
+        if len(parts) > len(zp) and all(fnmatch.fnmatchcase(a, b) for a, b in zip(parts, zp)):
+            return True
+    with _LOCK:
+        return key in _manifest()["files"]
+
+# =================================================
+# 統一讀取 API
+# =================================================
+
+def read_bytes(path, promote: bool = False) -> bytes:
+    """
+    依邏輯路徑讀取（HOT 原檔 → WARM .gz → COLD pack）
+    promote=True：COLD / WARM 讀取後放回 HOT（之後直接讀原檔）
+    找不到 → FileNotFoundError
+    """
+    key = logical_key(path)
+    plain = _physical(key)
+    if os.path.isfile(plain):
+        with open(plain, "rb") as f:
+            raw = f.read()
+        touch_read(plain)
+        return raw
+
+    with _LOCK:
+        rec = _manifest()["entries"].get(key)
+    if rec is None:
+        raise FileNotFoundError(str(path))
+
+    if rec["tier"] == WARM:
+        gz = _physical(rec["file"])
+        with gzip.open(gz, "rb") as f:
+            raw = f.read()
+        touch_read(gz)
+    else:
+        raw = read_member(rec["archive_id"])
+        if rec.get("encoding") == "gzip":
+            raw = gzip.decompress(raw)
+
+    if promote:
+        _promote(key, rec, raw)
+    return raw
+
+
+def read_text(path, encoding: str = "utf-8", promote: bool = False) -> str:
+    return read_bytes(path, promote).decode(encoding)
+
+
+def read_json(path, promote: bool = False) -> Any:
+    return json.loads(read_bytes(path, promote))
+
+
+def exists(path) -> bool:
+    key = logical_key(path)
+    if os.path.isfile(_physical(key)):
+        return True
+    with _LOCK:
+        return key in _manifest()["entries"]
+
+
+def list_files(directory, suffix: Optional[str] = None) -> List[Path]:
+    """目錄底下所有邏輯檔案（跨三層，排序後回傳；WARM 以原檔名列出）"""
+    d = Path(directory) if os.path.isabs(str(directory)) else Path(VAULT_ROOT) / directory
+    with _LOCK:
+        names = set(_manifest()["dirs"].get(logical_key(d), ()))
+    if d.is_dir():
+        for p in d.iterdir():
+            if not p.is_file():
+                continue
+            name = os.path.normcase(p.name)
+            # 本服務產生的 .gz 以邏輯檔名列出（已在 names 內）
+            if name.endswith(WARM_EXT) and name[:-len(WARM_EXT)] in names:
+                continue
+            names.add(name)
+    if suffix:
+        names = {n for n in names if n.endswith(os.path.normcase(suffix))}
+    return [d / n for n in sorted(names)]
+
+
+def promote(path) -> bool:
+    """放回 HOT（原檔還原到邏輯路徑）；已是 HOT / 不存在 → False"""
+    key = logical_key(path)
+    if os.path.isfile(_physical(key)):
+        return False
+    with _LOCK:
+        rec = _manifest()["entries"].get(key)
+    if rec is None:
+        return False
+    read_bytes(path, promote=True)
+    return True
+
+
+def _promote(key: str, rec: Dict[str, Any], raw: bytes):
+    plain = _physical(key)
+    os.makedirs(os.path.dirname(plain), exist_ok=True)
+    tmp = plain + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, plain)
+    touch_write(plain)
+    with _LOCK:
+        _record([{"path": key, "tier": HOT, "from": rec["tier"], "ts": datetime.utcnow().isoformat()}])
+    if rec["tier"] == WARM:
+        gz = _physical(rec["file"])
+        if os.path.exists(gz):
+            os.remove(gz)
+        forget(gz)
+    # COLD：pack 不改寫，成員留作備份
+
+# =================================================
+# 分層執行
+# =================================================
+
+def _zones(zones: Iterable[str]) -> List[str]:
+    out = []
+    for z in zones:
+        out.extend(p for p in sorted(glob.glob(os.path.join(VAULT_ROOT, z))) if os.path.isdir(p))
+    return out
+
+
+def _candidates(zones: Iterable[str]) -> List[Dict[str, Any]]:
+    """超過 WARM_DAYS 未存取的檔案 + classify 標籤"""
+    with _LOCK:
+        entries = _manifest()["entries"]
+        warm_files = {rec["file"]: key for key, rec in entries.items() if rec["tier"] == WARM}
+
+    now = datetime.now()
+    out = []
+    for zone in _zones(zones):
+        for row in iter_files(zone, older_than_days=WARM_DAYS, exclude=("LOCKED_",), verify=True):
+            phys = row["path"]
+            if phys.endswith(".tmp"):
+                continue
+            meta = {
+                "last_used": (now - timedelta(days=row["last_access_days"])).isoformat(),
+                "protected": any(m.lower() in phys.lower() for m in PROTECTED_MARKERS),
+            }
+            tier = classify(Path(phys), meta)
+            key = warm_files.get(logical_key(phys))  # 已是 WARM 的 .gz
+            out.append({
+                "physical": phys,
+                "key": key or logical_key(phys),
+                "current": WARM if key else HOT,
+                "target": tier,
+                "last_access_days": row["last_access_days"],
+                "size": row["size"],
+            })
+    return out
+
+
+def _to_warm(c: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    src = c["physical"]
+    gz = src + WARM_EXT
+    tmp = gz + ".tmp"
+    try:
+        with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+            for chunk in iter(lambda: fin.read(1024 * 1024), b""):
+                fout.write(chunk)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, gz)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return None
+    return {
+        "path": c["key"],
+        "tier": WARM,
+        "file": logical_key(gz),
+        "size": c["size"],
+        "stored": os.path.getsize(gz),
+        "ts": datetime.utcnow().isoformat(),
+    }
+
+
+def run_tiering(zones: Iterable[str] = TIER_ZONES, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    一次分層：
+    - HOT → WARM：逐檔壓縮
+    - HOT / WARM → COLD：整批寫進 pack（一次封存）
+    回傳統計（dry_run 只統計不搬）
+    """
+    cands = _candidates(zones)
+    to_warm = [c for c in cands if c["target"] == WARM and c["current"] == HOT
+               and not c["physical"].lower().endswith(COMPRESSED_SUFFIXES)]
+    to_cold = [c for c in cands if c["target"] == COLD]
+    report = {
+        "candidates": len(cands),
+        "warm": len(to_warm),
+        "cold": len(to_cold),
+        "bytes_before": sum(c["size"] for c in to_warm + to_cold),
+        "bytes_warm": 0,
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        return report
+
+    # ---------- WARM：原地壓縮 ----------
+    recs = []
+    for c in to_warm:
+        rec = _to_warm(c)
+        if rec:
+            recs.append((c, rec))
+    with _LOCK:
+        _record([rec for _, rec in recs])
+    for c, rec in recs:
+        os.remove(c["physical"])
+        forget(c["physical"])
+        # 沿用原本的最後存取時間，否則壓縮本身會讓檔案「變熱」
+        gz = _physical(rec["file"])
+        touch_write(gz, size=rec["stored"],
+                    ts=(datetime.now() - timedelta(days=c["last_access_days"])).timestamp())
+        report["bytes_warm"] += rec["stored"]
+
+    # ---------- COLD：整批進 pack ----------
+    archived = archive_files([c["physical"] for c in to_cold])
+    now = datetime.utcnow().isoformat()
+    cold_recs = [{
+        "path": c["key"],
+        "tier": COLD,
+        "archive_id": archived[c["physical"]],
+        "encoding": "gzip" if c["current"] == WARM else None,
+        "size": c["size"],
+        "ts": now,
+    } for c in to_cold if c["physical"] in archived]
+    with _LOCK:
+        _record(cold_recs)
+    for c in to_cold:
+        if c["physical"] in archived:
+            os.remove(c["physical"])
+            forget(c["physical"])
+    report["archived"] = len(cold_recs)
+    return report
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        entries = _manifest()["entries"]
+        out: Dict[str, Any] = {"manifest": MANIFEST_PATH, WARM: 0, COLD: 0, "bytes": 0, "stored_warm": 0}
+        for rec in entries.values():
+            out[rec["tier"]] += 1
+            out["bytes"] += rec.get("size") or 0
+            out["stored_warm"] += rec.get("stored") or 0
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Vault HOT/WARM/COLD tiering")
+    sub = ap.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--zone", action="append", help="相對 VAULT_ROOT 的目錄（可 glob，可重複）")
+    r.add_argument("--dry-run", action="store_true")
+    for name in ("read", "promote"):
+        p = sub.add_parser(name)
+        p.add_argument("path", help="邏輯路徑（相對 VAULT_ROOT 或絕對路徑）")
+    sub.add_parser("stats")
+    args = ap.parse_args()
+
+    if args.command == "run":
+        res = run_tiering(args.zone or TIER_ZONES, args.dry_run)
+    elif args.command == "read":
+        sys.stdout.buffer.write(read_bytes(args.path))
+        return
+    elif args.command == "promote":
+        res = {"promoted": promote(args.path), "tier": tier_of(args.path)}
+    else:
+        res = stats()
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
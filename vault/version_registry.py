@@ -4,23 +4,43 @@
 # - 所有 AI / Guardian / Orchestrator 變更必須註冊版本
 # - 每次學習 / 同步 / 懲罰都留下不可變紀錄
 # - 支援一鍵回滾到任一穩定版本
+# 儲存（LOCKED_DECISION/version_registry/）：
+# - objects/<sha[:2]>/<sha256>.json：payload 以內容雜湊存放，相同權重快照只存一份
+# - records.ndjson：append-only 註冊紀錄（不含 payload，只存 payload_sha256）
+#   多行程：追加在 records.ndjson.lock（file_lock）內；鎖內先追上其他行程的紀錄再配 id，
+#   寫完從 covered 重掃（offset 以檔案為準，不自行累加）
+# - 記憶體索引：record id → 紀錄、(system, tag) → 紀錄、system → latest，查詢 / 回滾 O(1)
+# - 舊版整份 JSON（{system}_{tag}_{ts}.json）首次載入時併入索引，原檔不動
 # ❌ 不判斷市場 ❌ 不計算權重 ❌ 不觸發學習
 
 import os
 import json
+import hashlib
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+try:
+    from vault.file_lock import file_lock
+except ImportError:
+    from file_lock import file_lock
 
 # =================================================
 # Vault Root（鐵律）
 # =================================================
-VAULT_ROOT = r"E:\Quant-Vault"
+VAULT_ROOT = os.environ.get("VAULT_ROOT", r"E:\Quant-Vault")
 
 VERSION_DIR = os.path.join(
     VAULT_ROOT,
     "LOCKED_DECISION",
     "version_registry"
 )
+OBJECT_DIR = os.path.join(VERSION_DIR, "objects")
+RECORDS_PATH = os.path.join(VERSION_DIR, "records.ndjson")
+
+_LOCK = threading.Lock()
+# {"covered": bytes, "records": {id: rec}, "by_tag": {system: {tag: id}}, "latest": {system: id}}
+_INDEX: Optional[Dict[str, Any]] = None
 
 # -------------------------------------------------
 
@@ -39,9 +59,151 @@ def _load(path: str) -> Dict:
         return json.load(f)
 
 
-def _save(path: str, data: Dict):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+# -------------------------------------------------
+# 內容定址 payload
+# -------------------------------------------------
+
+def _canonical(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(OBJECT_DIR, digest[:2], f"{digest}.json")
+
+
+def _put_payload(payload: Dict[str, Any]) -> str:
+    """已存在（相同內容）→ 不再寫入"""
+    raw = _canonical(payload)
+    digest = hashlib.sha256(raw).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+    return digest
+
+
+def _get_payload(digest: str) -> Dict[str, Any]:
+    with open(_object_path(digest), "rb") as f:
+        return json.loads(f.read())
+
+# -------------------------------------------------
+# 索引
+# -------------------------------------------------
+
+def _apply(index: Dict[str, Any], rec: Dict[str, Any]):
+    rid = rec["id"]
+    index["records"][rid] = rec
+    index["by_tag"].setdefault(rec["system"], {})[rec["version"]] = rid
+    index["latest"][rec["system"]] = rid
+
+
+def _catch_up(index: Dict[str, Any]):
+    """從 covered 往後重播 records.ndjson（只處理以換行結尾的完整行）"""
+    if _size(RECORDS_PATH) <= index["covered"]:
+        return
+    with open(RECORDS_PATH, "rb") as f:
+        f.seek(index["covered"])
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            index["covered"] += len(line)
+            try:
+                _apply(index, json.loads(line))
+            except (ValueError, KeyError):
+                continue
+
+
+def _append_record(index: Dict[str, Any], rec: Dict[str, Any]):
+    """呼叫端須持有 file_lock(RECORDS_PATH)"""
+    line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(RECORDS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, line)  # 單次 write，整行落地
+    finally:
+        os.close(fd)
+    _catch_up(index)
+
+
+def _import_legacy(index: Dict[str, Any]):
+    """舊版整份 JSON 紀錄 → payload 物件 + 索引紀錄（依檔名排序 ≈ 時間順序）"""
+    legacy = []
+    for fn in os.listdir(VERSION_DIR):
+        path = os.path.join(VERSION_DIR, fn)
+        if not fn.endswith(".json") or not os.path.isfile(path):
+            continue
+        try:
+            data = _load(path)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and "system" in data and "version" in data:
+            legacy.append((data.get("timestamp", ""), fn, data))
+
+    for ts, fn, data in sorted(legacy):
+        _append_record(index, {
+            "id": fn,
+            "system": data["system"],
+            "version": data["version"],
+            "timestamp": ts,
+            "payload_sha256": _put_payload(data.get("payload") or {}),
+        })
+
+
+def _index() -> Dict[str, Any]:
+    """載入 / 追上 records.ndjson（只讀新增的位元組）"""
+    global _INDEX
+    _ensure_dir()
+    if _INDEX is None:
+        _INDEX = {"covered": 0, "records": {}, "by_tag": {}, "latest": {}}
+        if not os.path.exists(RECORDS_PATH):
+            with file_lock(RECORDS_PATH):
+                # 鎖內再確認：其他行程可能剛併入完
+                if not os.path.exists(RECORDS_PATH):
+                    _import_legacy(_INDEX)
+
+    _catch_up(_INDEX)
+    return _INDEX
+
+
+def _materialize(rec: Optional[Dict[str, Any]]) -> Dict:
+    if rec is None:
+        return {}
+    out = {
+        "system": rec["system"],
+        "version": rec["version"],
+        "timestamp": rec["timestamp"],
+        "payload": _get_payload(rec["payload_sha256"]),
+    }
+    if rec.get("rollback_of"):
+        out["rollback_of"] = rec["rollback_of"]
+    return out
+
+
+def _register(index: Dict[str, Any], system: str, version_tag: str, digest: str, extra: Dict[str, Any]) -> str:
+    """呼叫端須持有 file_lock(RECORDS_PATH) 且已 _catch_up（id 才不會與其他行程重複）"""
+    base = f"{system}_{version_tag}_{int(datetime.utcnow().timestamp())}"
+    rid, n = f"{base}.json", 1
+    while rid in index["records"]:
+        rid = f"{base}_{n}.json"
+        n += 1
+
+    _append_record(index, {
+        "id": rid,
+        "system": system,
+        "version": version_tag,
+        "timestamp": _now(),
+        "payload_sha256": digest,
+        **extra,
+    })
+    return rid
 
 
 # =================================================
@@ -56,32 +218,61 @@ def register_version(
     """
     註冊一次不可變版本
     system: Guardian / StockGenius / Orchestrator
+    回傳版本 id（load_version 可用）
     """
 
-    _ensure_dir()
+    digest = _put_payload(payload)
+    with _LOCK:
+        index = _index()
+        with file_lock(RECORDS_PATH):
+            _catch_up(index)
+            return _register(index, system, version_tag, digest, {})
 
-    record = {
-        "system": system,
-        "version": version_tag,
-        "timestamp": _now(),
-        "payload": payload
-    }
 
-    fname = f"{system}_{version_tag}_{int(datetime.utcnow().timestamp())}.json"
-    path = os.path.join(VERSION_DIR, fname)
+def list_versions(system: Optional[str] = None) -> List[str]:
+    with _LOCK:
+        records = _index()["records"]
+        if system:
+            return sorted(rid for rid, rec in records.items() if rec["system"] == system)
+        return sorted(records)
 
-    _save(path, record)
-    return path
 
+def load_version(file_name: str) -> Dict:
+    with _LOCK:
+        rec = _index()["records"].get(file_name)
+    if rec is None:
+        # 索引外的舊檔（例如手動放入）
+        return _load(os.path.join(VERSION_DIR, file_name))
+    return _materialize(rec)
 
-def list_versions(system: Optional[str] = None):
-    _ensure_dir()
-    files = sorted(os.listdir(VERSION_DIR))
-    if system:
-        files = [f for f in files if f.startswith(system)]
-    return files
 
+def latest_version(system: str) -> Dict:
+    """該 system 最新版本（含回滾後的版本）；無 → {}"""
+    with _LOCK:
+        index = _index()
+        rec = index["records"].get(index["latest"].get(system))
+    return _materialize(rec)
 
-def load_version(file_name: str) -> Dict:
-    path = os.path.join(VERSION_DIR, file_name)
-    return _load(path)
+
+def get_version(system: str, version_tag: str) -> Dict:
+    """(system, tag) 最後一次註冊的版本；無 → {}"""
+    with _LOCK:
+        index = _index()
+        rec = index["records"].get(index["by_tag"].get(system, {}).get(version_tag))
+    return _materialize(rec)
+
+
+def rollback_to(system: str, version_tag: str) -> Optional[str]:
+    """
+    回滾：以目標版本的 payload 重新註冊一筆（不複製 payload），並更新 latest 指標
+    找不到 → None
+    """
+    with _LOCK:
+        index = _index()
+        with file_lock(RECORDS_PATH):
+            _catch_up(index)
+            rid = index["by_tag"].get(system, {}).get(version_tag)
+            if rid is None:
+                return None
+            target = index["records"][rid]
+            return _register(index, system, version_tag, target["payload_sha256"], {"rollback_of": rid})
@@ -1,6 +1,11 @@
 import os
 from vault_root_guard import assert_vault_ready
 
+try:
+    from vault.access_catalog import touch_write
+except ImportError:
+    from access_catalog import touch_write
+
 VAULT_ROOT = r"E:\Quant-Vault"
 
 
@@ -16,6 +21,7 @@ def safe_write(path: str, content: str) -> bool:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
             f.write(content)
+        touch_write(path)
         return True
     except Exception:
         return False